@@ -1,37 +1,71 @@
 import os
-import json
+import contextvars
 import logging
-from typing import List, Dict, Any
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Generator, Iterator, Optional, Tuple
 import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
 from langchain.prompts import ChatPromptTemplate
 from langchain.chains import LLMChain
-from langchain.memory import ConversationBufferMemory
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-import pandas as pd
+from chat_models import get_chat_model
+from conversation_memory import DEFAULT_IDLE_SECONDS, DEFAULT_MAX_SESSIONS, DEFAULT_MAX_TOKENS, ConversationMemory, InMemorySessionBackend, SQLiteSessionBackend
+from embedding_cache import get_embedding_cache
+from embeddings import DEFAULT_EMBEDDING_MODEL, get_embedding_backend
+from index_holder import IndexHolder, IndexSnapshot, load_snapshot
+from job_analyzer import parse_analysis
+from metrics import CHAT_ANALYSES, STAGE_SECONDS, UPSTREAM_ERRORS, span
+from response_cache import DEFAULT_MAX_ENTRIES, DEFAULT_THRESHOLD, DEFAULT_TTL_SECONDS, SemanticResponseCache
+from single_flight import SingleFlight
+from upstream import get_upstream_client
+
+# Threads running job analysis alongside retrieval, shared by all chat requests
+CHAT_WORKERS = int(os.getenv('CHAT_WORKERS', '8'))
 
 class AIChatService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, index_holder: Optional[IndexHolder] = None):
         self.api_key = api_key
         genai.configure(api_key=api_key)
         
-        # Initialize LangChain components
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=api_key,
-            temperature=0.7,
-            max_output_tokens=2048
-        )
+        # Embedding and LLM calls run with deadlines, retries and circuit breakers
+        self.embedding_client = get_upstream_client('embedding')
+        self.chat_client = get_upstream_client('chat')
+        
+        # Initialize LangChain components (CHAT_API_URL points them at a stub instead)
+        self.llm = get_chat_model(api_key, timeout=self.chat_client.timeout)
+        
+        # Query embeddings go through the cache shared with /recommend
+        self.embedding_model = DEFAULT_EMBEDDING_MODEL
+        self.embedding_backend = get_embedding_backend(self.embedding_model)
+        self.embedding_cache = get_embedding_cache()
+        
+        # Share the app's hot-reloadable talent index, or open one if none was given
+        self.index_holder = index_holder if index_holder is not None else self.load_talent_data()
+        self.retrieval_mode = os.getenv('CHAT_RETRIEVAL', 'hybrid')
+        self.executor = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix='chat')
         
-        # Load saved embeddings and talent data
-        self.talent_data = self.load_talent_data()
+        # Identical LLM calls already in flight are awaited rather than repeated
+        self.analysis_flights = SingleFlight('chat_analysis')
+        self.response_flights = SingleFlight('chat_response')
         
-        # Initialize conversation memory
-        self.conversation_memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
+        # Local job analyses at least this confident skip the LLM analysis call
+        self.local_analysis_threshold = float(os.getenv('CHAT_LOCAL_ANALYSIS_THRESHOLD', '0.6'))
+        
+        # Answers to near-paraphrased questions are reused instead of calling the LLM again
+        self.response_cache = SemanticResponseCache(
+            max_entries=int(os.getenv('CHAT_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+            ttl=float(os.getenv('CHAT_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+            threshold=float(os.getenv('CHAT_CACHE_THRESHOLD', DEFAULT_THRESHOLD)),
+        )
+        
+        # Per-session conversation memory; CHAT_MEMORY_DB shares sessions between workers
+        memory_db = os.getenv('CHAT_MEMORY_DB')
+        self.conversation_memory = ConversationMemory(
+            backend=SQLiteSessionBackend(memory_db) if memory_db else InMemorySessionBackend(
+                int(os.getenv('CHAT_MAX_SESSIONS', DEFAULT_MAX_SESSIONS))),
+            max_tokens=int(os.getenv('CHAT_MEMORY_TOKENS', DEFAULT_MAX_TOKENS)),
+            idle_seconds=float(os.getenv('CHAT_SESSION_TTL', DEFAULT_IDLE_SECONDS)),
         )
         
         # Define system prompts
@@ -44,87 +78,107 @@ Your capabilities:
 - Give contextual recommendations based on company culture and requirements
 
 Always be helpful, professional, and provide specific, actionable insights about candidates."""
+        
+        # Prompts and chains are built once and reused by every message
+        self.analysis_chain = LLMChain(llm=self.llm, prompt=self.build_analysis_prompt())
+        self.response_chain = LLMChain(llm=self.llm, prompt=self.build_response_prompt())
+        self.stream_chain = self.build_response_prompt() | self.llm
 
-    def load_talent_data(self) -> pd.DataFrame:
-        """Load saved talent data with embeddings"""
+    def load_talent_data(self) -> IndexHolder:
+        """Open the saved talent index when the app did not pass one in"""
+        index_root = os.getenv('TALENT_INDEX_DIR', 'talent_index')
         try:
-            import pickle
-            with open('talent_embeddings.pkl', 'rb') as f:
-                talent_df = pickle.load(f)
-            logging.info(f"Loaded {len(talent_df)} talent profiles with embeddings")
-            return talent_df
+            snapshot = load_snapshot(index_root)
+            logging.info(f"Loaded {snapshot.profile_count} talent profiles with embeddings")
         except Exception as e:
             logging.error(f"Error loading talent data: {e}")
-            return pd.DataFrame()
+            snapshot = IndexSnapshot.empty()
+        return IndexHolder(index_root, snapshot)
 
-    def get_candidate_embeddings(self) -> np.ndarray:
-        """Get candidate embeddings as numpy array"""
-        if self.talent_data.empty:
-            return np.array([])
-        
-        embeddings = []
-        for embedding in self.talent_data['embedding']:
-            if embedding is not None:
-                embeddings.append(embedding)
-            else:
-                embeddings.append([0] * 768)  # Default embedding size
-        
-        return np.array(embeddings)
-
-    def find_relevant_candidates(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Find relevant candidates using semantic search"""
-        if self.talent_data.empty:
+    def find_relevant_candidates(self, query: str, top_k: int = 5,
+                                 filters: Optional[Dict[str, Any]] = None,
+                                 query_embedding: Optional[np.ndarray] = None,
+                                 snapshot: Optional[IndexSnapshot] = None) -> List[Dict]:
+        """Find relevant candidates using semantic search, restricted by optional structured filters"""
+        snapshot = snapshot or self.index_holder.snapshot
+        if snapshot.profile_count == 0:
             return []
         
-        # Generate embedding for the query
-        query_embedding = self.generate_query_embedding(query)
+        # Generate embedding for the query; without one, retrieval falls back to lexical
         if query_embedding is None:
-            return []
+            query_embedding = self.generate_query_embedding(query)
         
-        # Get candidate embeddings
-        candidate_embeddings = self.get_candidate_embeddings()
-        if len(candidate_embeddings) == 0:
-            return []
-        
-        # Calculate similarities
-        query_embedding_reshaped = np.array(query_embedding).reshape(1, -1)
-        similarities = cosine_similarity(query_embedding_reshaped, candidate_embeddings)
-        
-        # Get top candidates
-        top_indices = similarities[0].argsort()[-top_k:][::-1]
+        # Get top candidates from the shared index
+        row_ids, scores, _ = snapshot.retrieve(query, query_embedding, top_k, self.retrieval_mode,
+                                               filters=filters)
         
         candidates = []
-        for idx in top_indices:
-            candidate = self.talent_data.iloc[idx]
+        for idx, score in zip(row_ids, scores):
+            candidate = snapshot.talent_df.iloc[idx]
             candidates.append({
                 'name': candidate['name'],
                 'location': candidate['location'],
                 'skills': candidate['Skills'],
                 'bio': candidate['Profile Description'],
-                'score': float(similarities[0][idx]),
+                'score': float(score),
                 'rank': len(candidates) + 1
             })
         
         return candidates
 
-    def generate_query_embedding(self, query: str) -> List[float]:
-        """Generate embedding for user query"""
+    def generate_query_embedding(self, query: str) -> Optional[np.ndarray]:
+        """Generate embedding for user query, reusing the shared embedding cache"""
+        def compute():
+            with span('embedding_api'):
+                return self.embedding_client.call(self.embedding_backend.embed, [query], "RETRIEVAL_QUERY",
+                                                  hedge=True)[0]
+
         try:
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=query,
-                task_type="RETRIEVAL_QUERY"
-            )
-            return result['embedding']
+            # Concurrent identical queries share one API call
+            return self.embedding_cache.get_or_compute(self.embedding_model, "RETRIEVAL_QUERY", query, compute)
         except Exception as e:
+            UPSTREAM_ERRORS.inc(upstream='embedding')
             logging.error(f"Error generating query embedding: {e}")
             return None
 
-    def analyze_job_requirements(self, query: str) -> Dict[str, Any]:
-        """Analyze job requirements using LangChain"""
-        analysis_prompt = ChatPromptTemplate.from_messages([
+    def analyze_job_requirements(self, query: str, history: str = '',
+                                 snapshot: Optional[IndexSnapshot] = None) -> Dict[str, Any]:
+        """Analyze job requirements locally, asking the LLM only when the local analysis is unsure"""
+        analysis = self.analyze_locally(query, snapshot)
+        return analysis if analysis is not None else self.analyze_with_llm(query, history, snapshot)
+
+    def analyze_locally(self, query: str, snapshot: Optional[IndexSnapshot] = None) -> Optional[Dict[str, Any]]:
+        """Keyword and vocabulary analysis of the request, or None if its confidence is below the threshold"""
+        with span('chat_local_analysis'):
+            analysis = (snapshot or self.index_holder.snapshot).job_analyzer.analyze(query)
+        if analysis['confidence'] < self.local_analysis_threshold:
+            return None
+        CHAT_ANALYSES.inc(source='local')
+        return analysis
+
+    def analyze_with_llm(self, query: str, history: str = '',
+                         snapshot: Optional[IndexSnapshot] = None) -> Dict[str, Any]:
+        """Analyze job requirements using LangChain, reading follow-ups in light of the conversation so far"""
+        CHAT_ANALYSES.inc(source='llm')
+        try:
+            with span('chat_analysis'):
+                result = self.chat_client.call(self.analysis_flights.do, (query, history), self.analysis_chain.run,
+                                               query=query, history=history or "None")
+            analysis = parse_analysis(result)
+            if analysis is None:
+                raise ValueError(f"no JSON object in analysis reply: {str(result)[:100]}")
+            return analysis
+        except Exception as e:
+            logging.error(f"Error analyzing job requirements: {e}")
+            # The low-confidence local analysis still beats the defaults
+            with span('chat_local_analysis'):
+                return (snapshot or self.index_holder.snapshot).job_analyzer.analyze(query)
+
+    def build_analysis_prompt(self) -> ChatPromptTemplate:
+        """Prompt for the LLM job analysis, used when the local analysis is unsure"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Analyze the job requirements and extract key information. Return a JSON with the following structure:
-            {
+            {{
                 "job_type": "video_editor|tiktok_creator|operations_manager|other",
                 "experience_level": "entry|mid|senior|executive",
                 "work_type": "full_time|part_time|contract|freelance",
@@ -133,58 +187,19 @@ Always be helpful, professional, and provide specific, actionable insights about
                 "key_skills": ["skill1", "skill2", "skill3"],
                 "company_culture": "startup|corporate|creative|traditional",
                 "confidence": 0.0-1.0
-            }"""),
-            ("human", "Analyze this job requirement: {query}")
+            }}"""),
+            ("human", "Conversation so far:\n{history}\n\nAnalyze this job requirement: {query}")
         ])
-        
-        chain = LLMChain(llm=self.llm, prompt=analysis_prompt)
-        
-        try:
-            result = chain.run(query=query)
-            # Parse JSON from result
-            if isinstance(result, str):
-                # Try to extract JSON from the response
-                start_idx = result.find('{')
-                end_idx = result.rfind('}') + 1
-                if start_idx != -1 and end_idx != 0:
-                    json_str = result[start_idx:end_idx]
-                    return json.loads(json_str)
-            return result
-        except Exception as e:
-            logging.error(f"Error analyzing job requirements: {e}")
-            return {
-                "job_type": "other",
-                "experience_level": "mid",
-                "work_type": "full_time",
-                "location_preference": "any",
-                "urgency": "medium",
-                "key_skills": [],
-                "company_culture": "traditional",
-                "confidence": 0.5
-            }
 
-    def generate_chat_response(self, query: str, candidates: List[Dict]) -> str:
-        """Generate contextual chat response using LangChain"""
-        
-        # Analyze job requirements
-        analysis = self.analyze_job_requirements(query)
-        
-        # Prepare candidate information
-        candidate_info = ""
-        for candidate in candidates[:3]:  # Top 3 candidates
-            candidate_info += f"""
-            Candidate #{candidate['rank']}: {candidate['name']}
-            Location: {candidate['location']}
-            Skills: {candidate['skills']}
-            Match Score: {candidate['score']:.1%}
-            Bio: {candidate['bio'][:200]}...
-            """
-        
-        # Create response prompt
-        response_prompt = ChatPromptTemplate.from_messages([
+    def build_response_prompt(self) -> ChatPromptTemplate:
+        """Prompt for the final chat answer, shared by the blocking and streaming chains"""
+        return ChatPromptTemplate.from_messages([
             ("system", self.system_prompt),
             ("human", """Based on the user's query and the candidate information, provide a helpful, contextual response.
 
+Conversation So Far:
+{history}
+
 User Query: {query}
 
 Job Analysis:
@@ -208,25 +223,83 @@ Provide a natural, conversational response that:
 
 Keep the response engaging and helpful, around 2-3 sentences for the main response plus candidate highlights.""")
         ])
+
+    def build_response_inputs(self, query: str, candidates: List[Dict], analysis: Dict[str, Any],
+                              history: str = '') -> Dict[str, str]:
+        """Fill the response prompt variables from the job analysis, top candidates and history"""
+        # Prepare candidate information
+        candidate_info = ""
+        for candidate in candidates[:3]:  # Top 3 candidates
+            candidate_info += f"""
+            Candidate #{candidate['rank']}: {candidate['name']}
+            Location: {candidate['location']}
+            Skills: {candidate['skills']}
+            Match Score: {candidate['score']:.1%}
+            Bio: {candidate['bio'][:200]}...
+            """
+        return {
+            'query': query,
+            'history': history or 'None',
+            'job_type': analysis.get('job_type', 'other'),
+            'experience_level': analysis.get('experience_level', 'mid'),
+            'work_type': analysis.get('work_type', 'full_time'),
+            'location_preference': analysis.get('location_preference', 'any'),
+            'urgency': analysis.get('urgency', 'medium'),
+            'key_skills': ', '.join(analysis.get('key_skills', [])),
+            'company_culture': analysis.get('company_culture', 'traditional'),
+            'candidate_info': candidate_info,
+        }
+
+    def generate_chat_response(self, query: str, candidates: List[Dict],
+                               analysis: Optional[Dict[str, Any]] = None, history: str = '') -> str:
+        """Generate contextual chat response using LangChain"""
+        return self.generate_chat_reply(query, candidates, analysis, history)[0]
+
+    def generate_chat_reply(self, query: str, candidates: List[Dict],
+                            analysis: Optional[Dict[str, Any]] = None, history: str = '') -> Tuple[str, bool]:
+        """Return (response, completed); completed is False when the LLM failed and this is the fallback"""
         
-        chain = LLMChain(llm=self.llm, prompt=response_prompt)
+        # Analyze job requirements unless the caller already did
+        if analysis is None:
+            analysis = self.analyze_job_requirements(query, history)
         
         try:
-            response = chain.run(
-                query=query,
-                job_type=analysis.get('job_type', 'other'),
-                experience_level=analysis.get('experience_level', 'mid'),
-                work_type=analysis.get('work_type', 'full_time'),
-                location_preference=analysis.get('location_preference', 'any'),
-                urgency=analysis.get('urgency', 'medium'),
-                key_skills=', '.join(analysis.get('key_skills', [])),
-                company_culture=analysis.get('company_culture', 'traditional'),
-                candidate_info=candidate_info
-            )
-            return response.strip()
+            inputs = self.build_response_inputs(query, candidates, analysis, history)
+            with span('chat_response'):
+                response = self.chat_client.call(self.response_flights.do, tuple(sorted(inputs.items())),
+                                                 self.response_chain.run, **inputs)
+            return response.strip(), True
         except Exception as e:
+            UPSTREAM_ERRORS.inc(upstream='chat')
             logging.error(f"Error generating chat response: {e}")
-            return self.generate_fallback_response(query, candidates)
+            return self.generate_fallback_response(query, candidates), False
+
+    def stream_chat_response(self, query: str, candidates: List[Dict],
+                             analysis: Dict[str, Any], history: str = '') -> Generator[str, None, bool]:
+        """Yield the chat response as the LLM produces it and return whether it completed.
+
+        The stream is opened through the chat client, so the wait for its first
+        chunk has the client's deadline, retries and circuit breaker. If that
+        fails the fallback response is yielded instead; if the stream fails or
+        stalls past the deadline later, the response stops short. Both return False.
+        """
+        produced = failed = False
+        start = time.perf_counter()
+        inputs = self.build_response_inputs(query, candidates, analysis, history)
+        try:
+            for chunk in self.chat_client.stream(self.stream_chain.stream, inputs):
+                if chunk.content:
+                    if not produced:
+                        STAGE_SECONDS.observe(time.perf_counter() - start, stage='chat_first_token')
+                    produced = True
+                    yield chunk.content
+        except Exception as e:
+            failed = True
+            UPSTREAM_ERRORS.inc(upstream='chat')
+            logging.error(f"Error streaming chat response: {e}")
+            if not produced:
+                yield self.generate_fallback_response(query, candidates)
+        return not failed
 
     def generate_fallback_response(self, query: str, candidates: List[Dict]) -> str:
         """Generate a fallback response if LangChain fails"""
@@ -236,28 +309,132 @@ Keep the response engaging and helpful, around 2-3 sentences for the main respon
         top_candidate = candidates[0]
         return f"Based on your request for '{query}', I found {top_candidate['name']} as your top match with a {top_candidate['score']:.1%} match score. They're located in {top_candidate['location']} and have experience in {top_candidate['skills']}. Would you like me to provide more details about their background or help you refine your search criteria?"
 
-    def process_chat_message(self, message: str) -> Dict[str, Any]:
+    def retrieve_and_analyze(self, message: str, filters: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Answer from the response cache, or retrieve candidates while the job analysis runs.
+
+        Returns a context dict with 'candidates', and either the cached
+        'message' or an 'analysis' future; a cache hit or a retrieval error
+        cancels the analysis (an LLM analysis already running finishes unused).
+        Follow-ups in a session with history depend on it, so they bypass the cache.
+        """
+        snapshot = self.index_holder.snapshot
+        history = self.conversation_memory.format_history(session_id)
+        # Most requests are analyzed locally; vaguer ones (often follow-ups that depend on
+        # the conversation) ask the LLM, starting before the query is embedded so the two overlap
+        analysis = self.analyze_locally(message, snapshot)
+        if analysis is not None:
+            analysis_future = Future()
+            analysis_future.set_result(analysis)
+        else:
+            # Run in a copy of this context so the analysis span still counts toward this request's timings
+            analysis_future = self.executor.submit(contextvars.copy_context().run,
+                                                   self.analyze_with_llm, message, history, snapshot)
+        try:
+            query_embedding = self.generate_query_embedding(message)
+            cached = None if history else self.response_cache.get(query_embedding, filters, snapshot.version)
+            if cached is not None:
+                analysis_future.cancel()
+                logging.info("Answering chat message from the response cache")
+                return {**cached, 'cached': True}
+            candidates = self.find_relevant_candidates(message, top_k=5, filters=filters,
+                                                       query_embedding=query_embedding, snapshot=snapshot)
+        except Exception:
+            analysis_future.cancel()
+            raise
+        logging.info(f"Found {len(candidates)} relevant candidates")
+        return {
+            'candidates': candidates,
+            'analysis': analysis_future,
+            'history': history,
+            'query_embedding': query_embedding,
+            'version': snapshot.version,
+            'cached': False,
+        }
+
+    def remember_response(self, context: Dict[str, Any], filters: Optional[Dict[str, Any]],
+                          analysis: Dict[str, Any], message: str) -> None:
+        """Store a completed LLM answer in the response cache; follow-ups depend on history and are not cached"""
+        if context['history'] or not message:
+            return
+        self.response_cache.put(context['query_embedding'], filters, context['version'], {
+            'analysis': analysis,
+            'candidates': context['candidates'],
+            'message': message,
+        })
+
+    def process_chat_message(self, message: str, filters: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Dict[str, Any]:
         """Process a chat message and return response with candidates"""
         try:
             logging.info(f"Processing chat message: {message}")
             
-            # Find relevant candidates
-            candidates = self.find_relevant_candidates(message, top_k=5)
-            logging.info(f"Found {len(candidates)} relevant candidates")
-            
-            # Generate AI response
-            ai_response = self.generate_chat_response(message, candidates)
-            logging.info(f"Generated AI response: {ai_response[:100]}...")
+            # Find relevant candidates while the job analysis runs
+            context = self.retrieve_and_analyze(message, filters, session_id)
+            completed = True
+            if context['cached']:
+                ai_response = context['message']
+            else:
+                # Generate AI response
+                analysis = context['analysis'].result()
+                ai_response, completed = self.generate_chat_reply(message, context['candidates'], analysis,
+                                                                  context['history'])
+                logging.info(f"Generated AI response: {ai_response[:100]}...")
+                if completed:
+                    self.remember_response(context, filters, analysis, ai_response)
+            # A fallback answer is not part of the conversation the LLM should see next time
+            if completed:
+                self.conversation_memory.append(session_id, message, ai_response)
             
             return {
                 'message': ai_response,
-                'candidates': candidates,
-                'success': True
+                'candidates': context['candidates'],
+                'success': completed,
+                'cached': context['cached'],
+                'session_id': session_id
             }
         except Exception as e:
             logging.error(f"Error processing chat message: {e}")
             return {
                 'message': f"I'm sorry, I encountered an error processing your request: {str(e)}. Please try again.",
                 'candidates': [],
-                'success': False
-            } 
\ No newline at end of file
+                'success': False,
+                'session_id': session_id
+            }
+
+    def stream_chat_message(self, message: str, filters: Optional[Dict[str, Any]] = None,
+                            session_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Process a chat message as a sequence of (event, data) pairs.
+
+        'candidates' is sent as soon as retrieval finishes, then one 'token'
+        per chunk of the LLM response, then 'done' with the full message.
+        A cached answer arrives as a single token. If the LLM fails, 'done'
+        has success False and the answer is neither cached nor remembered.
+        """
+        logging.info(f"Streaming chat message: {message}")
+        context = self.retrieve_and_analyze(message, filters, session_id)
+        yield 'candidates', {'candidates': context['candidates'], 'session_id': session_id}
+        
+        completed = True
+        if context['cached']:
+            ai_response = context['message']
+            yield 'token', {'text': ai_response}
+        else:
+            analysis = context['analysis'].result()
+            chunks = []
+            stream = self.stream_chat_response(message, context['candidates'], analysis, context['history'])
+            while True:
+                try:
+                    text = next(stream)
+                except StopIteration as stop:
+                    completed = stop.value
+                    break
+                chunks.append(text)
+                yield 'token', {'text': text}
+            ai_response = ''.join(chunks).strip()
+            if completed:
+                self.remember_response(context, filters, analysis, ai_response)
+        if completed:
+            self.conversation_memory.append(session_id, message, ai_response)
+        yield 'done', {'message': ai_response, 'success': completed, 'cached': context['cached'],
+                       'session_id': session_id}
@@ -0,0 +1,195 @@
+"""Approximate nearest neighbour (IVF) search over a saved talent index.
+
+Build offline, next to the embeddings written by index_store:
+
+    python ann_index.py build --index-dir talent_index --nlist 1024
+
+and compare recall@k / latency against exact search at several search widths:
+
+    python ann_index.py report --index-dir talent_index --k 10 --nprobe 1,4,16,64
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from index_store import load_index
+from recall_eval import add_report_arguments, print_runs, recall_sweep, sample_queries
+from talent_index import TalentIndex, normalize_rows, top_k_indices
+
+IVF_PARAMS_FILE = 'ivf.json'
+IVF_CENTROIDS_FILE = 'ivf_centroids.npy'
+IVF_OFFSETS_FILE = 'ivf_offsets.npy'
+IVF_ROWS_FILE = 'ivf_rows.npy'
+
+DEFAULT_NPROBE = 8
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Nearest (highest cosine) centroid of every row, computed in chunks"""
+    assignments = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], chunk_size):
+        chunk = np.asarray(matrix[start:start + chunk_size], dtype=np.float32)
+        assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(matrix: np.ndarray, nlist: int, iterations: int = 10,
+                    sample_size: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over a sample of the (normalized) rows"""
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    nlist = max(1, min(nlist, n))
+    sample_size = min(n, sample_size or nlist * 64)
+    sample = normalize_rows(matrix[np.sort(rng.choice(n, sample_size, replace=False))])
+
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        # Re-seed empty clusters from random sample rows
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index: rows are bucketed by nearest centroid and only the
+    ``nprobe`` buckets closest to the query are scored exactly.
+
+    Exposes the same ``search`` interface as TalentIndex, so either can serve
+    /recommend and chat retrieval.
+    """
+
+    def __init__(self, base: TalentIndex, centroids: np.ndarray, offsets: np.ndarray,
+                 rows: np.ndarray, nprobe: int = DEFAULT_NPROBE):
+        self.base = base
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, base: TalentIndex, nlist: int, iterations: int = 10,
+              nprobe: int = DEFAULT_NPROBE) -> 'IVFIndex':
+        return cls.from_centroids(base, train_centroids(base.matrix, nlist, iterations), nprobe)
+
+    @classmethod
+    def from_centroids(cls, base: TalentIndex, centroids: np.ndarray,
+                       nprobe: int = DEFAULT_NPROBE) -> 'IVFIndex':
+        """Bucket every row of base under already-trained centroids (no re-training)"""
+        assignments = _assign(base.matrix, centroids)
+        rows = np.argsort(assignments, kind='stable').astype(np.int64)
+        counts = np.bincount(assignments, minlength=centroids.shape[0])
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(base, centroids, offsets, rows, nprobe)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    @property
+    def dimension(self) -> int:
+        return self.base.dimension
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    def search(self, query_embedding: Sequence[float], top_k: int,
+               nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row_ids, scores) of the approximate top_k, best first"""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))[0]
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+
+        probes = top_k_indices(self.centroids @ query, nprobe)
+        candidates = np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in probes])
+        if candidates.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        candidates.sort()  # sequential reads from the memory-mapped matrix
+
+        scores = self.base.mask_tombstones(self.base.matrix[candidates] @ query, candidates)
+        top = top_k_indices(scores, top_k)
+        top = top[np.isfinite(scores[top])]
+        return self.base.row_ids[candidates[top]], scores[top]
+
+    def save(self, index_dir: str, embeddings_sha256: str) -> None:
+        """Persist next to the embeddings; the checksum ties it to one matrix"""
+        np.save(os.path.join(index_dir, IVF_CENTROIDS_FILE), self.centroids, allow_pickle=False)
+        np.save(os.path.join(index_dir, IVF_OFFSETS_FILE), self.offsets, allow_pickle=False)
+        np.save(os.path.join(index_dir, IVF_ROWS_FILE), self.rows, allow_pickle=False)
+        with open(os.path.join(index_dir, IVF_PARAMS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'nlist': self.nlist,
+                'nprobe': self.nprobe,
+                'embeddings_sha256': embeddings_sha256,
+            }, f, indent=2)
+
+
+def load_ivf_index(index_dir: str, base: TalentIndex, manifest: Dict[str, Any]) -> Optional['IVFIndex']:
+    """Open the IVF index saved in index_dir, or None if missing or built for other embeddings"""
+    params_path = os.path.join(index_dir, IVF_PARAMS_FILE)
+    if not os.path.exists(params_path):
+        return None
+    with open(params_path, 'r', encoding='utf-8') as f:
+        params = json.load(f)
+    if params.get('embeddings_sha256') != manifest.get('embeddings_sha256'):
+        logging.warning(f"IVF index in {index_dir} is stale; rebuild it with ann_index.py build")
+        return None
+
+    centroids = np.load(os.path.join(index_dir, IVF_CENTROIDS_FILE), allow_pickle=False)
+    offsets = np.load(os.path.join(index_dir, IVF_OFFSETS_FILE), allow_pickle=False)
+    rows = np.load(os.path.join(index_dir, IVF_ROWS_FILE), mmap_mode='r', allow_pickle=False)
+    logging.info(f"Loaded IVF index with {centroids.shape[0]} lists from {index_dir}")
+    return IVFIndex(base, centroids, offsets, rows, params.get('nprobe', DEFAULT_NPROBE))
+
+
+def recall_report(exact: TalentIndex, ivf: IVFIndex, queries: np.ndarray, k: int,
+                  nprobes: List[int]) -> Dict[str, Any]:
+    """Recall@k and per-query latency of IVF search at each nprobe, relative to exact search"""
+    report = recall_sweep(exact, queries, k, 'nprobe', nprobes, lambda q, nprobe: ivf.search(q, k, nprobe=nprobe))
+    report['nlist'] = ivf.nlist
+    report['ivf'] = report.pop('runs')
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the IVF talent search index")
+    add_report_arguments(parser)
+    parser.add_argument('--nlist', type=int, default=0,
+                        help="number of lists (default: about 4*sqrt(rows))")
+    parser.add_argument('--nprobe', default=str(DEFAULT_NPROBE),
+                        help="default search width for build, comma-separated widths for report")
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    _, base, manifest = load_index(args.index_dir)
+    index_dir = manifest['index_dir']
+    if args.command == 'build':
+        nlist = args.nlist or max(1, int(4 * np.sqrt(len(base))))
+        start = time.perf_counter()
+        ivf = IVFIndex.build(base, nlist, args.iterations, nprobe=int(args.nprobe.split(',')[0]))
+        ivf.save(index_dir, manifest['embeddings_sha256'])
+        logging.info(f"Built IVF index with {ivf.nlist} lists in {time.perf_counter() - start:.1f}s")
+        return
+
+    ivf = load_ivf_index(index_dir, base, manifest)
+    if ivf is None:
+        raise SystemExit(f"No current IVF index in {args.index_dir}; run 'build' first")
+    queries = sample_queries(base, args.queries)
+    report = recall_report(base, ivf, queries, args.k, [int(n) for n in args.nprobe.split(',')])
+
+    print(f"rows={report['rows']} nlist={report['nlist']} k={report['k']} queries={report['queries']}")
+    print_runs(report, report['ivf'], 'nprobe', args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from embedding_cache import get_embedding_cache
+from embeddings import DEFAULT_EMBEDDING_MODEL, get_embedding_backend
+from index_holder import IndexHolder, IndexSnapshot, load_snapshot
+from index_store import IndexStoreError
+from metrics import UPSTREAM_ERRORS, span
+from result_cursors import DEFAULT_DEPTH, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS, RankedResultStore
+from shard_index import get_shard_coordinator
+from upstream import get_upstream_client
+
+TALENT_CSV = 'Talent Profiles - talent_samples.csv'
+
+
+class TalentServices:
+    """Shared components of one app instance, each constructed on first use.
+
+    The talent index is loaded (or built, if none has been published) either
+    on a background thread, so the server answers liveness checks at once,
+    or synchronously via ``load_index`` before a preloading WSGI server
+    forks. Threads are only started by ``ensure_worker_started``, in the
+    process that serves requests, since they do not survive a fork.
+    """
+
+    def __init__(self):
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            # Without a key, chat is unavailable and only EMBEDDING_API_URL or lexical search can serve /recommend
+            logging.error("GEMINI_API_KEY is not set; add it to the environment or the .env file.")
+        self.embedding_model = DEFAULT_EMBEDDING_MODEL
+        # Texts per embedding API call, and job descriptions accepted per /recommend/batch request
+        self.embed_batch_size = int(os.getenv('EMBED_BATCH_SIZE', '100'))
+        self.max_batch_queries = int(os.getenv('MAX_BATCH_QUERIES', '1000'))
+        # Largest top_k (results per page) a /recommend request may ask for
+        self.max_top_k = int(os.getenv('MAX_TOP_K', '1000'))
+        self.index_dir = os.getenv('TALENT_INDEX_DIR', 'talent_index')
+        # 'exact' scans every profile; 'ivf' uses the ANN index built by `python ann_index.py build`,
+        # 'quantized' the int8/float16 codes built by `python quantized_index.py build`
+        self.search_engine = os.getenv('SEARCH_ENGINE', 'exact')
+        # Default retrieval for /recommend: 'semantic', 'lexical' (BM25, no network) or 'hybrid'
+        self.default_retrieval = os.getenv('DEFAULT_RETRIEVAL', 'semantic')
+        # Seconds between checks for a newly published index generation (0 disables hot reload)
+        self.reload_interval = float(os.getenv('INDEX_RELOAD_INTERVAL', '30'))
+        # With SHARD_URLS set, vector search fans out to shard workers (see shard_index.py)
+        self.shards = get_shard_coordinator()
+        # Results ranked for a paginated /recommend search, whose pages are all slices of that ranking
+        self.cursor_depth = int(os.getenv('CURSOR_DEPTH', DEFAULT_DEPTH))
+        self.result_cursors = RankedResultStore(
+            max_entries=int(os.getenv('CURSOR_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+            ttl=float(os.getenv('CURSOR_TTL', DEFAULT_TTL_SECONDS)),
+        )
+
+        # Set once the index has been loaded or its loading has failed
+        self.index_holder: Optional[IndexHolder] = None
+        self.state = 'starting'
+        self._lock = threading.RLock()
+        self._worker_pid = None
+        self._embedding_backend = None
+        self._chat_service = None
+        self._chat_failed = False
+
+    @property
+    def ready(self) -> bool:
+        """True once profiles are loaded and searchable"""
+        return self.index_holder is not None and self.index_holder.snapshot.profile_count > 0
+
+    @property
+    def embedding_cache(self):
+        return get_embedding_cache()
+
+    @property
+    def embedding_client(self):
+        return get_upstream_client('embedding')
+
+    @property
+    def embedding_backend(self):
+        if self._embedding_backend is None:
+            with self._lock:
+                if self._embedding_backend is None:
+                    self._embedding_backend = get_embedding_backend(self.embedding_model, api_key=self.api_key)
+        return self._embedding_backend
+
+    @property
+    def chat_available(self) -> bool:
+        return bool(self.api_key) and not self._chat_failed
+
+    @property
+    def chat_service(self):
+        """The AIChatService, imported and constructed on first use; None if unavailable"""
+        if self._chat_service is None and self.chat_available and self.index_holder is not None:
+            with self._lock:
+                if self._chat_service is None and not self._chat_failed:
+                    try:
+                        # LangChain and the Gemini SDK are slow to import; only pay for them here
+                        from ai_chat_service import AIChatService
+                        self._chat_service = AIChatService(self.api_key, self.index_holder)
+                        logging.info("AI Chat Service initialized successfully.")
+                    except Exception as e:
+                        logging.error(f"Error initializing AI Chat Service: {e}")
+                        self._chat_failed = True
+        return self._chat_service
+
+    @property
+    def loaded_chat_service(self):
+        """The chat service if it has been constructed already, without constructing it"""
+        return self._chat_service
+
+    def load_index(self) -> None:
+        """Open the published index, building it from the CSV if there is none"""
+        started = time.perf_counter()
+        self.state = 'loading'
+        snapshot = None
+        # Try to open an existing index first; its embedding matrix is memory-mapped
+        try:
+            snapshot = load_snapshot(self.index_dir, self.search_engine, self.shards)
+            logging.info(f"Successfully loaded {snapshot.profile_count} talent profiles with pre-computed embeddings.")
+        except (IndexStoreError, OSError, ValueError) as e:
+            logging.info(f"No usable talent index in {self.index_dir}: {e}")
+
+        if snapshot is None:
+            # If no saved index, build it (see build_index.py for the standalone command)
+            self.state = 'building'
+            try:
+                from build_index import build_index
+                logging.info("No saved embeddings found. Generating new embeddings...")
+                build_index(TALENT_CSV, self.index_dir, self.embedding_backend)
+                snapshot = load_snapshot(self.index_dir, self.search_engine, self.shards)
+                logging.info(f"Successfully generated and saved embeddings for {snapshot.profile_count} talent profiles.")
+            except FileNotFoundError:
+                logging.error(f"'{TALENT_CSV}' not found.")
+            except KeyError as e:
+                logging.error(f"A column was not found in the CSV: {e}.")
+            except Exception as e:
+                logging.error(f"An error occurred during data loading: {e}")
+
+        if snapshot is not None:
+            # Build the lazy indexes now rather than on the first request
+            snapshot.lexical_index
+            snapshot.filter_index
+            snapshot.payloads
+        # Request handlers read index_holder.snapshot once; re-indexing swaps it without a restart
+        self.index_holder = IndexHolder(self.index_dir, snapshot or IndexSnapshot.empty(), self.search_engine, self.shards)
+        self.state = 'ready' if snapshot is not None else 'failed'
+        logging.info(f"Talent index {self.state} after {time.perf_counter() - started:.2f}s")
+
+    def start_loading(self) -> None:
+        """Load the index on a background thread, then start the worker threads"""
+        def load():
+            self.load_index()
+            self.ensure_worker_started()
+
+        threading.Thread(target=load, name='index-loader', daemon=True).start()
+
+    def ensure_worker_started(self) -> None:
+        """Start the hot-reload watcher and chat warm-up once per serving process"""
+        if self._worker_pid == os.getpid() or self.index_holder is None:
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+        self.index_holder.start_watching(self.reload_interval)
+        threading.Thread(target=lambda: self.chat_service, name='chat-warmup', daemon=True).start()
+
+    def get_embedding(self, text, model=None, task_type="RETRIEVAL_DOCUMENT"):
+        if not isinstance(text, str) or not text.strip():
+            return None
+        model = model or self.embedding_model
+
+        def compute():
+            # Deadline, retries, hedging and circuit breaking instead of a blind rate-limit sleep
+            with span('embedding_api'):
+                return self.embedding_client.call(self.embedding_backend.embed, [text], task_type, hedge=True)[0]
+
+        try:
+            # Concurrent requests for the same text share one API call
+            return self.embedding_cache.get_or_compute(model, task_type, text, compute)
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(upstream='embedding')
+            logging.error(f"Error generating embedding: {e}")
+            return None
+
+    def get_embeddings(self, texts, model=None, task_type="RETRIEVAL_DOCUMENT"):
+        """Embed many texts: cached ones are reused, the rest go out in batched API calls.
+
+        Returns one embedding (or None if it could not be generated) per text.
+        """
+        model = model or self.embedding_model
+        embeddings = [None] * len(texts)
+        missing = {}
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or not text.strip():
+                continue
+            cached = self.embedding_cache.get(model, task_type, text)
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+
+        pending = list(missing)
+        for start in range(0, len(pending), self.embed_batch_size):
+            chunk = pending[start:start + self.embed_batch_size]
+            try:
+                with span('embedding_api'):
+                    vectors = self.embedding_client.call(self.embedding_backend.embed, chunk, task_type)
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(upstream='embedding')
+                logging.error(f"Error generating batch embeddings: {e}")
+                continue
+            for text, vector in zip(chunk, vectors):
+                vector = self.embedding_cache.put(model, task_type, text, vector)
+                for i in missing[text]:
+                    embeddings[i] = vector
+        return embeddings
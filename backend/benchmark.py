@@ -0,0 +1,293 @@
+"""Offline benchmarks against the stub Gemini APIs, with machine-readable output.
+
+    python benchmark.py --sizes 500,5000,50000 --output bench.json
+    python benchmark.py --sizes 1000000 --no-fields --endpoints recommend --concurrency 16
+
+For every profile count this generates synthetic profiles (synthetic_profiles.py),
+builds the index against the stub embedding server (stub_gemini.py), loads the
+app as a preloaded worker would and serves it over HTTP on a local port. It
+then records build and load time, latency percentiles and throughput per
+endpoint and concurrency level, and peak RSS. Each size runs in its own
+process so its memory peak is measured alone. Queries are all distinct by
+default, so every request misses the embedding and chat caches; pass
+--distinct-queries to measure a warm-cache workload instead. The chat
+endpoints need the Gemini and LangChain packages from requirements.txt even
+against the stub; without them they are skipped and listed in the report.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+ENDPOINTS = {
+    'recommend': ('/recommend', lambda q: {'job_description': q, 'top_k': 10}),
+    'recommend_weighted': ('/recommend/weighted', lambda q: {
+        'job_description': q, 'top_k': 10, 'weights': {'bio': 0.4, 'skills': 0.4, 'software': 0.2}}),
+    'chat': ('/chat', lambda q: {'message': q}),
+    'chat_stream': ('/chat/stream', lambda q: {'message': q}),
+}
+# The chat service imports these at load time, whichever chat backend it then talks to
+CHAT_ENDPOINTS = ('chat', 'chat_stream')
+CHAT_MODULES = ('google.generativeai', 'langchain', 'langchain_core')
+WARMUP_REQUESTS = 5
+
+
+def rss_mb() -> Dict[str, float]:
+    """Peak and current resident set size of this process, in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+    current_mb = None
+    try:
+        with open('/proc/self/statm') as f:
+            current_mb = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except OSError:
+        pass
+    return {'peak_rss_mb': round(peak_mb, 1), 'rss_mb': round(current_mb, 1) if current_mb else None}
+
+
+def missing_modules(names) -> List[str]:
+    """Modules among names that are not installed here"""
+    missing = []
+    for name in names:
+        try:
+            found = importlib.util.find_spec(name) is not None
+        except ModuleNotFoundError:
+            # A missing parent package, e.g. google for google.generativeai
+            found = False
+        if not found:
+            missing.append(name)
+    return missing
+
+
+def make_queries(count: int, seed: int, vocabulary) -> List[str]:
+    """Job descriptions built from the profile vocabularies, distinct for distinct seeds"""
+    rng = np.random.default_rng(seed)
+
+    def pick(column):
+        values = vocabulary.values.get(column)
+        return str(values[rng.integers(len(values))]) if values is not None and len(values) else 'video'
+
+    return [f"Looking for a {pick('Job Types')} skilled in {pick('Skills')} and {pick('Software')} "
+            f"to create {pick('Content Verticals')} content ({seed}-{i})" for i in range(count)]
+
+
+def timed_request(url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a JSON body; returns status, time to first byte and total time in milliseconds"""
+    data = json.dumps(body).encode('utf-8')
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read(1)
+            first_byte = time.perf_counter()
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        first_byte, status = time.perf_counter(), e.code
+    except OSError:
+        first_byte, status = time.perf_counter(), 0
+    end = time.perf_counter()
+    return {'status': status, 'ttfb_ms': (first_byte - start) * 1000, 'total_ms': (end - start) * 1000}
+
+
+def summarize(samples: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    ok = [s for s in samples if 200 <= s['status'] < 300]
+    summary = {'requests': len(samples), 'errors': len(samples) - len(ok),
+               'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds else None}
+    for metric in ('total_ms', 'ttfb_ms'):
+        values = np.array([s[metric] for s in ok]) if ok else np.zeros(0)
+        prefix = 'latency' if metric == 'total_ms' else 'ttfb'
+        for p in (50, 90, 99):
+            summary[f'{prefix}_p{p}_ms'] = round(float(np.percentile(values, p)), 2) if values.size else None
+        summary[f'{prefix}_mean_ms'] = round(float(values.mean()), 2) if values.size else None
+    return summary
+
+
+def run_load(base_url: str, endpoint: str, queries: List[str], concurrency: int) -> Dict[str, Any]:
+    path, make_body = ENDPOINTS[endpoint]
+    for query in queries[:WARMUP_REQUESTS]:
+        timed_request(base_url + path, make_body('warmup ' + query))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda q: timed_request(base_url + path, make_body(q)), queries))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def run_size(options: Dict[str, Any], size: int) -> Dict[str, Any]:
+    """Generate, build, load and load-test one profile count; runs in a child process"""
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.update({
+        'EMBEDDING_API_URL': options['stub_url'],
+        'CHAT_API_URL': options['stub_url'],
+        'GEMINI_API_KEY': os.getenv('GEMINI_API_KEY', 'benchmark'),
+        'INDEX_RELOAD_INTERVAL': '0',
+    })
+    from werkzeug.serving import make_server
+
+    from app import create_app
+    from build_index import build_index
+    from embeddings import get_embedding_backend
+    from synthetic_profiles import ProfileVocabulary, generate_profiles
+
+    workdir = os.path.join(options['workdir'], f'size-{size}')
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    vocabulary = ProfileVocabulary.from_csv(options['source'])
+    result: Dict[str, Any] = {'profiles': size}
+
+    start = time.perf_counter()
+    csv_path = os.path.join(workdir, 'profiles.csv')
+    generate_profiles(size, options['seed'], vocabulary).to_csv(csv_path, index=False)
+    result['generate_seconds'] = round(time.perf_counter() - start, 3)
+
+    index_root = os.path.join(workdir, 'talent_index')
+    start = time.perf_counter()
+    build_index(csv_path, index_root, get_embedding_backend(), fields=options['fields'],
+                workers=options['build_workers'], requests_per_second=options['build_rps'])
+    result['build_seconds'] = round(time.perf_counter() - start, 3)
+    result['build_rss'] = rss_mb()
+
+    os.environ['TALENT_INDEX_DIR'] = index_root
+    start = time.perf_counter()
+    app = create_app(preload=True)
+    result['load_seconds'] = round(time.perf_counter() - start, 3)
+    result['load_rss'] = rss_mb()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    result['endpoints'] = {}
+    for n, endpoint in enumerate(options['endpoints']):
+        if endpoint == 'recommend_weighted' and not options['fields']:
+            continue
+        result['endpoints'][endpoint] = {}
+        for concurrency in options['concurrency']:
+            seed = size * 1000 + n * 100 + concurrency
+            queries = make_queries(options['distinct_queries'] or options['requests'], seed, vocabulary)
+            queries = [queries[i % len(queries)] for i in range(options['requests'])]
+            stats = run_load(base_url, endpoint, queries, concurrency)
+            result['endpoints'][endpoint][str(concurrency)] = stats
+            logging.warning(f"{size} profiles, {endpoint}, concurrency {concurrency}: "
+                            f"p50 {stats['latency_p50_ms']} ms, p99 {stats['latency_p99_ms']} ms, "
+                            f"{stats['throughput_rps']} req/s, {stats['errors']} errors")
+    server.shutdown()
+    result['final_rss'] = rss_mb()
+
+    if not options['keep']:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of index build, search and chat")
+    parser.add_argument('--sizes', default='500,5000', help="comma-separated profile counts, up to 1000000")
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help=f"any of {', '.join(ENDPOINTS)}")
+    parser.add_argument('--concurrency', default='1,8', help="comma-separated client concurrency levels")
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint and concurrency level")
+    parser.add_argument('--distinct-queries', type=int, default=0,
+                        help="cycle through this many queries (0: every request is distinct)")
+    parser.add_argument('--embed-latency-ms', type=float, default=20)
+    parser.add_argument('--chat-latency-ms', type=float, default=300, help="stub time to first chat token")
+    parser.add_argument('--token-delay-ms', type=float, default=10, help="stub delay between streamed chunks")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fraction of stub calls answered with HTTP 503")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="fraction of stub calls delayed by --slow-ms")
+    parser.add_argument('--slow-ms', type=float, default=0, help="extra stub latency of the slow calls")
+    parser.add_argument('--no-fields', action='store_true', help="skip per-field embeddings (and /recommend/weighted)")
+    parser.add_argument('--build-workers', type=int, default=8)
+    parser.add_argument('--build-rps', type=float, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default='Talent Profiles - talent_samples.csv')
+    parser.add_argument('--workdir', default='benchmark_runs')
+    parser.add_argument('--keep', action='store_true', help="keep generated CSVs and indexes")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    skipped = {}
+    missing = missing_modules(CHAT_MODULES) if set(endpoints) & set(CHAT_ENDPOINTS) else []
+    if missing:
+        skipped = {e: f"missing {', '.join(missing)}" for e in endpoints if e in CHAT_ENDPOINTS}
+        endpoints = [e for e in endpoints if e not in CHAT_ENDPOINTS]
+        logging.warning(f"Skipping {', '.join(skipped)}: the chat service needs {', '.join(missing)} "
+                        f"(pip install -r requirements.txt)")
+
+    from stub_gemini import start_stub_server
+
+    stub, stub_url = start_stub_server(latency_ms=args.embed_latency_ms, chat_latency_ms=args.chat_latency_ms,
+                                       token_delay_ms=args.token_delay_ms, fail_rate=args.fail_rate,
+                                       slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    options = {
+        'stub_url': stub_url,
+        'endpoints': endpoints,
+        'concurrency': [int(c) for c in args.concurrency.split(',')],
+        'requests': args.requests,
+        'distinct_queries': args.distinct_queries,
+        'fields': not args.no_fields,
+        'build_workers': args.build_workers,
+        'build_rps': args.build_rps,
+        'seed': args.seed,
+        'source': os.path.abspath(args.source),
+        'workdir': os.path.abspath(args.workdir),
+        'keep': args.keep,
+    }
+    report = {
+        'environment': environment(),
+        'config': {**vars(args), 'endpoints': endpoints},
+        'skipped_endpoints': skipped,
+        'results': [],
+    }
+    # A fresh process per size, so peak RSS and caches do not carry over
+    context = multiprocessing.get_context('spawn')
+    for size in [int(s) for s in args.sizes.split(',')]:
+        with context.Pool(1) as pool:
+            report['results'].append(pool.apply(run_size, (options, size)))
+    report['stub_requests'] = stub.requests
+    stub.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        logging.warning(f"Wrote benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+"""Build or update the talent index from the profiles CSV.
+
+    python build_index.py --csv "Talent Profiles - talent_samples.csv" --index-dir talent_index
+
+Each profile's combined_features is keyed by a content hash. When an index
+already exists, only added or changed profiles are embedded and removed ones
+are tombstoned; the result is published as a new generation that running
+servers pick up without a restart. Pass --full to re-embed everything.
+
+Profiles are embedded in batches by a bounded pool of workers under a
+token-bucket rate limit. Every finished batch is checkpointed, so an
+interrupted build picks up where it stopped when run again.
+Set EMBEDDING_API_URL to build against a local stub (see stub_gemini.py).
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ann_index import IVFIndex, load_ivf_index
+from embeddings import DEFAULT_EMBEDDING_MODEL, get_embedding_backend
+from index_store import (IndexStoreError, current_generation_dir, load_field_index, load_index,
+                         new_generation_dir, publish_generation, save_index)
+from metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES
+from quantized_index import QuantizedIndex, load_quantized_index
+from talent_index import TalentIndex
+
+DEFAULT_CSV = 'Talent Profiles - talent_samples.csv'
+# Compact (drop tombstoned rows) once they make up this share of the index
+DEFAULT_COMPACT_RATIO = 0.25
+# Fields embedded separately for /recommend/weighted, keyed by their weight name
+FIELD_SOURCES = {
+    'bio': 'Profile Description',
+    'skills': 'Skills',
+    'software': 'Software',
+    'content_verticals': 'Content Verticals',
+    'past_creators': 'Past Creators',
+    'location': 'location',
+}
+
+
+class EmbeddingBuildError(Exception):
+    """Raised when some rows could not be embedded after all retries"""
+
+    def __init__(self, message: str, failed_rows: List[int]):
+        super().__init__(message)
+        self.failed_rows = failed_rows
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until ``tokens`` are available, then take them"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_talent_csv(csv_path: str = DEFAULT_CSV) -> pd.DataFrame:
+    """Read the profiles CSV and derive name, location, combined_features and content_hash"""
+    talent_df = pd.read_csv(csv_path)
+    talent_df.fillna('', inplace=True)
+    talent_df['name'] = talent_df['First Name'] + ' ' + talent_df['Last Name']
+    talent_df['location'] = talent_df['City'] + ', ' + talent_df['Country']
+    # Column-wise string concatenation instead of a row-wise apply
+    text = {column: talent_df[column].astype(str)
+            for column in ['Profile Description', 'Skills', 'Content Verticals', 'Past Creators']}
+    talent_df['combined_features'] = (
+        'Bio: ' + text['Profile Description'] + '. Skills: ' + text['Skills']
+        + '. Niche: ' + text['Content Verticals'] + '. Past Work: ' + text['Past Creators']
+    )
+    talent_df['content_hash'] = [content_hash(t) for t in talent_df['combined_features']]
+    return talent_df
+
+
+class BuildCheckpoint:
+    """Finished batches saved as batch_<n>.npy under a directory keyed by the build inputs"""
+
+    def __init__(self, directory: str, build_key: str):
+        self.directory = directory
+        progress_path = os.path.join(directory, 'progress.json')
+        if os.path.exists(progress_path):
+            with open(progress_path, 'r', encoding='utf-8') as f:
+                if json.load(f).get('build_key') != build_key:
+                    logging.info("Checkpoint belongs to different inputs; starting over")
+                    shutil.rmtree(directory)
+        os.makedirs(directory, exist_ok=True)
+        with open(progress_path, 'w', encoding='utf-8') as f:
+            json.dump({'build_key': build_key}, f)
+
+    def _path(self, batch: int) -> str:
+        return os.path.join(self.directory, f"batch_{batch:06d}.npy")
+
+    def has(self, batch: int) -> bool:
+        return os.path.exists(self._path(batch))
+
+    def save(self, batch: int, embeddings: np.ndarray) -> None:
+        tmp_path = self._path(batch) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, embeddings, allow_pickle=False)
+        os.replace(tmp_path, self._path(batch))
+
+    def load(self, batch: int) -> np.ndarray:
+        return np.load(self._path(batch), allow_pickle=False)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def embed_with_retries(backend, texts: List[str], task_type: str, limiter: TokenBucket,
+                       max_retries: int, backoff: float) -> np.ndarray:
+    """Embed one batch, retrying with jittered exponential backoff"""
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            embeddings = np.asarray(backend.embed(texts, task_type), dtype=np.float32)
+            if embeddings.ndim != 2 or embeddings.shape[0] != len(texts):
+                raise ValueError(f"Malformed embedding batch of shape {embeddings.shape}")
+            return embeddings
+        except Exception as e:
+            if attempt == max_retries:
+                UPSTREAM_ERRORS.inc(upstream='embedding')
+                raise
+            UPSTREAM_RETRIES.inc(upstream='embedding')
+            delay = backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            logging.warning(f"Embedding batch failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def build_embeddings(texts: List[str], backend, checkpoint_dir: str, batch_size: int = 50,
+                     workers: int = 4, requests_per_second: float = 10.0, max_retries: int = 5,
+                     backoff: float = 0.5, task_type: str = "RETRIEVAL_DOCUMENT") -> np.ndarray:
+    """Embed texts into a (len(texts), dim) matrix, resuming from checkpoint_dir if possible"""
+    build_key = hashlib.sha256(json.dumps(
+        [getattr(backend, 'model', ''), task_type, batch_size, texts]).encode('utf-8')).hexdigest()
+    checkpoint = BuildCheckpoint(checkpoint_dir, build_key)
+    batches = [(b, texts[start:start + batch_size]) for b, start in enumerate(range(0, len(texts), batch_size))]
+    pending = [(b, batch) for b, batch in batches if not checkpoint.has(b)]
+    if len(pending) < len(batches):
+        logging.info(f"Resuming build: {len(batches) - len(pending)} of {len(batches)} batches already done")
+
+    limiter = TokenBucket(requests_per_second)
+    failed_batches = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(embed_with_retries, backend, batch, task_type, limiter, max_retries, backoff): b
+            for b, batch in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            b = futures[future]
+            try:
+                checkpoint.save(b, future.result())
+            except Exception as e:
+                logging.error(f"Batch {b} failed after {max_retries} retries: {e}")
+                failed_batches.append(b)
+            if done % 10 == 0 or done == len(futures):
+                logging.info(f"  Embedded {done} of {len(futures)} batches...")
+
+    if failed_batches:
+        failed_rows = [row for b in sorted(failed_batches)
+                       for row in range(b * batch_size, min((b + 1) * batch_size, len(texts)))]
+        raise EmbeddingBuildError(
+            f"{len(failed_rows)} rows could not be embedded; run the build again to retry them",
+            failed_rows)
+
+    if not batches:
+        return np.zeros((0, 0), dtype=np.float32)
+    embeddings = np.concatenate([checkpoint.load(b) for b, _ in batches])
+    checkpoint.clear()
+    return embeddings
+
+
+def field_texts(talent_df: pd.DataFrame) -> List[List[str]]:
+    """Text of every FIELD_SOURCES column, one list per field"""
+    return [talent_df[column].astype(str).str.strip(' ,').tolist() for column in FIELD_SOURCES.values()]
+
+
+def build_field_embeddings(talent_df: pd.DataFrame, backend, checkpoint_dir: str, dimension: int,
+                           **options) -> np.ndarray:
+    """(fields, rows, dimension) embeddings of each FIELD_SOURCES column.
+
+    Identical texts (a shared city, the same software list) are embedded
+    once; empty fields get a zero vector and so contribute no score.
+    """
+    texts = field_texts(talent_df)
+    unique = sorted({text for column in texts for text in column if text})
+    embedded = build_embeddings(unique, backend, checkpoint_dir, **options)
+    position = {text: i for i, text in enumerate(unique)}
+    stacked = np.zeros((len(FIELD_SOURCES), len(talent_df), dimension), dtype=np.float32)
+    for f, column in enumerate(texts):
+        rows = [row for row, text in enumerate(column) if text]
+        if rows:
+            stacked[f, rows] = embedded[[position[column[row]] for row in rows]]
+    return stacked
+
+
+def merge_profiles(talent_df: pd.DataFrame, previous_df: pd.DataFrame, previous_index: TalentIndex):
+    """Match new profiles to live rows of the previous generation by content hash.
+
+    Returns (merged_df, tombstones, to_embed): previous rows whose content is
+    still present get their metadata refreshed, the rest are tombstoned, and
+    ``to_embed`` lists the new profiles (positions in talent_df) to append.
+    """
+    previous_hashes = (previous_df['content_hash'] if 'content_hash' in previous_df
+                       else previous_df['combined_features'].astype(str).map(content_hash))
+    dead = (previous_index.tombstones if previous_index.tombstones is not None
+            else np.zeros(len(previous_df), dtype=bool))
+
+    live_positions = defaultdict(list)
+    for position, (row_hash, is_dead) in enumerate(zip(previous_hashes, dead)):
+        if not is_dead:
+            live_positions[row_hash].append(position)
+
+    reused_rows, reused_positions, to_embed = [], [], []
+    for row, row_hash in enumerate(talent_df['content_hash']):
+        if live_positions[row_hash]:
+            reused_rows.append(row)
+            reused_positions.append(live_positions[row_hash].pop())
+        else:
+            to_embed.append(row)
+
+    merged_df = previous_df.reindex(columns=talent_df.columns)
+    merged_df.iloc[reused_positions] = talent_df.iloc[reused_rows].values
+    tombstones = np.ones(len(previous_df), dtype=bool)
+    tombstones[reused_positions] = False
+    return merged_df, tombstones, to_embed
+
+
+def build_index(csv_path: str, index_root: str, backend=None, full: bool = False,
+                compact_ratio: float = DEFAULT_COMPACT_RATIO, fields: bool = True,
+                **options) -> Dict[str, Any]:
+    """Embed new or changed profiles from csv_path and publish a new index generation.
+
+    With ``fields`` the per-field embeddings used by /recommend/weighted are
+    built (or updated) too.
+    """
+    backend = backend or get_embedding_backend()
+    model = getattr(backend, 'model', DEFAULT_EMBEDDING_MODEL)
+    talent_df = load_talent_csv(csv_path)
+    checkpoint_dir = f"{index_root.rstrip(os.sep)}.build"
+    field_checkpoint_dir = f"{index_root.rstrip(os.sep)}.build-fields"
+
+    previous = None
+    if not full and current_generation_dir(index_root):
+        try:
+            previous = load_index(index_root)
+        except (IndexStoreError, OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable previous index: {e}")
+        if previous is not None and previous[2].get('model') != model:
+            logging.info("Embedding model changed; re-embedding every profile")
+            previous = None
+
+    start = time.perf_counter()
+    field_stacked, stale_field_rows = None, None
+    if previous is None:
+        logging.info(f"Embedding {len(talent_df)} talent profiles...")
+        merged_df, tombstones = talent_df, None
+        embeddings = build_embeddings(talent_df['combined_features'].tolist(), backend,
+                                      checkpoint_dir=checkpoint_dir, **options)
+    else:
+        previous_df, previous_index, previous_manifest = previous
+        previous_fields = load_field_index(previous_manifest, previous_index)
+        if previous_fields is not None and previous_fields.fields != list(FIELD_SOURCES):
+            previous_fields = None
+        merged_df, tombstones, to_embed = merge_profiles(talent_df, previous_df, previous_index)
+        removed = int(tombstones.sum()) - previous_manifest.get('tombstones', 0)
+        fields_current = previous_fields is not None or not fields
+        if (not to_embed and removed == 0 and fields_current
+                and merged_df.equals(previous_df.reindex(columns=talent_df.columns))):
+            logging.info("Talent index is up to date")
+            return previous_manifest
+
+        logging.info(f"Incremental re-index: {len(to_embed)} added or changed, {removed} removed")
+        new_embeddings = build_embeddings(
+            talent_df['combined_features'].iloc[to_embed].tolist(), backend,
+            checkpoint_dir=checkpoint_dir, **options)
+        if new_embeddings.size == 0:
+            new_embeddings = np.zeros((0, previous_index.dimension), dtype=np.float32)
+        if fields and previous_fields is not None:
+            # Reused rows keep their field embeddings unless a field's text changed
+            changed = np.zeros(len(previous_df), dtype=bool)
+            for new_text, old_text in zip(field_texts(merged_df), field_texts(previous_df)):
+                changed |= np.array([a != b for a, b in zip(new_text, old_text)], dtype=bool)
+            stale_field_rows = np.concatenate([np.flatnonzero(changed & ~tombstones),
+                                               len(previous_df) + np.arange(len(to_embed))])
+            field_stacked = np.concatenate([
+                np.asarray(previous_fields.stacked),
+                np.zeros((len(FIELD_SOURCES), len(to_embed), previous_index.dimension), dtype=np.float32),
+            ], axis=1)
+        merged_df = pd.concat([merged_df, talent_df.iloc[to_embed]], ignore_index=True)
+        embeddings = np.concatenate([np.asarray(previous_index.matrix), new_embeddings])
+        tombstones = np.concatenate([tombstones, np.zeros(len(to_embed), dtype=bool)])
+
+    if fields:
+        dimension = embeddings.shape[1] if embeddings.ndim == 2 else 0
+        if field_stacked is None:
+            field_stacked = build_field_embeddings(merged_df, backend, field_checkpoint_dir, dimension, **options)
+        elif len(stale_field_rows):
+            field_stacked[:, stale_field_rows] = build_field_embeddings(
+                merged_df.iloc[stale_field_rows], backend, field_checkpoint_dir, dimension, **options)
+
+    if tombstones is not None and tombstones.sum() > compact_ratio * len(tombstones):
+        logging.info(f"Compacting away {int(tombstones.sum())} tombstoned rows")
+        merged_df = merged_df[~tombstones].reset_index(drop=True)
+        embeddings = embeddings[~tombstones]
+        if field_stacked is not None:
+            field_stacked = field_stacked[:, ~tombstones]
+        tombstones = None
+    logging.info(f"Embedded profiles in {time.perf_counter() - start:.1f}s")
+
+    generation_dir = new_generation_dir(index_root)
+    manifest = save_index(generation_dir, merged_df, embeddings, model, tombstones,
+                          extra={'generation': os.path.basename(generation_dir)},
+                          field_embeddings=field_stacked, fields=list(FIELD_SOURCES) if fields else None)
+
+    # Keep an existing ANN index usable by re-bucketing rows under its trained centroids,
+    # and an existing quantized index by re-quantizing with the same dtype
+    if previous is not None:
+        previous_ivf = load_ivf_index(previous[2]['index_dir'], previous[1], previous[2])
+        previous_quantized = load_quantized_index(previous[2]['index_dir'], previous[1], previous[2])
+        if previous_ivf is not None or previous_quantized is not None:
+            _, new_index, _ = load_index(generation_dir)
+        if previous_ivf is not None:
+            IVFIndex.from_centroids(new_index, previous_ivf.centroids, previous_ivf.nprobe).save(
+                generation_dir, manifest['embeddings_sha256'])
+        if previous_quantized is not None:
+            QuantizedIndex.build(new_index, previous_quantized.dtype, previous_quantized.rescore).save(
+                generation_dir, manifest['embeddings_sha256'])
+
+    publish_generation(index_root, generation_dir)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the talent embedding index")
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--index-dir', default=os.getenv('TALENT_INDEX_DIR', 'talent_index'))
+    parser.add_argument('--model', default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rps', type=float, default=10.0, help="embedding requests per second")
+    parser.add_argument('--max-retries', type=int, default=5)
+    parser.add_argument('--full', action='store_true', help="re-embed every profile")
+    parser.add_argument('--no-fields', action='store_true',
+                        help="skip the per-field embeddings used by /recommend/weighted")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not os.getenv('EMBEDDING_API_URL'):
+        import google.generativeai as genai
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+    try:
+        manifest = build_index(args.csv, args.index_dir, get_embedding_backend(args.model),
+                               full=args.full, fields=not args.no_fields, batch_size=args.batch_size, workers=args.workers,
+                               requests_per_second=args.rps, max_retries=args.max_retries)
+    except EmbeddingBuildError as e:
+        raise SystemExit(str(e))
+    print(f"Built index with {manifest['rows']} rows in {args.index_dir}")
+
+
+if __name__ == '__main__':
+    main()
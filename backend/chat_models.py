@@ -0,0 +1,83 @@
+import json
+import os
+import urllib.request
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from upstream import get_connection_pool
+
+DEFAULT_CHAT_MODEL = "gemini-2.0-flash"
+
+
+def _role(message: BaseMessage) -> str:
+    return {'human': 'user', 'ai': 'assistant'}.get(message.type, message.type)
+
+
+class HttpChatModel(BaseChatModel):
+    """LangChain chat model backed by a JSON endpoint, e.g. the local stub in stub_gemini.py.
+
+    POST {base_url}/chat with {"model", "messages": [{"role", "content"}], "stream"};
+    expects {"text": ...} back, or one such JSON object per line when streaming.
+    Blocking calls reuse kept-alive connections; streams get their own.
+    """
+
+    base_url: str
+    model: str = DEFAULT_CHAT_MODEL
+    timeout: float = 60.0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'http-chat'
+
+    def _body(self, messages: List[BaseMessage], stream: bool) -> bytes:
+        return json.dumps({
+            'model': self.model,
+            'messages': [{'role': _role(m), 'content': m.content} for m in messages],
+            'stream': stream,
+        }).encode('utf-8')
+
+    def _request(self, messages: List[BaseMessage], stream: bool):
+        req = urllib.request.Request(f"{self.base_url.rstrip('/')}/chat", data=self._body(messages, stream),
+                                     headers={'Content-Type': 'application/json'})
+        return urllib.request.urlopen(req, timeout=self.timeout)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        pool = get_connection_pool(self.base_url.rstrip('/'), self.timeout)
+        status, data = pool.post('/chat', self._body(messages, stream=False), {'Content-Type': 'application/json'})
+        if status != 200:
+            raise IOError(f"Chat endpoint returned HTTP {status}: {data[:200]!r}")
+        text = json.loads(data)['text']
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        with self._request(messages, stream=True) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                text = json.loads(line)['text']
+                if run_manager:
+                    run_manager.on_llm_new_token(text)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+def get_chat_model(api_key: str, model: str = DEFAULT_CHAT_MODEL, base_url: Optional[str] = None,
+                   timeout: float = 60.0):
+    """Gemini by default; set CHAT_API_URL to use an HTTP endpoint such as the local stub"""
+    base_url = base_url or os.getenv('CHAT_API_URL')
+    if base_url:
+        return HttpChatModel(base_url=base_url, model=model, timeout=timeout)
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=api_key,
+        temperature=0.7,
+        max_output_tokens=2048,
+        timeout=timeout
+    )
@@ -0,0 +1,193 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_TOKENS = 1000
+DEFAULT_IDLE_SECONDS = 1800.0
+DEFAULT_MAX_SESSIONS = 10000
+# Share of the token budget reserved for the summary of turns that no longer fit
+SUMMARY_SHARE = 0.25
+EVICT_INTERVAL = 60.0
+# Locks that serialize updates to the same session, shared by hash of the session id
+SESSION_LOCK_STRIPES = 64
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max(max_tokens, 1) * 4
+    return text if len(text) <= max_chars else text[:max_chars - 3].rstrip() + '...'
+
+
+class InMemorySessionBackend:
+    """Sessions held in this process, least recently used evicted beyond max_sessions"""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def put(self, session_id: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self, cutoff: float) -> int:
+        with self._lock:
+            idle = [sid for sid, state in self._sessions.items() if state['updated'] < cutoff]
+            for session_id in idle:
+                del self._sessions[session_id]
+            return len(idle)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionBackend:
+    """Sessions in a SQLite file that several worker processes can share"""
+
+    def __init__(self, db_path: str):
+        self._db = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions '
+            '(session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)')
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute('SELECT state FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, session_id: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO sessions (session_id, state, updated) VALUES (?, ?, ?)',
+                             (session_id, json.dumps(state), state['updated']))
+            self._db.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            self._db.commit()
+
+    def evict_idle(self, cutoff: float) -> int:
+        with self._lock:
+            deleted = self._db.execute('DELETE FROM sessions WHERE updated < ?', (cutoff,)).rowcount
+            self._db.commit()
+            return deleted
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+
+class ConversationMemory:
+    """Per-session chat history kept within a token budget.
+
+    A session holds its most recent turns verbatim; when they exceed
+    ``max_tokens`` the oldest turns are folded into a short running summary
+    of earlier requests, itself truncated to a fixed share of the budget.
+    Sessions idle for longer than ``idle_seconds`` are evicted. Updates to
+    one session are serialized within this process, so concurrent requests
+    in a session do not overwrite each other's turns.
+    """
+
+    def __init__(self, backend=None, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 idle_seconds: float = DEFAULT_IDLE_SECONDS):
+        self.backend = backend if backend is not None else InMemorySessionBackend()
+        self.max_tokens = max_tokens
+        self.idle_seconds = idle_seconds
+        self._last_eviction = time.time()
+        self._session_locks = [threading.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+
+    def load(self, session_id: Optional[str]) -> Dict[str, Any]:
+        """State of a live session, or a fresh one"""
+        state = self.backend.get(session_id) if session_id else None
+        if state is None or state['updated'] < time.time() - self.idle_seconds:
+            return {'summary': '', 'turns': [], 'updated': time.time()}
+        return state
+
+    def format_history(self, session_id: Optional[str]) -> str:
+        """Conversation so far as prompt text, empty for a new session"""
+        state = self.load(session_id)
+        lines = []
+        if state['summary']:
+            lines.append(f"Earlier in this conversation the user asked about: {state['summary']}")
+        for turn in state['turns']:
+            speaker = 'User' if turn['role'] == 'user' else 'Assistant'
+            lines.append(f"{speaker}: {turn['content']}")
+        return '\n'.join(lines)
+
+    def append(self, session_id: Optional[str], user_message: str, ai_message: str) -> None:
+        """Record one exchange and trim the session back within its token budget"""
+        if not session_id:
+            return
+        with self._session_locks[hash(session_id) % SESSION_LOCK_STRIPES]:
+            state = self.load(session_id)
+            summary_budget = int(self.max_tokens * SUMMARY_SHARE)
+            turn_budget = self.max_tokens - summary_budget
+            # Each message gets at most half of the turn budget (less the one token estimate_tokens adds),
+            # so the newest exchange always fits and is never trimmed away
+            per_message = max(turn_budget // 2 - 1, 1)
+            state['turns'].append({'role': 'user', 'content': _truncate(user_message, per_message)})
+            state['turns'].append({'role': 'assistant', 'content': _truncate(ai_message, per_message)})
+
+            dropped = []
+            # Drop whole exchanges, so the history never opens with a reply to a missing request
+            while state['turns'] and sum(estimate_tokens(t['content']) for t in state['turns']) > turn_budget:
+                turn = state['turns'].pop(0)
+                if turn['role'] == 'user':
+                    dropped.append(turn['content'])
+                    if state['turns'] and state['turns'][0]['role'] == 'assistant':
+                        state['turns'].pop(0)
+            if dropped:
+                # Keep the most recent requests when the summary itself runs out of room
+                summary = '; '.join(filter(None, [state['summary']] + dropped))
+                max_chars = summary_budget * 4
+                state['summary'] = summary if len(summary) <= max_chars else '...' + summary[-(max_chars - 3):]
+
+            state['updated'] = time.time()
+            self.backend.put(session_id, state)
+        self._maybe_evict()
+
+    def clear(self, session_id: str) -> None:
+        self.backend.delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'sessions': self.backend.count(), 'max_tokens': self.max_tokens}
+
+    def _maybe_evict(self) -> None:
+        now = time.time()
+        if now - self._last_eviction < EVICT_INTERVAL:
+            return
+        self._last_eviction = now
+        try:
+            evicted = self.backend.evict_idle(now - self.idle_seconds)
+        except sqlite3.Error as e:
+            logging.warning(f"Session eviction failed: {e}")
+            return
+        if evicted:
+            logging.info(f"Evicted {evicted} idle chat sessions")
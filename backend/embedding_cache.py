@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from single_flight import SingleFlight
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_DISK_ENTRIES = 1000000
+
+
+def cache_key(model: str, task_type: str, text: str) -> str:
+    """Key on (model, task_type, whitespace-normalized text hash)"""
+    normalized = ' '.join(text.split())
+    return hashlib.sha256(f"{model}\0{task_type}\0{normalized}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Size-bounded LRU cache of embeddings, with an optional SQLite tier on disk.
+
+    The SQLite file can be shared by several worker processes; entries found
+    there are promoted into the in-memory LRU. Vectors are float32 arrays.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, db_path: Optional[str] = None,
+                 max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_writes = 0
+        self._flights = SingleFlight('embedding')
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings '
+                '(key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL)')
+            self._db.commit()
+
+    def get(self, model: str, task_type: str, text: str) -> Optional[np.ndarray]:
+        key = cache_key(model, task_type, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        vector = self._disk_get(key)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, vector)
+        return vector
+
+    def put(self, model: str, task_type: str, text: str, vector) -> np.ndarray:
+        key = cache_key(model, task_type, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._remember(key, vector)
+        self._disk_put(key, vector)
+        return vector
+
+    def get_or_compute(self, model: str, task_type: str, text: str,
+                       compute: Callable[[], Optional[list]]) -> Optional[np.ndarray]:
+        """Return the cached embedding, or compute, store and return it.
+
+        Concurrent misses for the same key share a single compute call, and
+        all of them see its exception if it fails.
+        """
+        vector = self.get(model, task_type, text)
+        if vector is not None:
+            return vector
+        key = cache_key(model, task_type, text)
+        return self._flights.do(key, self._compute_and_put, key, model, task_type, text, compute)
+
+    def _compute_and_put(self, key: str, model: str, task_type: str, text: str,
+                         compute: Callable[[], Optional[list]]) -> Optional[np.ndarray]:
+        # An identical call may have finished and stored it since our lookup missed
+        with self._lock:
+            vector = self._entries.get(key)
+        if vector is not None:
+            return vector
+        vector = compute()
+        if vector is None:
+            return None
+        return self.put(model, task_type, text, vector)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute('SELECT vector FROM embeddings WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Embedding cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        vector.setflags(write=False)
+        return vector
+
+    def _disk_put(self, key: str, vector: np.ndarray) -> None:
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute('INSERT OR REPLACE INTO embeddings (key, vector, created) VALUES (?, ?, ?)',
+                                 (key, vector.tobytes(), time.time()))
+                self._disk_writes += 1
+                # Trim the oldest rows now and then rather than on every write
+                if self._disk_writes % 1000 == 0:
+                    self._db.execute(
+                        'DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings '
+                        'ORDER BY created DESC LIMIT -1 OFFSET ?)', (self.max_disk_entries,))
+                self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Embedding cache write failed: {e}")
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache shared by /recommend and the chat service.
+
+    EMBEDDING_CACHE_SIZE bounds the in-memory LRU; EMBEDDING_CACHE_DB enables
+    the SQLite tier shared between workers.
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache(
+                max_entries=int(os.getenv('EMBEDDING_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+                db_path=os.getenv('EMBEDDING_CACHE_DB') or None,
+            )
+        return _shared_cache
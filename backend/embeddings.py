@@ -0,0 +1,62 @@
+import json
+import os
+from typing import List, Optional
+
+from upstream import get_connection_pool
+
+DEFAULT_EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+class GeminiEmbeddingBackend:
+    """Embeds batches of texts with the Gemini embedding API, importing the SDK on first use"""
+
+    def __init__(self, model: str = DEFAULT_EMBEDDING_MODEL, api_key: Optional[str] = None,
+                 timeout: float = 30.0):
+        self.model = model
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        self.timeout = timeout
+        self._configured = False
+
+    def embed(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        import google.generativeai as genai
+
+        if not self._configured and self.api_key:
+            genai.configure(api_key=self.api_key)
+            self._configured = True
+        result = genai.embed_content(model=self.model, content=list(texts), task_type=task_type,
+                                     request_options={'timeout': self.timeout})
+        return result['embedding']
+
+
+class HttpEmbeddingBackend:
+    """Embeds batches of texts through a JSON endpoint, e.g. the local stub in stub_gemini.py.
+
+    POST {base_url}/embed with {"model", "task_type", "texts"} and expect
+    {"embeddings": [[...], ...]} back, one vector per text. Connections are
+    kept alive and reused per thread.
+    """
+
+    def __init__(self, base_url: str, model: str = DEFAULT_EMBEDDING_MODEL, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.pool = get_connection_pool(self.base_url, timeout)
+
+    def embed(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        body = json.dumps({'model': self.model, 'task_type': task_type, 'texts': list(texts)}).encode('utf-8')
+        status, data = self.pool.post('/embed', body, {'Content-Type': 'application/json'})
+        if status != 200:
+            raise IOError(f"Embedding endpoint returned HTTP {status}: {data[:200]!r}")
+        embeddings = json.loads(data)['embeddings']
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        return embeddings
+
+
+def get_embedding_backend(model: str = DEFAULT_EMBEDDING_MODEL, base_url: Optional[str] = None,
+                          api_key: Optional[str] = None):
+    """Gemini by default; set EMBEDDING_API_URL to use an HTTP endpoint such as the local stub"""
+    base_url = base_url or os.getenv('EMBEDDING_API_URL')
+    if base_url:
+        return HttpEmbeddingBackend(base_url, model)
+    return GeminiEmbeddingBackend(model, api_key)
@@ -0,0 +1,139 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Filter keys accepted in requests, mapped to talent CSV columns
+CATEGORICAL_FIELDS = {
+    'country': 'Country',
+    'city': 'City',
+    'job_types': 'Job Types',
+    'software': 'Software',
+    'platforms': 'Platforms',
+    'content_verticals': 'Content Verticals',
+}
+NUMERIC_FIELDS = {
+    'monthly_rate': 'Monthly Rate',
+    'hourly_rate': 'Hourly Rate',
+    'views': '# of Views by Creators',
+}
+RANGE_OPERATORS = {'gt', 'gte', 'lt', 'lte'}
+SET_OPERATORS = {'any', 'all', 'none'}
+
+
+class FilterError(ValueError):
+    """Raised for filter expressions that reference unknown fields or operators"""
+
+
+def _values(cell) -> List[str]:
+    return [v.strip().lower() for v in str(cell).split(',') if v.strip()]
+
+
+class FilterIndex:
+    """Posting lists for categorical fields and sorted arrays for numeric ones.
+
+    A filter expression is a dict of field -> condition, all of which must hold:
+
+        {"country": ["United States", "Canada"],          # any of these
+         "software": {"all": ["Final Cut Pro"]},          # any / all / none
+         "monthly_rate": {"gte": 1000, "lte": 5000}}      # gt / gte / lt / lte
+
+    ``evaluate`` turns it into the sorted row positions that pass, using only
+    set operations on the precomputed lists, so similarity scoring can be
+    restricted to the surviving rows.
+    """
+
+    def __init__(self, talent_df: pd.DataFrame):
+        start = time.perf_counter()
+        self.size = len(talent_df)
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+        for key, column in CATEGORICAL_FIELDS.items():
+            if column not in talent_df:
+                continue
+            rows_by_value = defaultdict(list)
+            for row, cell in enumerate(talent_df[column].tolist()):
+                for value in set(_values(cell)):
+                    rows_by_value[value].append(row)
+            self.postings[key] = {value: np.asarray(rows, dtype=np.int64) for value, rows in rows_by_value.items()}
+
+        # Sorted values plus the row each came from; rows without a number are left out
+        self.sorted_values: Dict[str, np.ndarray] = {}
+        self.sorted_rows: Dict[str, np.ndarray] = {}
+        for key, column in NUMERIC_FIELDS.items():
+            if column not in talent_df:
+                continue
+            values = pd.to_numeric(talent_df[column], errors='coerce').to_numpy(dtype=np.float64)
+            rows = np.flatnonzero(~np.isnan(values))
+            order = np.argsort(values[rows], kind='stable')
+            self.sorted_values[key] = values[rows][order]
+            self.sorted_rows[key] = rows[order]
+        logging.info(f"Built filter index over {self.size} profiles in {time.perf_counter() - start:.2f}s")
+
+    def _categorical(self, key: str, condition) -> np.ndarray:
+        if isinstance(condition, (str, list)):
+            condition = {'any': condition}
+        if not isinstance(condition, dict) or not set(condition) <= SET_OPERATORS:
+            raise FilterError(f"'{key}' takes a value, a list, or an object with any/all/none")
+
+        postings = self.postings[key]
+        empty = np.empty(0, dtype=np.int64)
+        rows = None
+        for operator, values in condition.items():
+            values = [values] if isinstance(values, str) else values
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise FilterError(f"'{key}' {operator} takes a value or a list of values")
+            lists = [postings.get(str(v).strip().lower(), empty) for v in values]
+            if operator == 'any':
+                matched = np.unique(np.concatenate(lists)) if lists else empty
+            elif operator == 'all':
+                matched = lists[0] if lists else np.arange(self.size)
+                for other in lists[1:]:
+                    matched = np.intersect1d(matched, other, assume_unique=True)
+            else:
+                excluded = np.unique(np.concatenate(lists)) if lists else empty
+                matched = np.setdiff1d(np.arange(self.size), excluded, assume_unique=True)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        return rows if rows is not None else np.arange(self.size)
+
+    def _numeric(self, key: str, condition) -> np.ndarray:
+        if not isinstance(condition, dict) or not condition or not set(condition) <= RANGE_OPERATORS:
+            raise FilterError(f"'{key}' takes an object with gt/gte/lt/lte bounds")
+        values = self.sorted_values[key]
+        low, high = 0, len(values)
+        try:
+            if 'gte' in condition:
+                low = max(low, np.searchsorted(values, float(condition['gte']), side='left'))
+            if 'gt' in condition:
+                low = max(low, np.searchsorted(values, float(condition['gt']), side='right'))
+            if 'lte' in condition:
+                high = min(high, np.searchsorted(values, float(condition['lte']), side='right'))
+            if 'lt' in condition:
+                high = min(high, np.searchsorted(values, float(condition['lt']), side='left'))
+        except (TypeError, ValueError):
+            raise FilterError(f"Bounds for '{key}' must be numbers")
+        return np.sort(self.sorted_rows[key][low:max(low, high)])
+
+    def evaluate(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Sorted row positions matching every condition, or None when there are no filters"""
+        if not filters:
+            return None
+        if not isinstance(filters, dict):
+            raise FilterError("filters must be an object of field conditions")
+
+        rows = None
+        # Evaluate numeric ranges first: they are usually the most selective
+        for key in sorted(filters, key=lambda k: k not in NUMERIC_FIELDS):
+            if key in self.postings:
+                matched = self._categorical(key, filters[key])
+            elif key in self.sorted_values:
+                matched = self._numeric(key, filters[key])
+            else:
+                known = sorted(set(CATEGORICAL_FIELDS) | set(NUMERIC_FIELDS))
+                raise FilterError(f"Unknown filter field '{key}'; expected one of {', '.join(known)}")
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if rows.size == 0:
+                break
+        return rows
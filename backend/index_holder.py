@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ann_index import load_ivf_index
+from filter_index import FilterIndex
+from job_analyzer import JobRequirementAnalyzer
+from index_store import current_generation_dir, load_field_index, load_index
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from metrics import span
+from payloads import ProfilePayloads
+from quantized_index import load_quantized_index
+from shard_index import ShardError
+from talent_index import TalentIndex
+
+RETRIEVAL_MODES = ('semantic', 'lexical', 'hybrid')
+# How many candidates each retriever contributes before rank fusion, per requested result
+HYBRID_DEPTH_FACTOR = 4
+
+
+class IndexSnapshot:
+    """One immutable generation of the talent index: profiles, vectors and optional ANN or quantized index.
+
+    Request handlers read ``holder.snapshot`` once and use that object for the
+    whole request, so a concurrent hot reload never mixes two generations.
+    With a ShardCoordinator as ``shards``, vector scoring runs on the shard
+    workers and the local matrices are only memory-mapped, never scanned.
+    """
+
+    def __init__(self, talent_df: pd.DataFrame, talent_index: TalentIndex,
+                 manifest: Optional[Dict[str, Any]] = None, ivf_index=None, field_index=None,
+                 quantized_index=None, shards=None):
+        self.talent_df = talent_df
+        self.talent_index = talent_index
+        self.manifest = manifest or {}
+        self.ivf_index = ivf_index
+        self.quantized_index = quantized_index
+        self.field_index = field_index
+        self.shards = shards
+        self._lexical_index = None
+        self._filter_index = None
+        self._payloads = None
+        self._job_analyzer = None
+        self._build_lock = threading.Lock()
+
+    @classmethod
+    def empty(cls) -> 'IndexSnapshot':
+        talent_df = pd.DataFrame()
+        return cls(talent_df, TalentIndex.from_dataframe(talent_df))
+
+    @property
+    def version(self) -> str:
+        """Identifies the generation; changes whenever the index content changes"""
+        return f"{self.manifest.get('generation', '')}:{self.manifest.get('embeddings_sha256', '')[:16]}"
+
+    @property
+    def profile_count(self) -> int:
+        return self.talent_index.live_count
+
+    def search(self, query_embedding, top_k: int, exact: bool = False,
+               nprobe: Optional[int] = None, rows: Optional[np.ndarray] = None,
+               weights: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Rank profiles with the ANN or quantized index if loaded, unless exact search is requested.
+
+        Filtered searches (``rows`` given) bypass the ANN index and score the
+        surviving rows exactly, or through the quantized codes if loaded.
+        ``weights`` scores against the per-field embeddings instead (see
+        FieldIndex); raises ValueError for unknown fields or invalid weights.
+        """
+        if weights and self.field_index is not None:
+            return self.field_index.search(query_embedding, weights, top_k, rows)
+        if self.ivf_index is not None and not exact and rows is None:
+            return self.ivf_index.search(query_embedding, top_k, nprobe=nprobe)
+        if self.quantized_index is not None and not exact:
+            return self.quantized_index.search(query_embedding, top_k, rows)
+        return self.talent_index.search(query_embedding, top_k, rows=rows)
+
+    @property
+    def lexical_index(self) -> LexicalIndex:
+        """BM25 index over the vocabulary fields, built on first use"""
+        if self._lexical_index is None:
+            with self._build_lock:
+                if self._lexical_index is None:
+                    self._lexical_index = LexicalIndex(self.talent_df)
+        return self._lexical_index
+
+    @property
+    def filter_index(self) -> FilterIndex:
+        """Posting lists and sorted arrays for structured filters, built on first use"""
+        if self._filter_index is None:
+            with self._build_lock:
+                if self._filter_index is None:
+                    self._filter_index = FilterIndex(self.talent_df)
+        return self._filter_index
+
+    @property
+    def payloads(self) -> ProfilePayloads:
+        """Pre-serialized response fields of every profile, built on first use"""
+        if self._payloads is None:
+            with self._build_lock:
+                if self._payloads is None:
+                    self._payloads = ProfilePayloads(self.talent_df)
+        return self._payloads
+
+    @property
+    def job_analyzer(self) -> JobRequirementAnalyzer:
+        """Local chat job analysis over this generation's vocabularies, built on first use"""
+        if self._job_analyzer is None:
+            with self._build_lock:
+                if self._job_analyzer is None:
+                    self._job_analyzer = JobRequirementAnalyzer(self.talent_df)
+        return self._job_analyzer
+
+    def retrieve(self, query: str, query_embedding, top_k: int, mode: str = 'semantic',
+                 exact: bool = False, nprobe: Optional[int] = None,
+                 filters: Optional[Dict[str, Any]] = None,
+                 weights: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray, str]:
+        """Rank profiles by 'semantic', 'lexical' or 'hybrid' (reciprocal rank fusion) retrieval.
+
+        ``filters`` (see FilterIndex) are resolved to row positions first and
+        only those rows are scored; raises FilterError for invalid filters.
+        Without a query embedding (e.g. the embedding API is down), or when
+        no shard answers, this falls back to lexical retrieval.
+        Returns (row_ids, scores, mode actually used).
+        """
+        with span('filter'):
+            rows = self.filter_index.evaluate(filters)
+        if rows is not None and rows.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), mode
+        semantic = None
+        depth = max(top_k * HYBRID_DEPTH_FACTOR, 50) if mode == 'hybrid' else top_k
+        if query_embedding is not None and mode != 'lexical':
+            try:
+                with span('semantic_search'):
+                    semantic = self.semantic_search(query_embedding, depth, exact, nprobe, rows, filters, weights)
+            except ShardError as e:
+                logging.warning(f"{e}; falling back to lexical retrieval")
+        if semantic is None:
+            mode = 'lexical'
+        tombstones = self.talent_index.tombstones
+        if mode == 'lexical':
+            with span('lexical_search'):
+                row_ids, scores = self.lexical_index.search(query, top_k, tombstones, rows)
+            return row_ids, scores, mode
+        if mode == 'hybrid':
+            with span('lexical_search'):
+                lexical_ids, _ = self.lexical_index.search(query, depth, tombstones, rows)
+            with span('rank_fusion'):
+                row_ids, scores = reciprocal_rank_fusion([semantic[0], lexical_ids], top_k)
+            return row_ids, scores, mode
+        row_ids, scores = semantic
+        return row_ids, scores, 'semantic'
+
+    def semantic_search(self, query_embedding, top_k: int, exact: bool = False, nprobe: Optional[int] = None,
+                        rows: Optional[np.ndarray] = None, filters: Optional[Dict[str, Any]] = None,
+                        weights: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Vector search on the shard workers if sharded (raising ShardError if none answers), else locally"""
+        if self.shards is not None:
+            return self.shards.search(query_embedding, top_k, self.version, exact, nprobe, filters, weights)
+        return self.search(query_embedding, top_k, exact, nprobe, rows, weights)
+
+    def semantic_search_batch(self, query_embeddings: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None,
+                              filters: Optional[Dict[str, Any]] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Exact top-k of many queries, on the shard workers if sharded (raising ShardError if none answers)"""
+        if self.shards is not None:
+            return self.shards.search_batch(query_embeddings, top_k, self.version, filters)
+        return self.talent_index.search_batch(query_embeddings, top_k, rows)
+
+
+def load_snapshot(index_root: str, search_engine: str = 'exact', shards=None) -> IndexSnapshot:
+    """Open the current generation under index_root as a snapshot, searching on ``shards`` if given"""
+    talent_df, talent_index, manifest = load_index(index_root)
+    ivf_index = None
+    if search_engine == 'ivf':
+        ivf_index = load_ivf_index(manifest['index_dir'], talent_index, manifest)
+        if ivf_index is None:
+            logging.warning("SEARCH_ENGINE=ivf but no current IVF index was found; using exact search.")
+    quantized_index = None
+    if search_engine == 'quantized':
+        quantized_index = load_quantized_index(manifest['index_dir'], talent_index, manifest)
+        if quantized_index is None:
+            logging.warning("SEARCH_ENGINE=quantized but no current quantized index was found; using exact search.")
+    field_index = load_field_index(manifest, talent_index)
+    return IndexSnapshot(talent_df, talent_index, manifest, ivf_index, field_index, quantized_index, shards)
+
+
+class IndexHolder:
+    """Holds the live IndexSnapshot and swaps in new generations as they are published.
+
+    ``start_watching`` polls the index root's CURRENT pointer on a daemon
+    thread; a new generation is fully loaded before the reference is swapped,
+    so in-flight requests finish on the snapshot they started with.
+    """
+
+    def __init__(self, index_root: str, snapshot: IndexSnapshot, search_engine: str = 'exact', shards=None):
+        self.index_root = index_root
+        self.search_engine = search_engine
+        self.shards = shards
+        self.snapshot = snapshot
+        self.generation_dir = snapshot.manifest.get('index_dir')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def reload(self) -> bool:
+        """Load the current generation if it differs from the live one; True if swapped"""
+        with self._lock:
+            generation_dir = current_generation_dir(self.index_root)
+            if generation_dir is None or generation_dir == self.generation_dir:
+                return False
+            try:
+                snapshot = load_snapshot(self.index_root, self.search_engine, self.shards)
+                # Build the lazy indexes before the swap, off the request path
+                snapshot.lexical_index
+                snapshot.filter_index
+                snapshot.payloads
+            except Exception as e:
+                logging.error(f"Failed to load talent index generation {generation_dir}: {e}")
+                return False
+            self.snapshot = snapshot
+            self.generation_dir = snapshot.manifest.get('index_dir')
+            logging.info(f"Hot-reloaded talent index: {snapshot.profile_count} profiles "
+                         f"from {os.path.basename(str(self.generation_dir))}")
+            return True
+
+    def start_watching(self, interval: float) -> None:
+        if interval <= 0:
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload()
+
+        threading.Thread(target=watch, name='index-reloader', daemon=True).start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
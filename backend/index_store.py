@@ -0,0 +1,252 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from talent_index import FieldIndex, TalentIndex, normalize_rows
+
+# On-disk layout of a talent index directory:
+#   manifest.json   - format version, model, dimension, row count and checksums
+#   embeddings.npy  - raw, L2-normalized float32 matrix, opened with mmap
+#   metadata.json   - columnar profile fields, one list per column
+#   tombstones.npy  - optional bool mask of rows removed since the last compaction
+#   field_embeddings.npy - optional (fields, rows, dimension) per-field matrix,
+#                    field names listed in the manifest
+#
+# An index root holds numbered generations (gen-000001, gen-000002, ...) and a
+# CURRENT file naming the live one, so a new generation can be published with
+# a single atomic rename while servers keep reading the previous one.
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+EMBEDDINGS_FILE = 'embeddings.npy'
+METADATA_FILE = 'metadata.json'
+TOMBSTONES_FILE = 'tombstones.npy'
+FIELD_EMBEDDINGS_FILE = 'field_embeddings.npy'
+CURRENT_FILE = 'CURRENT'
+GENERATION_PATTERN = re.compile(r'^gen-(\d{6})$')
+KEEP_GENERATIONS = 2
+
+
+class IndexStoreError(Exception):
+    """Raised when an index directory is missing, incomplete or inconsistent"""
+
+
+def file_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, write) -> None:
+    """Write through a temp file and rename, so readers never see partial files"""
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def current_generation_dir(index_root: str) -> Optional[str]:
+    """Directory of the live generation under index_root, or None if nothing is published.
+
+    A root that directly contains a manifest (written before generations
+    existed) is its own current generation.
+    """
+    current_path = os.path.join(index_root, CURRENT_FILE)
+    if os.path.exists(current_path):
+        with open(current_path, 'r', encoding='utf-8') as f:
+            return os.path.join(index_root, f.read().strip())
+    if os.path.exists(os.path.join(index_root, MANIFEST_FILE)):
+        return index_root
+    return None
+
+
+def _generation_numbers(index_root: str):
+    if not os.path.isdir(index_root):
+        return []
+    return sorted(int(m.group(1)) for m in map(GENERATION_PATTERN.match, os.listdir(index_root)) if m)
+
+
+def new_generation_dir(index_root: str) -> str:
+    """Path for the next generation under index_root (not yet created)"""
+    numbers = _generation_numbers(index_root)
+    return os.path.join(index_root, f"gen-{(numbers[-1] + 1 if numbers else 1):06d}")
+
+
+def publish_generation(index_root: str, generation_dir: str, keep: int = KEEP_GENERATIONS) -> None:
+    """Atomically point CURRENT at generation_dir and prune older generations.
+
+    Pruned files that a running server still has memory-mapped stay readable
+    until it lets go of them.
+    """
+    name = os.path.basename(os.path.normpath(generation_dir))
+
+    def write_current(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(name)
+
+    _write_atomic(os.path.join(index_root, CURRENT_FILE), write_current)
+    logging.info(f"Published talent index generation {name}")
+
+    for number in _generation_numbers(index_root)[:-keep]:
+        old_name = f"gen-{number:06d}"
+        if old_name != name:
+            shutil.rmtree(os.path.join(index_root, old_name), ignore_errors=True)
+
+
+def save_index(index_dir: str, talent_df: pd.DataFrame, embeddings: np.ndarray, model: str,
+               tombstones: Optional[np.ndarray] = None,
+               extra: Optional[Dict[str, Any]] = None,
+               field_embeddings: Optional[np.ndarray] = None,
+               fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Write profile metadata and their embeddings as a versioned index directory.
+
+    Row ``i`` of ``embeddings`` must belong to row ``i`` of ``talent_df``;
+    ``field_embeddings[f, i]`` is the embedding of field ``fields[f]`` of that row.
+    The manifest is written last, so an index without one is incomplete.
+    """
+    matrix = normalize_rows(embeddings)
+    if matrix.shape[0] != len(talent_df):
+        raise IndexStoreError("embeddings and talent_df must have the same number of rows")
+
+    os.makedirs(index_dir, exist_ok=True)
+    embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+    metadata_path = os.path.join(index_dir, METADATA_FILE)
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+
+    def write_embeddings(path):
+        with open(path, 'wb') as f:
+            np.save(f, matrix, allow_pickle=False)
+
+    def write_metadata(path):
+        metadata = talent_df.drop(columns=['embedding'], errors='ignore')
+        columns = {column: metadata[column].tolist() for column in metadata.columns}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'columns': list(metadata.columns), 'data': columns}, f, ensure_ascii=False)
+
+    _write_atomic(embeddings_path, write_embeddings)
+    _write_atomic(metadata_path, write_metadata)
+
+    field_info = {}
+    if field_embeddings is not None:
+        if field_embeddings.shape[:2] != (len(fields), matrix.shape[0]):
+            raise IndexStoreError("field_embeddings must have shape (len(fields), rows, dimension)")
+        stacked = normalize_rows(field_embeddings.reshape(-1, field_embeddings.shape[2])).reshape(field_embeddings.shape)
+        field_path = os.path.join(index_dir, FIELD_EMBEDDINGS_FILE)
+
+        def write_field_embeddings(path):
+            with open(path, 'wb') as f:
+                np.save(f, stacked, allow_pickle=False)
+
+        _write_atomic(field_path, write_field_embeddings)
+        field_info = {'fields': list(fields), 'field_embeddings_sha256': file_checksum(field_path)}
+
+    tombstone_info = {'tombstones': 0}
+    if tombstones is not None and tombstones.any():
+        tombstones_path = os.path.join(index_dir, TOMBSTONES_FILE)
+
+        def write_tombstones(path):
+            with open(path, 'wb') as f:
+                np.save(f, tombstones.astype(bool), allow_pickle=False)
+
+        _write_atomic(tombstones_path, write_tombstones)
+        tombstone_info = {'tombstones': int(tombstones.sum()), 'tombstones_sha256': file_checksum(tombstones_path)}
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model': model,
+        'dimension': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        'rows': int(matrix.shape[0]),
+        **tombstone_info,
+        'dtype': 'float32',
+        'normalized': True,
+        'embeddings_sha256': file_checksum(embeddings_path),
+        'metadata_sha256': file_checksum(metadata_path),
+        'created_at': time.time(),
+        **field_info,
+        **(extra or {}),
+    }
+
+    def write_manifest(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    _write_atomic(manifest_path, write_manifest)
+    logging.info(f"Saved talent index with {manifest['rows']} rows to {index_dir}")
+    return manifest
+
+
+def read_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    """Return the manifest of an index directory, or None if there is no complete index"""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_index(index_dir: str, verify: bool = False) -> Tuple[pd.DataFrame, TalentIndex, Dict[str, Any]]:
+    """Open an index written by save_index; index_dir may be a generation or an index root.
+
+    The embedding matrix is memory-mapped read-only, so worker processes share
+    its pages through the OS page cache instead of each holding a copy.
+    Pass ``verify=True`` to check file checksums against the manifest.
+    The returned manifest records the resolved directory under ``index_dir``.
+    """
+    index_dir = current_generation_dir(index_dir) or index_dir
+    manifest = read_manifest(index_dir)
+    if manifest is None:
+        raise IndexStoreError(f"No index manifest found in {index_dir}")
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise IndexStoreError(f"Unsupported index format version: {manifest.get('format_version')}")
+
+    embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+    metadata_path = os.path.join(index_dir, METADATA_FILE)
+    if verify:
+        if file_checksum(embeddings_path) != manifest['embeddings_sha256']:
+            raise IndexStoreError(f"Checksum mismatch for {embeddings_path}")
+        if file_checksum(metadata_path) != manifest['metadata_sha256']:
+            raise IndexStoreError(f"Checksum mismatch for {metadata_path}")
+
+    matrix = np.load(embeddings_path, mmap_mode='r', allow_pickle=False)
+    if matrix.shape != (manifest['rows'], manifest['dimension']) or matrix.dtype != np.float32:
+        raise IndexStoreError(f"Embedding matrix in {index_dir} does not match its manifest")
+
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    talent_df = pd.DataFrame(metadata['data'], columns=metadata['columns'])
+    if len(talent_df) != manifest['rows']:
+        raise IndexStoreError(f"Metadata in {index_dir} does not match its manifest")
+
+    tombstones = None
+    if manifest.get('tombstones'):
+        tombstones_path = os.path.join(index_dir, TOMBSTONES_FILE)
+        # Generations written before tombstones had a checksum have none to verify against
+        if verify and 'tombstones_sha256' in manifest and file_checksum(tombstones_path) != manifest['tombstones_sha256']:
+            raise IndexStoreError(f"Checksum mismatch for {tombstones_path}")
+        tombstones = np.load(tombstones_path, allow_pickle=False)
+        if tombstones.shape != (manifest['rows'],) or tombstones.dtype != bool:
+            raise IndexStoreError(f"Tombstones in {index_dir} do not match the manifest")
+
+    talent_index = TalentIndex(matrix, normalized=True, tombstones=tombstones)
+    manifest['index_dir'] = index_dir
+    logging.info(f"Loaded talent index with {len(talent_index)} rows from {index_dir}")
+    return talent_df, talent_index, manifest
+
+
+def load_field_index(manifest: Dict[str, Any], talent_index: TalentIndex) -> Optional[FieldIndex]:
+    """Memory-map the per-field embeddings of a loaded index, or None if it has none"""
+    if not manifest.get('fields'):
+        return None
+    stacked = np.load(os.path.join(manifest['index_dir'], FIELD_EMBEDDINGS_FILE), mmap_mode='r', allow_pickle=False)
+    if stacked.shape != (len(manifest['fields']), manifest['rows'], manifest['dimension']):
+        raise IndexStoreError(f"Field embeddings in {manifest['index_dir']} do not match the manifest")
+    return FieldIndex(manifest['fields'], stacked, talent_index.tombstones)
@@ -0,0 +1,188 @@
+import json
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from lexical_index import MAX_PHRASE_WORDS, words
+
+# Talent CSV columns whose values are recognised as skills in a job request
+VOCABULARY_FIELDS = ['Job Types', 'Skills', 'Software']
+MAX_KEY_SKILLS = 8
+# Leading words requests usually leave out of a tool name ("Premiere Pro" for "Adobe Premiere Pro")
+VENDOR_PREFIXES = {'adobe', 'apple', 'autodesk', 'google', 'microsoft'}
+
+# The schema the LLM analysis fills, with the value used when nothing points elsewhere
+DEFAULT_ANALYSIS = {
+    "job_type": "other",
+    "experience_level": "mid",
+    "work_type": "full_time",
+    "location_preference": "any",
+    "urgency": "medium",
+    "key_skills": [],
+    "company_culture": "traditional",
+    "confidence": 0.5,
+}
+
+# Keyword rules per schema field, checked in order; the first value whose pattern matches wins
+_RULES: Dict[str, List[Tuple[str, str]]] = {
+    'job_type': [
+        ('tiktok_creator', r"tik ?tok|short[- ]form|\breels?\b|\bugc\b"),
+        ('video_editor', r"video edit\w*|(?<!podcast )editor\b|editing"),
+        ('operations_manager', r"\boperations?\b|\bops manager|\bcoo\b"),
+    ],
+    'experience_level': [
+        ('executive', r"executive|director|head of|\bvp\b|chief|c-level"),
+        ('senior', r"senior|\bsr\b|experienced|\blead\b|expert|veteran|seasoned|principal"),
+        ('entry', r"entry[- ]level|junior|\bjr\b|\bintern(?:ship)?\b|graduate|beginner|no experience"),
+        ('mid', r"mid[- ]level|intermediate"),
+    ],
+    'work_type': [
+        ('part_time', r"part[- ]time"),
+        ('full_time', r"full[- ]time"),
+        ('freelance', r"freelanc\w*|per project|one[- ]off|\bgigs?\b"),
+        ('contract', r"contract\w*|temporary|\btemp\b"),
+    ],
+    'location_preference': [
+        ('hybrid', r"hybrid"),
+        ('remote', r"remote|work from home|\bwfh\b|anywhere"),
+        ('onsite', r"on[- ]?site|in[- ]office|in[- ]person|relocat\w*"),
+    ],
+    'urgency': [
+        ('high', r"urgent\w*|asap|immediately|right away|today|tomorrow|this week"),
+        ('low', r"no rush|not urgent|eventually|long[- ]term search|whenever"),
+        ('medium', r"soon|next week|this month"),
+    ],
+    'company_culture': [
+        ('startup', r"start[- ]?up|fast[- ]paced|scrappy|early[- ]stage"),
+        ('corporate', r"corporate|enterprise|fortune \d+|large company"),
+        ('creative', r"creative|artistic|studio|agency"),
+        ('traditional', r"traditional|established|conservative"),
+    ],
+}
+_PATTERNS = {field: [(value, re.compile(pattern)) for value, pattern in rules] for field, rules in _RULES.items()}
+_YEARS = re.compile(r"(\d+)\s*\+?\s*(?:years?|yrs?)")
+_DECODER = json.JSONDecoder()
+
+
+def _aliases(value_words: Tuple[str, ...], is_job_type: bool) -> Set[Tuple[str, ...]]:
+    """Other ways a request names a vocabulary value: without its vendor, by a trailing
+    sub-phrase of two or more words, and for job types in the plural ("video editors")"""
+    names = {value_words[i:] for i in range(1, len(value_words) - 1)}
+    if len(value_words) > 1 and value_words[0] in VENDOR_PREFIXES:
+        names.add(value_words[1:])
+    if is_job_type:
+        names |= {n[:-1] + (n[-1] + 's',) for n in names | {value_words} if not n[-1].endswith('s')}
+    return names
+
+
+class JobRequirementAnalyzer:
+    """Fills the job-analysis schema from keyword rules and the profile vocabularies.
+
+    Key skills are the Job Types, Skills and Software values of the talent
+    profiles that the request names, matched as whole phrases or by the
+    shorter names people use for them ("After Effects", "video editors").
+    An alias shared by two values is ambiguous and left out. Confidence
+    grows with the evidence found: the role (a job type rule or a profile
+    job type) counts most, and two named skills count as much, then each
+    other field that a rule decided rather than defaulted. Requests with
+    little evidence, such as follow-ups that only make sense with the
+    conversation, come out below the threshold at which the LLM analysis
+    is used instead.
+    """
+
+    def __init__(self, talent_df: pd.DataFrame, fields: Sequence[str] = VOCABULARY_FIELDS):
+        start = time.perf_counter()
+        # Word tuple -> (display form, is a job type); aliases are merged in once every value is known
+        self.phrases: Dict[Tuple[str, ...], Tuple[str, bool]] = {}
+        self.aliases: Dict[Tuple[str, ...], Tuple[str, bool]] = {}
+        for field in fields:
+            if field not in talent_df:
+                continue
+            for cell in talent_df[field].dropna().unique().tolist():
+                for value in str(cell).split(','):
+                    value_words = tuple(words(value))
+                    if value_words and len(value_words) <= MAX_PHRASE_WORDS and value_words not in self.phrases:
+                        self.phrases[value_words] = (value.strip(), field == 'Job Types')
+
+        candidates: Dict[Tuple[str, ...], Set[Tuple[str, bool]]] = {}
+        for value_words, phrase in self.phrases.items():
+            for alias in _aliases(value_words, phrase[1]):
+                candidates.setdefault(alias, set()).add(phrase)
+        for alias, phrases in candidates.items():
+            if alias not in self.phrases and len(phrases) == 1:
+                self.aliases[alias] = next(iter(phrases))
+        self.phrases.update(self.aliases)
+        logging.info(f"Built job analyzer vocabulary of {len(self.phrases) - len(self.aliases)} phrases "
+                     f"and {len(self.aliases)} aliases in {time.perf_counter() - start:.2f}s")
+
+    def match_vocabulary(self, text: str) -> Tuple[List[str], bool]:
+        """Vocabulary phrases named in text, longest match first at each position, and whether any is a job type"""
+        text_words = words(text)
+        matches, names_job_type = [], False
+        i = 0
+        while i < len(text_words):
+            for length in range(min(MAX_PHRASE_WORDS, len(text_words) - i), 0, -1):
+                phrase = self.phrases.get(tuple(text_words[i:i + length]))
+                if phrase is not None:
+                    if phrase[0] not in matches:
+                        matches.append(phrase[0])
+                    names_job_type = names_job_type or phrase[1]
+                    i += length
+                    break
+            else:
+                i += 1
+        return matches, names_job_type
+
+    def analyze(self, query: str) -> Dict[str, Any]:
+        """The analysis schema for a job request, with 'confidence' in [0, 1]"""
+        text = query.lower()
+        analysis = dict(DEFAULT_ANALYSIS)
+        decided = set()
+        for field, patterns in _PATTERNS.items():
+            for value, pattern in patterns:
+                if pattern.search(text):
+                    analysis[field] = value
+                    decided.add(field)
+                    break
+        if 'experience_level' not in decided:
+            years = [int(y) for y in _YEARS.findall(text)]
+            if years:
+                analysis['experience_level'] = 'entry' if max(years) < 2 else 'mid' if max(years) < 5 else 'senior'
+                decided.add('experience_level')
+
+        skills, names_job_type = self.match_vocabulary(query)
+        analysis['key_skills'] = skills[:MAX_KEY_SKILLS]
+
+        role_known = 'job_type' in decided or names_job_type
+        confidence = 0.2 + (0.4 if role_known else 0.0) + 0.2 * min(len(skills), 2)
+        confidence += 0.05 * len(decided - {'job_type'})
+        analysis['confidence'] = round(min(confidence, 0.95), 2)
+        return analysis
+
+
+def parse_analysis(result: Any) -> Optional[Dict[str, Any]]:
+    """The analysis dict in an LLM reply (bare or fenced JSON, possibly with prose around it), or None"""
+    if isinstance(result, dict):
+        parsed = result
+    else:
+        text = str(result)
+        parsed = None
+        for match in re.finditer(r"\{", text):
+            try:
+                parsed, _ = _DECODER.raw_decode(text, match.start())
+            except ValueError:
+                continue
+            if isinstance(parsed, dict):
+                break
+            parsed = None
+        if parsed is None:
+            return None
+    analysis = dict(DEFAULT_ANALYSIS)
+    analysis.update({k: v for k, v in parsed.items() if k in DEFAULT_ANALYSIS})
+    if not isinstance(analysis['key_skills'], list):
+        analysis['key_skills'] = [str(analysis['key_skills'])]
+    return analysis
+
@@ -0,0 +1,106 @@
+import logging
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from talent_index import top_k_indices
+
+# Exact-match vocabularies in the talent CSV; each cell is a comma-separated list
+LEXICAL_FIELDS = ['Skills', 'Software', 'Platforms', 'Job Types']
+MAX_PHRASE_WORDS = 4
+RRF_K = 60
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.&'-]*")
+
+
+def words(text: str) -> List[str]:
+    """Lower-cased word tokens of text, keeping tool names like "c++", "c#" and "after-effects" whole"""
+    return [w.strip(".'-") for w in _WORD.findall(text.lower())]
+
+
+class LexicalIndex:
+    """BM25 inverted index over the vocabulary fields of the talent profiles.
+
+    Every comma-separated value ("Adobe Audition") is indexed as a phrase
+    term and as its individual words, so a query that names a tool exactly
+    scores higher than one that merely shares a word with it. Needs no
+    embedding call, so it also serves as the no-network fallback.
+    """
+
+    def __init__(self, talent_df: pd.DataFrame, fields: Sequence[str] = LEXICAL_FIELDS,
+                 k1: float = 1.2, b: float = 0.75):
+        start = time.perf_counter()
+        self.k1 = k1
+        self.b = b
+        self.size = len(talent_df)
+        fields = [f for f in fields if f in talent_df]
+
+        term_rows: Dict[str, List[int]] = defaultdict(list)
+        lengths = np.zeros(self.size, dtype=np.float32)
+        columns = [talent_df[f].astype(str).tolist() for f in fields]
+        for row in range(self.size):
+            terms = []
+            for column in columns:
+                for value in column[row].split(','):
+                    value_words = words(value)
+                    if value_words:
+                        terms.append('p:' + ' '.join(value_words))
+                        terms.extend('w:' + w for w in value_words)
+            lengths[row] = len(terms)
+            for term in terms:
+                term_rows[term].append(row)
+
+        average_length = float(lengths.mean()) if self.size else 0.0
+        self.length_norm = (k1 * (1 - b + b * lengths / average_length)) if average_length else lengths
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for term, rows in term_rows.items():
+            rows, tf = np.unique(np.asarray(rows, dtype=np.int64), return_counts=True)
+            idf = float(np.log(1 + (self.size - len(rows) + 0.5) / (len(rows) + 0.5)))
+            self.postings[term] = (rows, tf.astype(np.float32), idf)
+        logging.info(f"Built lexical index with {len(self.postings)} terms in {time.perf_counter() - start:.2f}s")
+
+    def query_terms(self, query: str) -> List[str]:
+        """Indexed words and phrases (up to MAX_PHRASE_WORDS long) that occur in the query"""
+        query_words = words(query)
+        terms = {'w:' + w for w in query_words}
+        for n in range(1, MAX_PHRASE_WORDS + 1):
+            for i in range(len(query_words) - n + 1):
+                terms.add('p:' + ' '.join(query_words[i:i + n]))
+        return [t for t in terms if t in self.postings]
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every profile for the query"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in self.query_terms(query):
+            rows, tf, idf = self.postings[term]
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + self.length_norm[rows])
+        return scores
+
+    def search(self, query: str, top_k: int, tombstones=None, rows=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row_ids, scores) of the top_k matching profiles, best first, optionally within rows"""
+        scores = self.scores(query)
+        if tombstones is not None:
+            scores[tombstones] = 0.0
+        if rows is not None:
+            allowed = np.zeros(self.size, dtype=bool)
+            allowed[rows] = True
+            scores[~allowed] = 0.0
+        top = top_k_indices(scores, top_k)
+        top = top[scores[top] > 0]
+        return top, scores[top]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], top_k: int, k: int = RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse several best-first row_id rankings into one by summing 1 / (k + rank)"""
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking.tolist()):
+            fused[row_id] += 1.0 / (k + rank + 1)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    row_ids = np.array([row_id for row_id, _ in ordered], dtype=np.int64)
+    scores = np.array([score for _, score in ordered], dtype=np.float32)
+    return row_ids, scores
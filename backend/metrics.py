@@ -0,0 +1,190 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; +Inf is implicit
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing count, per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label key: [count per bucket (plus one for +Inf)], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Values read at scrape time, e.g. counts a cache already keeps, so the hot path pays nothing"""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                 read: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.read = read
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(self.read().items())]
+
+
+class MetricsRegistry:
+    """Named metrics of this process, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                # A broken callback must not take the whole scrape down
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'talent_http_request_seconds', "Time until the response is returned (headers, for streams)",
+    ['endpoint', 'method', 'status']))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'talent_stage_seconds', "Time spent in each stage of request handling", ['stage']))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    'talent_upstream_retries_total', "Retried calls to the embedding or chat APIs", ['upstream']))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    'talent_upstream_errors_total', "Calls to the embedding or chat APIs that failed for good", ['upstream']))
+SHARD_FAILURES = REGISTRY.register(Counter(
+    'talent_shard_failures_total', "Shard searches left out of a result (timeout, error or stale generation)",
+    ['shard', 'reason']))
+CHAT_ANALYSES = REGISTRY.register(Counter(
+    'talent_chat_analyses_total', "Chat job analyses by where they were made (local rules or LLM)", ['source']))
+
+# Stages completed so far in the current request, for the Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = \
+    contextvars.ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a stage into STAGE_SECONDS and the current request's timings"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def start_request_timing() -> None:
+    _request_timings.set([])
+
+
+def request_timings() -> List[Tuple[str, float]]:
+    return _request_timings.get() or []
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing value with one entry per stage (repeated stages summed) and the total"""
+    durations: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+    durations['total'] = total
+    return ', '.join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in durations.items())
@@ -0,0 +1,106 @@
+import json
+import logging
+import math
+import time
+from itertools import accumulate
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the standard library encoder gives the same JSON
+    orjson = None
+
+# Columns kept in the index for building and matching, never sent to clients
+INTERNAL_FIELDS = ('embedding', 'combined_features', 'content_hash')
+SCORE_FIELDS = ('similarity', 'final_score')
+
+
+class FieldProjectionError(ValueError):
+    """Raised when a requested response field is not a profile column"""
+
+
+class RawJSON(bytes):
+    """Already-serialized JSON, spliced into a response by render_json as is"""
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def render_json(value: Any) -> bytes:
+    """Serialize a response made of dicts, lists, plain values and RawJSON fragments"""
+    if isinstance(value, RawJSON):
+        return bytes(value)
+    if isinstance(value, dict):
+        return b'{' + b','.join(dumps(str(k)) + b':' + render_json(v) for k, v in value.items()) + b'}'
+    if isinstance(value, (list, tuple)):
+        return b'[' + b','.join(render_json(v) for v in value) + b']'
+    return dumps(value)
+
+
+def _clean(value: Any) -> Any:
+    # Missing CSV cells come back as NaN, which is not valid JSON
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class ProfilePayloads:
+    """JSON of every public profile field, serialized once per index snapshot.
+
+    ``rows[row]`` holds ``"column":value,"column":value,...`` for one
+    profile, so a full result record is that one byte string plus the
+    scores, however wide the DataFrame is or however large the embeddings
+    are. ``offsets[row, i]`` is where the i-th column's pair starts within
+    it, so a field projection slices out just the requested pairs. One
+    bytes object per row rather than per cell keeps the per-object
+    overhead small at millions of profiles.
+    """
+
+    def __init__(self, talent_df: pd.DataFrame):
+        start = time.perf_counter()
+        self.columns = [c for c in talent_df.columns if c not in INTERNAL_FIELDS]
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        prefixes = [dumps(str(column)) + b':' for column in self.columns]
+        values = [talent_df[column].tolist() for column in self.columns]
+        self.rows: List[bytes] = []
+        # The extra last offset is one past the row's end, as if a comma followed it
+        self.offsets = np.zeros((len(talent_df), len(self.columns) + 1), dtype=np.uint32)
+        for row in range(len(talent_df)):
+            pairs = [prefix + dumps(_clean(column[row])) for prefix, column in zip(prefixes, values)]
+            self.rows.append(b','.join(pairs))
+            self.offsets[row, 1:] = list(accumulate(len(pair) + 1 for pair in pairs))
+        logging.info(f"Serialized {len(talent_df)} profile payloads in {time.perf_counter() - start:.2f}s")
+
+    def resolve_fields(self, fields: Optional[Sequence[str]]) -> List[str]:
+        """Columns to include for a ``fields`` request parameter (all public columns when None)"""
+        if fields is None:
+            return self.columns
+        if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+            raise FieldProjectionError("fields must be a list of field names")
+        unknown = [f for f in fields if f not in self.positions and f not in SCORE_FIELDS]
+        if unknown:
+            raise FieldProjectionError(f"Unknown fields: {', '.join(unknown)}")
+        return [f for f in fields if f in self.positions]
+
+    def records(self, row_ids, scores, columns: List[str]) -> List[RawJSON]:
+        """Serialized result records for ranked rows, with similarity and final_score appended"""
+        projected = None if columns == self.columns else [self.positions[column] for column in columns]
+        records = []
+        for row_id, score in zip(row_ids.tolist(), scores.tolist()):
+            score_json = dumps(float(score))
+            row = self.rows[row_id]
+            if projected is None:
+                parts = [row] if row else []
+            else:
+                offsets = self.offsets[row_id]
+                parts = [row[offsets[i]:offsets[i + 1] - 1] for i in projected]
+            parts.append(b'"similarity":' + score_json)
+            parts.append(b'"final_score":' + score_json)  # You can implement custom scoring logic here
+            records.append(RawJSON(b'{' + b','.join(parts) + b'}'))
+        return records
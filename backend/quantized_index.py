@@ -0,0 +1,209 @@
+"""Compact (float16 or int8) copies of the talent embeddings for the first-pass scan.
+
+Build offline, next to the embeddings written by index_store:
+
+    python quantized_index.py build --index-dir talent_index --dtype int8
+
+then serve with SEARCH_ENGINE=quantized. Only the codes are scanned; the best
+candidates are rescored exactly against the memory-mapped float32 matrix, so
+its pages are read for a few hundred rows per query instead of all of them.
+Compare recall@k, latency and memory against exact search with:
+
+    python quantized_index.py report --index-dir talent_index --k 10 --rescore 0,50,200
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from index_store import load_index
+from recall_eval import add_report_arguments, print_runs, recall_sweep, sample_queries
+from talent_index import TalentIndex, normalize_rows, top_k_indices
+
+QUANTIZED_PARAMS_FILE = 'quantized.json'
+QUANTIZED_CODES_FILE = 'quantized_codes.npy'
+QUANTIZED_SCALE_FILE = 'quantized_scale.npy'
+
+QUANTIZED_DTYPES = ('int8', 'float16')
+# Candidates from the compact scan rescored exactly, unless top_k asks for more
+DEFAULT_RESCORE = 200
+# Rows converted to float32 at a time during the scan, bounding its scratch memory
+SCAN_CHUNK_ROWS = 4096
+
+
+def quantize(matrix: np.ndarray, dtype: str, chunk_size: int = 65536) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return (codes, per-dimension scale) for normalized rows; the scale is None for float16.
+
+    int8 codes are ``round(x / scale)`` with ``scale[d] = max |x[:, d]| / 127``,
+    so every dimension uses the full code range.
+    """
+    if dtype not in QUANTIZED_DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(QUANTIZED_DTYPES)}")
+    n, dimension = matrix.shape
+    codes = np.empty((n, dimension), dtype=np.int8 if dtype == 'int8' else np.float16)
+    scale = None
+    if dtype == 'int8':
+        peak = np.zeros(dimension, dtype=np.float32)
+        for start in range(0, n, chunk_size):
+            chunk = np.abs(np.asarray(matrix[start:start + chunk_size], dtype=np.float32))
+            np.maximum(peak, chunk.max(axis=0), out=peak)
+        scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    for start in range(0, n, chunk_size):
+        chunk = np.asarray(matrix[start:start + chunk_size], dtype=np.float32)
+        if scale is not None:
+            chunk = np.clip(np.rint(chunk / scale), -127, 127)
+        codes[start:start + chunk_size] = chunk
+    return codes, scale
+
+
+class QuantizedIndex:
+    """First-pass scan over compact codes, then exact rescoring of the best ``rescore`` rows.
+
+    The codes are a quarter (int8) or half (float16) the size of the float32
+    matrix and stay resident; the matrix itself is only read for the rows
+    being rescored. Unlike IVF, every row is still scanned, so filtered
+    searches can use it too. Returned scores are exact cosine similarities;
+    only which rows reach the rescoring step is approximate.
+    """
+
+    def __init__(self, base: TalentIndex, codes: np.ndarray, scale: Optional[np.ndarray],
+                 rescore: int = DEFAULT_RESCORE):
+        self.base = base
+        self.codes = codes
+        self.scale = scale
+        self.rescore = rescore
+
+    @classmethod
+    def build(cls, base: TalentIndex, dtype: str, rescore: int = DEFAULT_RESCORE) -> 'QuantizedIndex':
+        codes, scale = quantize(base.matrix, dtype)
+        return cls(base, codes, scale, rescore)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    @property
+    def dtype(self) -> str:
+        return 'int8' if self.codes.dtype == np.int8 else 'float16'
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the codes and scale, as opposed to the float32 matrix"""
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def approximate_scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Similarity estimates of a normalized query against every row (or the given rows)"""
+        # Folding the scale into the query makes each int8 score one dot product with the codes
+        query = query * self.scale if self.scale is not None else query
+        n = self.codes.shape[0] if rows is None else rows.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        buffer = np.empty((min(n, SCAN_CHUNK_ROWS), self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, n, SCAN_CHUNK_ROWS):
+            end = min(start + SCAN_CHUNK_ROWS, n)
+            chunk = self.codes[start:end] if rows is None else self.codes[rows[start:end]]
+            np.copyto(buffer[:end - start], chunk, casting='unsafe')
+            np.matmul(buffer[:end - start], query, out=scores[start:end])
+        return scores
+
+    def search(self, query_embedding: Sequence[float], top_k: int,
+               rows: Optional[np.ndarray] = None, rescore: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row_ids, exact scores) of the top_k among the best candidates of the compact scan"""
+        if self.base.live_count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))[0]
+        approximate = self.base.mask_tombstones(self.approximate_scores(query, rows), rows)
+        depth = max(top_k, self.rescore if rescore is None else rescore)
+        candidates = top_k_indices(approximate, depth)
+        candidates = candidates[np.isfinite(approximate[candidates])]
+        positions = candidates if rows is None else rows[candidates]
+        positions.sort()  # sequential reads from the memory-mapped matrix
+
+        scores = self.base.matrix[positions] @ query
+        top = top_k_indices(scores, top_k)
+        return self.base.row_ids[positions[top]], scores[top]
+
+    def save(self, index_dir: str, embeddings_sha256: str) -> None:
+        """Write the codes, the int8 scale and the dtype into index_dir.
+
+        ``embeddings_sha256`` records which matrix was quantized, so codes
+        left over from other embeddings are not loaded.
+        """
+        np.save(os.path.join(index_dir, QUANTIZED_CODES_FILE), self.codes, allow_pickle=False)
+        if self.scale is not None:
+            np.save(os.path.join(index_dir, QUANTIZED_SCALE_FILE), self.scale, allow_pickle=False)
+        with open(os.path.join(index_dir, QUANTIZED_PARAMS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'dtype': self.dtype,
+                'rescore': self.rescore,
+                'embeddings_sha256': embeddings_sha256,
+            }, f, indent=2)
+
+
+def load_quantized_index(index_dir: str, base: TalentIndex, manifest: Dict[str, Any]) -> Optional[QuantizedIndex]:
+    """Load the codes saved in index_dir into memory, or None if missing or built for other embeddings"""
+    params_path = os.path.join(index_dir, QUANTIZED_PARAMS_FILE)
+    if not os.path.exists(params_path):
+        return None
+    with open(params_path, 'r', encoding='utf-8') as f:
+        params = json.load(f)
+    if params.get('embeddings_sha256') != manifest.get('embeddings_sha256'):
+        logging.warning(f"Quantized index in {index_dir} is stale; rebuild it with quantized_index.py build")
+        return None
+
+    # The codes are scanned in full on every query, so keep them resident rather than mapped
+    codes = np.load(os.path.join(index_dir, QUANTIZED_CODES_FILE), allow_pickle=False)
+    scale = None
+    if params['dtype'] == 'int8':
+        scale = np.load(os.path.join(index_dir, QUANTIZED_SCALE_FILE), allow_pickle=False)
+    rescore = int(os.getenv('QUANTIZED_RESCORE', params.get('rescore', DEFAULT_RESCORE)))
+    logging.info(f"Loaded {params['dtype']} quantized index ({codes.nbytes / 2**20:.1f} MiB) from {index_dir}")
+    return QuantizedIndex(base, codes, scale, rescore)
+
+
+def quantization_report(exact: TalentIndex, quantized: QuantizedIndex, queries: np.ndarray, k: int,
+                        rescores: List[int]) -> Dict[str, Any]:
+    """Recall@k and per-query latency at each rescoring depth, plus float32 vs code memory"""
+    report = recall_sweep(exact, queries, k, 'rescore', rescores,
+                          lambda q, rescore: quantized.search(q, k, rescore=rescore))
+    report.update(dimension=exact.dimension, dtype=quantized.dtype, quantized=report.pop('runs'),
+                  memory={'float32_bytes': int(exact.matrix.nbytes), 'quantized_bytes': int(quantized.nbytes)})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the quantized talent search index")
+    add_report_arguments(parser)
+    parser.add_argument('--dtype', choices=QUANTIZED_DTYPES, default='int8')
+    parser.add_argument('--rescore', default=str(DEFAULT_RESCORE),
+                        help="default rescoring depth for build, comma-separated depths for report")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    _, base, manifest = load_index(args.index_dir)
+    index_dir = manifest['index_dir']
+    if args.command == 'build':
+        start = time.perf_counter()
+        quantized = QuantizedIndex.build(base, args.dtype, rescore=int(args.rescore.split(',')[0]))
+        quantized.save(index_dir, manifest['embeddings_sha256'])
+        logging.info(f"Built {args.dtype} quantized index in {time.perf_counter() - start:.1f}s")
+        return
+
+    quantized = load_quantized_index(index_dir, base, manifest)
+    if quantized is None:
+        raise SystemExit(f"No current quantized index in {args.index_dir}; run 'build' first")
+    queries = sample_queries(base, args.queries)
+    report = quantization_report(base, quantized, queries, args.k, [int(n) for n in args.rescore.split(',')])
+
+    memory = report['memory']
+    print(f"rows={report['rows']} dimension={report['dimension']} dtype={report['dtype']} "
+          f"k={report['k']} queries={report['queries']}")
+    print(f"memory       float32={memory['float32_bytes'] / 2**20:.1f}MiB "
+          f"{report['dtype']}={memory['quantized_bytes'] / 2**20:.1f}MiB "
+          f"({memory['float32_bytes'] / max(1, memory['quantized_bytes']):.1f}x smaller)")
+    print_runs(report, report['quantized'], 'rescore', args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Recall and latency of an approximate search engine against exact search.
+
+Shared by the ``report`` commands of ann_index.py and quantized_index.py:
+both sweep one search parameter (nprobe, rescoring depth) and print or
+save the same kind of table.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from talent_index import TalentIndex, normalize_rows
+
+Search = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+def add_report_arguments(parser: argparse.ArgumentParser) -> None:
+    """The options every build/report command takes besides its own tuning parameters"""
+    parser.add_argument('command', choices=['build', 'report'])
+    parser.add_argument('--index-dir', default=os.getenv('TALENT_INDEX_DIR', 'talent_index'))
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--output', help="write the report as JSON to this file")
+
+
+def sample_queries(base: TalentIndex, count: int, noise: float = 0.02, seed: int = 0) -> np.ndarray:
+    """Queries near, but not on, indexed profiles: normalized noisy copies of random rows"""
+    rng = np.random.default_rng(seed)
+    sample = base.matrix[np.sort(rng.choice(len(base), min(count, len(base)), replace=False))]
+    return normalize_rows(sample + rng.normal(0, noise, sample.shape).astype(np.float32))
+
+
+def _timed(search: Search, queries: np.ndarray) -> Tuple[List[np.ndarray], List[float]]:
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        row_ids, _ = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(row_ids)
+    return results, latencies
+
+
+def _latency(latencies: List[float]) -> Dict[str, float]:
+    return {'p50_ms': float(np.percentile(latencies, 50)), 'p99_ms': float(np.percentile(latencies, 99))}
+
+
+def recall_sweep(exact: TalentIndex, queries: np.ndarray, k: int, parameter: str, values: Sequence[Any],
+                 search: Callable[[np.ndarray, Any], Tuple[np.ndarray, np.ndarray]]) -> Dict[str, Any]:
+    """Exact-search latency, and recall@k and latency of ``search(query, value)`` for every value.
+
+    Returns {'rows', 'k', 'queries', 'exact': {p50_ms, p99_ms}, 'runs': [...]},
+    one run per value keyed by ``parameter``.
+    """
+    truth, exact_latencies = _timed(lambda q: exact.search(q, k), queries)
+    runs = []
+    for value in values:
+        results, latencies = _timed(lambda q: search(q, value), queries)
+        hits = [len(set(r.tolist()) & set(t.tolist())) / max(1, len(t)) for r, t in zip(results, truth)]
+        runs.append({parameter: value, 'recall_at_k': float(np.mean(hits)), **_latency(latencies)})
+    return {'rows': len(exact), 'k': k, 'queries': len(queries), 'exact': _latency(exact_latencies), 'runs': runs}
+
+
+def print_runs(report: Dict[str, Any], runs: List[Dict[str, Any]], parameter: str,
+               output: Optional[str] = None) -> None:
+    """Print the exact baseline and one line per run, and write the report to ``output`` if given"""
+    print(f"exact        p50={report['exact']['p50_ms']:.3f}ms p99={report['exact']['p99_ms']:.3f}ms")
+    for run in runs:
+        label = f"{parameter}={run[parameter]}"
+        print(f"{label:<12} recall@{report['k']}={run['recall_at_k']:.3f} "
+              f"p50={run['p50_ms']:.3f}ms p99={run['p99_ms']:.3f}ms")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
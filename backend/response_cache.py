@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_THRESHOLD = 0.95
+
+
+def filters_key(filters: Optional[Dict[str, Any]]) -> str:
+    """Canonical form of a filter expression, so equal filters share cache entries"""
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+class SemanticResponseCache:
+    """Chat answers keyed on query-embedding similarity rather than exact text.
+
+    Each entry keeps the normalized query embedding together with the job
+    analysis, the candidates and the generated reply. A lookup returns the
+    most similar live entry with the same filters, provided its cosine
+    similarity reaches ``threshold``. Entries expire after ``ttl`` seconds,
+    the least recently used are evicted beyond ``max_entries``, and
+    everything is dropped when the talent index version changes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS,
+                 threshold: float = DEFAULT_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.version = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # Stacked embeddings per filters key, rebuilt lazily after changes
+        self._matrices: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, query_embedding, filters: Optional[Dict[str, Any]], version: str) -> Optional[Dict[str, Any]]:
+        """Cached {'analysis', 'candidates', 'message'} for a similar enough query, or None"""
+        if not self.enabled or query_embedding is None:
+            return None
+        query = self._normalize(query_embedding)
+        key = filters_key(filters)
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            ids, matrix = self._matrix(key)
+            if ids and matrix.shape[1] == query.shape[0]:
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id]['response']
+            self.misses += 1
+            return None
+
+    def put(self, query_embedding, filters: Optional[Dict[str, Any]], version: str,
+            response: Dict[str, Any]) -> None:
+        if not self.enabled or query_embedding is None:
+            return
+        key = filters_key(filters)
+        with self._lock:
+            self._check_version(version)
+            self._entries[self._next_id] = {
+                'embedding': self._normalize(query_embedding),
+                'filters': key,
+                'created': time.monotonic(),
+                'response': response,
+            }
+            self._next_id += 1
+            self._matrices.pop(key, None)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._matrices.pop(evicted['filters'], None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+            }
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _check_version(self, version: str) -> None:
+        if version != self.version:
+            self._entries.clear()
+            self._matrices.clear()
+            self.version = version
+
+    def _expire(self) -> None:
+        # Entries are in LRU order, not creation order, so scan them all
+        cutoff = time.monotonic() - self.ttl
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry['created'] < cutoff]
+        for entry_id in expired:
+            self._matrices.pop(self._entries.pop(entry_id)['filters'], None)
+
+    def _matrix(self, key: str):
+        if key not in self._matrices:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry['filters'] == key]
+            matrix = np.stack([self._entries[i]['embedding'] for i in ids]) if ids else np.empty((0, 0), dtype=np.float32)
+            self._matrices[key] = (ids, matrix)
+        return self._matrices[key]
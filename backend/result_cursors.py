@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL_SECONDS = 600.0
+# Results ranked for a search that is paged through; its first page is the head of that ranking
+DEFAULT_DEPTH = 500
+
+
+class CursorError(ValueError):
+    """Raised for a cursor that is malformed, expired, evicted or from an older index version"""
+
+
+class RankedResultStore:
+    """Ranked row lists of recent searches, so later pages are slices instead of new searches.
+
+    A cursor is ``<token>.<offset>``: the token names a stored search and
+    the offset is where the next page starts. Every page, the first one
+    included, is a slice of the one stored ranking, so pages neither repeat
+    nor skip results even where ranking deeper would reorder them (rank
+    fusion, rescoring depth, a fallback taken on one search but not another).
+    Entries expire ``ttl`` seconds after they were last read, the least
+    recently used are evicted beyond
+    ``max_entries``, and everything is dropped when the talent index version
+    changes, since row positions then refer to different profiles.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def put(self, version: str, offset: int, context: Dict[str, Any],
+            row_ids: np.ndarray, scores: np.ndarray) -> Optional[str]:
+        """Store a search's ranked (row_ids, scores) and return the cursor of the page starting at ``offset``"""
+        if not self.enabled:
+            return None
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            self._entries[token] = {
+                'row_ids': row_ids,
+                'scores': scores,
+                'context': context,
+                'touched': time.monotonic(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return f"{token}.{offset}"
+
+    def page(self, cursor: str, version: str,
+             page_size: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any], Optional[str]]:
+        """Return (row_ids, scores, context, next cursor) for the page a cursor points at"""
+        token, _, offset = cursor.partition('.') if isinstance(cursor, str) else ('', '', '')
+        if not offset.isdigit():
+            raise CursorError("Malformed cursor")
+        offset = int(offset)
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                raise CursorError("Cursor has expired or the index has changed; repeat the search")
+            entry['touched'] = time.monotonic()
+            self._entries.move_to_end(token)
+            self.pages += 1
+        end = offset + page_size
+        next_cursor = f"{token}.{end}" if end < len(entry['row_ids']) else None
+        return entry['row_ids'][offset:end], entry['scores'][offset:end], entry['context'], next_cursor
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pages': self.pages,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+    def _check_version(self, version: str) -> None:
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def _expire(self) -> None:
+        # Reads move entries to the end, so the least recently touched are first
+        cutoff = time.monotonic() - self.ttl
+        while self._entries:
+            token, entry = next(iter(self._entries.items()))
+            if entry['touched'] >= cutoff:
+                break
+            del self._entries[token]
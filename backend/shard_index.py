@@ -0,0 +1,359 @@
+"""Sharded vector search: shard worker processes and the coordinator that fans queries out to them.
+
+Split the published index into contiguous row ranges, one index root per shard:
+
+    python shard_index.py split --index-dir talent_index --out talent_shards --shards 4
+
+serve every shard from its own process on this machine (or run ``serve`` per node):
+
+    python shard_index.py cluster --out talent_shards --base-port 7101
+    python shard_index.py serve --shard-dir talent_shards/shard-00 --port 7101
+
+and point the app at them:
+
+    SHARD_URLS=http://127.0.0.1:7101,http://127.0.0.1:7102,... python app.py
+
+The app still opens the full index for profile metadata, filters, the BM25
+index and response payloads, but its embedding matrices stay memory-mapped
+and untouched: semantic and weighted scoring runs on the shards, in parallel,
+and the per-shard top-k lists are merged. Shards that miss SHARD_DEADLINE are
+left out of that result. Each shard serves the generation it was split from;
+re-run ``split`` after re-indexing, and results from shards split from another
+generation than the app's are discarded. Until then search falls back to
+lexical retrieval, which /health/ready ("shards") and the talent_shards gauge
+report as stale shards.
+"""
+import argparse
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from filter_index import FilterError
+from metrics import SHARD_FAILURES
+from talent_index import top_k_indices
+
+SHARD_PATTERN = 'shard-{:02d}'
+DEFAULT_DEADLINE_SECONDS = 0.5
+
+
+class ShardError(Exception):
+    """Raised when no shard returned a usable result in time"""
+
+
+def encode_vector(vector) -> str:
+    return base64.b64encode(np.asarray(vector, dtype='<f4').tobytes()).decode('ascii')
+
+
+def decode_vector(text: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype='<f4')
+
+
+def split_index(index_root: str, out_root: str, shards: int) -> List[str]:
+    """Write the current generation of index_root as ``shards`` contiguous-row shard index roots"""
+    from index_holder import load_snapshot
+    from index_store import new_generation_dir, publish_generation, save_index
+
+    snapshot = load_snapshot(index_root)
+    manifest = snapshot.manifest
+    matrix = snapshot.talent_index.matrix
+    tombstones = snapshot.talent_index.tombstones
+    fields = manifest.get('fields')
+    stacked = snapshot.field_index.stacked if snapshot.field_index is not None else None
+    rows = len(snapshot.talent_index)
+    bounds = np.linspace(0, rows, shards + 1).astype(int)
+
+    shard_roots = []
+    for shard, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        shard_root = os.path.join(out_root, SHARD_PATTERN.format(shard))
+        generation_dir = new_generation_dir(shard_root)
+        save_index(generation_dir, snapshot.talent_df.iloc[start:end].reset_index(drop=True),
+                   np.asarray(matrix[start:end]), manifest['model'],
+                   tombstones[start:end] if tombstones is not None else None,
+                   extra={'generation': os.path.basename(generation_dir), 'shard': shard, 'shards': shards,
+                          'row_offset': int(start), 'source_version': snapshot.version},
+                   field_embeddings=np.asarray(stacked[:, start:end]) if stacked is not None else None,
+                   fields=fields)
+        publish_generation(shard_root, generation_dir)
+        shard_roots.append(shard_root)
+        logging.info(f"Wrote shard {shard} with rows {start}-{end} to {shard_root}")
+    return shard_roots
+
+
+class ShardHandler(BaseHTTPRequestHandler):
+    """POST /search scores the query against this shard, POST /search_batch scores many
+    exactly at once; GET /health describes it"""
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': 'not found'})
+            return
+        snapshot = self.server.holder.snapshot
+        self._send_json(200, {
+            'shard': snapshot.manifest.get('shard'),
+            'shards': snapshot.manifest.get('shards'),
+            'row_offset': snapshot.manifest.get('row_offset', 0),
+            'profiles': snapshot.profile_count,
+            'source_version': snapshot.manifest.get('source_version'),
+        })
+
+    def do_POST(self):
+        if self.path not in ('/search', '/search_batch'):
+            self._send_json(404, {'error': 'not found'})
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        snapshot = self.server.holder.snapshot
+        row_offset = snapshot.manifest.get('row_offset', 0)
+        try:
+            rows = snapshot.filter_index.evaluate(payload.get('filters'))
+            if self.path == '/search_batch':
+                queries = np.stack([decode_vector(e) for e in payload['embeddings']])
+                ranked = snapshot.talent_index.search_batch(queries, int(payload['top_k']), rows)
+            elif rows is not None and rows.size == 0:
+                ranked = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))]
+            else:
+                ranked = [snapshot.search(decode_vector(payload['embedding']), int(payload['top_k']),
+                                          exact=payload.get('exact', False), nprobe=payload.get('nprobe'),
+                                          rows=rows, weights=payload.get('weights'))]
+        except (FilterError, ValueError, KeyError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        results = [{'row_ids': (np.asarray(row_ids) + row_offset).tolist(),
+                    'scores': np.asarray(scores, dtype=np.float32).tolist()} for row_ids, scores in ranked]
+        if self.path == '/search_batch':
+            self._send_json(200, {'results': results, 'source_version': snapshot.manifest.get('source_version')})
+        else:
+            self._send_json(200, {**results[0], 'source_version': snapshot.manifest.get('source_version')})
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_shard_server(shard_dir: str, host: str = '127.0.0.1', port: int = 0,
+                      search_engine: str = 'exact', reload_interval: float = 30.0) -> ThreadingHTTPServer:
+    """Load one shard and create (but do not start) its server; port 0 picks a free port"""
+    from index_holder import IndexHolder, load_snapshot
+
+    holder = IndexHolder(shard_dir, load_snapshot(shard_dir, search_engine), search_engine)
+    holder.start_watching(reload_interval)
+    server = ThreadingHTTPServer((host, port), ShardHandler)
+    server.daemon_threads = True
+    server.holder = holder
+    return server
+
+
+def serve_shard(shard_dir: str, host: str, port: int, search_engine: str, reload_interval: float) -> None:
+    logging.basicConfig(level=logging.INFO)
+    server = make_shard_server(shard_dir, host, port, search_engine, reload_interval)
+    logging.info(f"Shard {shard_dir} listening on http://{host}:{server.server_address[1]}")
+    server.serve_forever()
+
+
+def _merge(results: List[Dict[str, Any]], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The overall top-k of per-shard {'row_ids', 'scores'} lists"""
+    row_ids = np.concatenate([np.asarray(r['row_ids'], dtype=np.int64) for r in results])
+    scores = np.concatenate([np.asarray(r['scores'], dtype=np.float32) for r in results])
+    top = top_k_indices(scores, top_k)
+    return row_ids[top], scores[top]
+
+
+class ShardCoordinator:
+    """Fans a vector search out to every shard and merges their top-k lists.
+
+    Shards are queried in parallel, each with the same deadline; a shard
+    that errors, answers late or serves another index generation is left
+    out and counted in talent_shard_failures_total. Scores are cosine
+    similarities (or weighted sums of them) and so comparable across
+    shards, which makes the merged top-k the same as a single-index search
+    over the shards that answered.
+    """
+
+    def __init__(self, urls: Sequence[str], deadline: float = DEFAULT_DEADLINE_SECONDS):
+        self.urls = [url.rstrip('/') for url in urls]
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=4 * len(self.urls), thread_name_prefix='shard')
+        self._lock = threading.Lock()
+        self.failures = {'timeout': 0, 'error': 0, 'stale': 0}
+        # The index generation each shard was split from, as of its last answer (None until it answers)
+        self.source_versions: Dict[str, Optional[str]] = {url: None for url in self.urls}
+
+    def search(self, query_embedding, top_k: int, version: str, exact: bool = False,
+               nprobe: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+               weights: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the merged (row_ids, scores) of the shards that answered; raises ShardError if none did"""
+        results = self._gather('/search', {
+            'embedding': encode_vector(query_embedding),
+            'top_k': top_k,
+            'exact': exact,
+            'nprobe': nprobe,
+            'filters': filters,
+            'weights': weights,
+        }, version)
+        return _merge(results, top_k)
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int, version: str,
+                     filters: Optional[Dict[str, Any]] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Exact top-k of many queries, one request per shard; raises ShardError if no shard answered"""
+        results = self._gather('/search_batch', {
+            'embeddings': [encode_vector(query) for query in query_embeddings],
+            'top_k': top_k,
+            'filters': filters,
+        }, version)
+        return [_merge([result['results'][i] for result in results], top_k) for i in range(len(query_embeddings))]
+
+    def _gather(self, path: str, payload: Dict[str, Any], version: str) -> List[Dict[str, Any]]:
+        """POST payload to every shard and return the answers from ``version`` that arrived in time"""
+        body = json.dumps(payload).encode('utf-8')
+        futures = {self.executor.submit(self._query, url, path, body): url for url in self.urls}
+        done, late = wait(futures, timeout=self.deadline)
+
+        results, stale = [], 0
+        for future in late:
+            self._failed(futures[future], 'timeout')
+        for future in done:
+            url = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.warning(f"Shard {url} failed: {e}")
+                self._failed(url, 'error')
+                continue
+            self._seen(url, result['source_version'], version)
+            if result['source_version'] != version:
+                self._failed(url, 'stale')
+                stale += 1
+                continue
+            results.append(result)
+        if not results and stale:
+            raise ShardError(f"{stale} shards answered, but from another index generation than {version}; "
+                             f"re-run 'shard_index.py split'")
+        if not results:
+            raise ShardError(f"No shard answered within {self.deadline}s")
+        return results
+
+    def check(self, version: str) -> Dict[str, Any]:
+        """Ask every shard's /health which generation it serves: counts of shards serving ``version``,
+        and the shards that serve another one or did not answer within the deadline"""
+        futures = {self.executor.submit(self._health, url): url for url in self.urls}
+        done, _ = wait(futures, timeout=self.deadline)
+        fresh, stale, unreachable = 0, [], []
+        for future, url in futures.items():
+            if future not in done or future.exception() is not None:
+                unreachable.append(url)
+                continue
+            source_version = future.result().get('source_version')
+            self._seen(url, source_version, version)
+            if source_version == version:
+                fresh += 1
+            else:
+                stale.append(url)
+        return {'fresh': fresh, 'stale': stale, 'unreachable': unreachable}
+
+    def states(self, version: str) -> Dict[str, int]:
+        """Shards by whether their last answer came from ``version``: fresh, stale or unknown (none yet)"""
+        with self._lock:
+            seen = list(self.source_versions.values())
+        return {'fresh': sum(v == version for v in seen),
+                'stale': sum(v is not None and v != version for v in seen),
+                'unknown': sum(v is None for v in seen)}
+
+    def _query(self, url: str, path: str, body: bytes) -> Dict[str, Any]:
+        request = urllib.request.Request(f"{url}{path}", data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.deadline) as response:
+            return json.loads(response.read())
+
+    def _health(self, url: str) -> Dict[str, Any]:
+        with urllib.request.urlopen(f"{url}/health", timeout=self.deadline) as response:
+            return json.loads(response.read())
+
+    def _seen(self, url: str, source_version: Optional[str], version: str) -> None:
+        with self._lock:
+            changed = self.source_versions[url] != source_version
+            self.source_versions[url] = source_version
+        if changed and source_version != version:
+            logging.warning(f"Shard {url} serves index generation {source_version}, not {version}; "
+                            f"its results are left out until it is split again")
+
+    def _failed(self, url: str, reason: str) -> None:
+        SHARD_FAILURES.inc(shard=url, reason=reason)
+        with self._lock:
+            self.failures[reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'shards': len(self.urls), 'deadline_seconds': self.deadline, 'failures': dict(self.failures),
+                    'source_versions': dict(self.source_versions)}
+
+
+def get_shard_coordinator() -> Optional[ShardCoordinator]:
+    """A coordinator for SHARD_URLS, or None to search the local index"""
+    urls = [url for url in os.getenv('SHARD_URLS', '').split(',') if url.strip()]
+    if not urls:
+        return None
+    return ShardCoordinator(urls, float(os.getenv('SHARD_DEADLINE', DEFAULT_DEADLINE_SECONDS)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the talent index into shards and serve them")
+    parser.add_argument('command', choices=['split', 'serve', 'cluster'])
+    parser.add_argument('--index-dir', default=os.getenv('TALENT_INDEX_DIR', 'talent_index'))
+    parser.add_argument('--out', default='talent_shards', help="directory holding one index root per shard")
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard-dir', help="shard index root to serve")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7101)
+    parser.add_argument('--base-port', type=int, default=7101, help="port of the first shard for cluster")
+    parser.add_argument('--search-engine', default=os.getenv('SEARCH_ENGINE', 'exact'))
+    parser.add_argument('--reload-interval', type=float, default=float(os.getenv('INDEX_RELOAD_INTERVAL', '30')))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'split':
+        start = time.perf_counter()
+        split_index(args.index_dir, args.out, args.shards)
+        logging.info(f"Split {args.index_dir} into {args.shards} shards in {time.perf_counter() - start:.1f}s")
+    elif args.command == 'serve':
+        if not args.shard_dir:
+            raise SystemExit("--shard-dir is required for serve")
+        serve_shard(args.shard_dir, args.host, args.port, args.search_engine, args.reload_interval)
+    else:
+        shard_dirs = sorted(os.path.join(args.out, name) for name in os.listdir(args.out) if name.startswith('shard-'))
+        if not shard_dirs:
+            raise SystemExit(f"No shards in {args.out}; run 'split' first")
+        # One process per shard, so every shard scans on its own core
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=serve_shard, name=os.path.basename(shard_dir),
+                                     args=(shard_dir, args.host, args.base_port + i, args.search_engine,
+                                           args.reload_interval))
+                     for i, shard_dir in enumerate(shard_dirs)]
+        for process in processes:
+            process.start()
+        urls = ','.join(f"http://{args.host}:{args.base_port + i}" for i in range(len(shard_dirs)))
+        print(f"SHARD_URLS={urls}")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+from metrics import REGISTRY, Counter
+
+COALESCED_CALLS = REGISTRY.register(Counter(
+    'talent_coalesced_calls_total', "Calls that waited on an identical in-flight call instead of making their own",
+    ['operation']))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for it and get the same result, or the same
+    exception raised again. Nothing is kept once the call finishes, so this
+    deduplicates bursts and is not a cache.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            COALESCED_CALLS.inc(operation=self.operation)
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,173 @@
+"""Local stand-in for the Gemini embedding and chat APIs, for offline builds, tests and benchmarks.
+
+    python stub_gemini.py --port 8765 --latency-ms 50 --chat-latency-ms 400 --fail-rate 0.1 \
+        --slow-rate 0.02 --slow-ms 2000
+    EMBEDDING_API_URL=http://127.0.0.1:8765 python build_index.py
+    EMBEDDING_API_URL=http://127.0.0.1:8765 CHAT_API_URL=http://127.0.0.1:8765 python app.py
+
+Responses are deterministic: the same text always maps to the same unit
+vector, and the same conversation to the same reply.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import numpy as np
+
+STUB_DIMENSION = 768
+STUB_REPLY_WORDS = 80
+# Words per streamed chat chunk
+STUB_CHUNK_WORDS = 4
+
+_REPLY_VOCABULARY = (
+    "great candidate strong match experience editing creative portfolio fast turnaround remote "
+    "available storytelling audience growth platform video skills collaborate brand vision "
+    "reliable detail oriented recommend shortlist interview rate budget timeline").split()
+_ANALYSIS_CHOICES = {
+    'job_type': ['video_editor', 'tiktok_creator', 'operations_manager', 'other'],
+    'experience_level': ['entry', 'mid', 'senior', 'executive'],
+    'work_type': ['full_time', 'part_time', 'contract', 'freelance'],
+    'location_preference': ['remote', 'onsite', 'hybrid', 'any'],
+    'urgency': ['low', 'medium', 'high'],
+    'company_culture': ['startup', 'corporate', 'creative', 'traditional'],
+}
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+
+
+def stub_embedding(text: str, dimension: int = STUB_DIMENSION) -> List[float]:
+    """Deterministic pseudo-embedding: a unit vector seeded by a hash of the text"""
+    vector = np.random.default_rng(_seed(text)).standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def stub_chat_reply(messages: List[dict], reply_words: int = STUB_REPLY_WORDS) -> str:
+    """Deterministic chat reply: a JSON analysis for job-analysis prompts, otherwise prose"""
+    conversation = '\n'.join(str(m.get('content', '')) for m in messages)
+    rng = random.Random(_seed(conversation))
+    if 'Analyze this job requirement' in conversation:
+        analysis = {key: rng.choice(values) for key, values in _ANALYSIS_CHOICES.items()}
+        analysis['key_skills'] = rng.sample(_REPLY_VOCABULARY, 3)
+        analysis['confidence'] = round(rng.uniform(0.5, 1.0), 2)
+        return json.dumps(analysis)
+    return ' '.join(rng.choice(_REPLY_VOCABULARY) for _ in range(reply_words)).capitalize() + '.'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep connections alive between requests, as the real APIs do
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this, Nagle delays every reused-connection reply
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        config = self.server.config
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with self.server.lock:
+            self.server.requests += 1
+
+        # For chat, the latency is the time to the first token
+        latency_ms = config['chat_latency_ms'] if self.path == '/chat' else config['latency_ms']
+        if config['slow_rate'] and random.random() < config['slow_rate']:
+            latency_ms += config['slow_ms']
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        if config['fail_rate'] and random.random() < config['fail_rate']:
+            self._send(503, {'error': 'injected failure'})
+            return
+
+        if self.path == '/embed':
+            texts = body.get('texts', [])
+            self._send(200, {'embeddings': [stub_embedding(t, config['dimension']) for t in texts]})
+        elif self.path == '/chat':
+            reply = stub_chat_reply(body.get('messages', []), config['reply_words'])
+            if body.get('stream'):
+                self._stream_words(reply, config['token_delay_ms'])
+            else:
+                self._send(200, {'text': reply})
+        else:
+            self._send(404, {'error': f"unknown path {self.path}"})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_words(self, text, delay_ms):
+        # One JSON object per line; the connection closes after the last one
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        words = text.split(' ')
+        for start in range(0, len(words), STUB_CHUNK_WORDS):
+            if start and delay_ms:
+                time.sleep(delay_ms / 1000)
+            chunk = ' '.join(words[start:start + STUB_CHUNK_WORDS])
+            self.wfile.write(json.dumps({'text': chunk if start == 0 else ' ' + chunk}).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_stub_server(host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0,
+                     fail_rate: float = 0.0, dimension: int = STUB_DIMENSION,
+                     chat_latency_ms: float = 0, token_delay_ms: float = 0,
+                     reply_words: int = STUB_REPLY_WORDS, slow_rate: float = 0.0,
+                     slow_ms: float = 0) -> ThreadingHTTPServer:
+    """Create (but do not start) a stub server; port 0 picks a free port.
+
+    ``slow_rate`` of the requests take ``slow_ms`` longer, to simulate upstream tail latency.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = {'latency_ms': latency_ms, 'fail_rate': fail_rate, 'dimension': dimension,
+                     'chat_latency_ms': chat_latency_ms, 'token_delay_ms': token_delay_ms,
+                     'reply_words': reply_words, 'slow_rate': slow_rate, 'slow_ms': slow_ms}
+    server.lock = threading.Lock()
+    server.requests = 0
+    return server
+
+
+def start_stub_server(**kwargs):
+    """Run a stub server on a background thread and return (server, base_url)"""
+    server = make_stub_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub for the Gemini embedding and chat APIs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--dimension', type=int, default=STUB_DIMENSION)
+    parser.add_argument('--chat-latency-ms', type=float, default=0, help="delay before the first chat token")
+    parser.add_argument('--token-delay-ms', type=float, default=0, help="delay between streamed chat chunks")
+    parser.add_argument('--reply-words', type=int, default=STUB_REPLY_WORDS)
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of requests delayed by --slow-ms")
+    parser.add_argument('--slow-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    server = make_stub_server(args.host, args.port, args.latency_ms, args.fail_rate, args.dimension,
+                              args.chat_latency_ms, args.token_delay_ms, args.reply_words,
+                              args.slow_rate, args.slow_ms)
+    print(f"Stub Gemini server listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
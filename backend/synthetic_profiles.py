@@ -0,0 +1,105 @@
+"""Synthetic talent profiles in the schema of the sample CSV, for benchmarks at any scale.
+
+    python synthetic_profiles.py --rows 100000 --output talent_100k.csv
+
+Every column is sampled from what the sample CSV actually contains: names,
+places and rates from their observed values, comma-separated fields from
+their observed vocabularies and list lengths, and descriptions from its
+sentences. The same seed always produces the same profiles.
+"""
+import argparse
+import logging
+import re
+import time
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_CSV = 'Talent Profiles - talent_samples.csv'
+LIST_COLUMNS = ['Job Types', 'Skills', 'Software', 'Content Verticals', 'Creative Styles', 'Platforms', 'Past Creators']
+SCALAR_COLUMNS = ['First Name', 'Last Name', 'Gender', 'City', 'Country',
+                  'Monthly Rate', 'Hourly Rate', '# of Views by Creators']
+DESCRIPTION_COLUMN = 'Profile Description'
+DESCRIPTION_SENTENCES = (5, 9)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+class ProfileVocabulary:
+    """Observed values of every column of a talent CSV, with their frequencies"""
+
+    def __init__(self, sample_df: pd.DataFrame):
+        self.columns = list(sample_df.columns)
+        self.scalars: Dict[str, np.ndarray] = {c: sample_df[c].to_numpy() for c in SCALAR_COLUMNS if c in sample_df}
+        self.values: Dict[str, np.ndarray] = {}
+        self.weights: Dict[str, np.ndarray] = {}
+        self.lengths: Dict[str, np.ndarray] = {}
+        for column in LIST_COLUMNS:
+            if column not in sample_df:
+                continue
+            cells = [[v.strip() for v in str(cell).split(',') if v.strip()] if pd.notna(cell) else []
+                     for cell in sample_df[column]]
+            counts = Counter(v for cell in cells for v in cell)
+            self.values[column] = np.array(list(counts), dtype=object)
+            frequencies = np.array(list(counts.values()), dtype=np.float64)
+            self.weights[column] = frequencies / frequencies.sum() if len(frequencies) else frequencies
+            self.lengths[column] = np.array([len(cell) for cell in cells])
+        sentences = [s for text in sample_df[DESCRIPTION_COLUMN].dropna() for s in _SENTENCE_END.split(str(text)) if s]
+        self.sentences = np.array(sentences, dtype=object)
+
+    @classmethod
+    def from_csv(cls, path: str = SAMPLE_CSV) -> 'ProfileVocabulary':
+        return cls(pd.read_csv(path))
+
+
+def _list_column(rng: np.random.Generator, rows: int, values: np.ndarray, weights: np.ndarray,
+                 lengths: np.ndarray) -> List[str]:
+    if len(values) == 0:
+        return [''] * rows
+    counts = rng.choice(lengths, size=rows)
+    picks = values[rng.choice(len(values), size=int(counts.sum()), p=weights)]
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    # dict.fromkeys drops repeats within a profile while keeping the drawn order
+    return [', '.join(dict.fromkeys(picks[bounds[i]:bounds[i + 1]])) for i in range(rows)]
+
+
+def generate_profiles(rows: int, seed: int = 0, vocabulary: ProfileVocabulary = None) -> pd.DataFrame:
+    """Return ``rows`` synthetic profiles with the sample CSV's columns"""
+    start = time.perf_counter()
+    vocabulary = vocabulary or ProfileVocabulary.from_csv()
+    rng = np.random.default_rng(seed)
+    data = {}
+    for column, observed in vocabulary.scalars.items():
+        data[column] = observed[rng.integers(0, len(observed), size=rows)]
+    for column, values in vocabulary.values.items():
+        data[column] = _list_column(rng, rows, values, vocabulary.weights[column], vocabulary.lengths[column])
+
+    low, high = DESCRIPTION_SENTENCES
+    counts = rng.integers(low, high + 1, size=rows)
+    picks = vocabulary.sentences[rng.integers(0, len(vocabulary.sentences), size=int(counts.sum()))]
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    data[DESCRIPTION_COLUMN] = [' '.join(picks[bounds[i]:bounds[i + 1]]) for i in range(rows)]
+
+    talent_df = pd.DataFrame({column: data.get(column, [''] * rows) for column in vocabulary.columns})
+    logging.info(f"Generated {rows} synthetic profiles in {time.perf_counter() - start:.2f}s")
+    return talent_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic talent profiles in the sample CSV schema")
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default=SAMPLE_CSV, help="CSV whose values and vocabularies are sampled")
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    talent_df = generate_profiles(args.rows, args.seed, ProfileVocabulary.from_csv(args.source))
+    talent_df.to_csv(args.output, index=False)
+    logging.info(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
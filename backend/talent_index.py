@@ -0,0 +1,188 @@
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return a C-contiguous float32 copy of matrix with L2-normalized rows"""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Positions of the top_k highest scores, best first, without a full sort"""
+    n = scores.shape[0]
+    top_k = max(0, min(int(top_k), n))
+    if top_k == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < n:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class TalentIndex:
+    """Resident, pre-normalized embedding matrix shared by /recommend and chat search.
+
+    Row ``i`` of ``matrix`` is the embedding of the profile at position
+    ``row_ids[i]`` of the talent DataFrame, so results can be looked up with
+    ``talent_df.iloc[row_ids]`` without copying or sorting the frame.
+    Rows flagged in ``tombstones`` (profiles removed by an incremental
+    re-index) stay in the matrix but are never returned.
+    """
+
+    def __init__(self, matrix: np.ndarray, row_ids: Optional[Sequence[int]] = None,
+                 normalized: bool = False, tombstones: Optional[np.ndarray] = None):
+        # Already-normalized float32 matrices (e.g. memory-mapped from disk) are used as-is
+        if normalized and matrix.dtype == np.float32 and matrix.ndim == 2:
+            self.matrix = matrix
+        else:
+            self.matrix = normalize_rows(matrix)
+        if row_ids is None:
+            row_ids = np.arange(self.matrix.shape[0])
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+        if self.row_ids.shape[0] != self.matrix.shape[0]:
+            raise ValueError("row_ids must have one entry per embedding row")
+        self.tombstones = tombstones if tombstones is not None and tombstones.any() else None
+        self.live_count = len(self) - (int(self.tombstones.sum()) if self.tombstones is not None else 0)
+
+    @classmethod
+    def from_dataframe(cls, talent_df: pd.DataFrame, column: str = 'embedding') -> 'TalentIndex':
+        """Build the index from a DataFrame whose column holds one embedding per row"""
+        if talent_df.empty or column not in talent_df:
+            return cls(np.zeros((0, 0), dtype=np.float32))
+
+        embeddings = talent_df[column].tolist()
+        positions = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        if not positions:
+            return cls(np.zeros((0, 0), dtype=np.float32))
+
+        matrix = np.array([embeddings[i] for i in positions], dtype=np.float32)
+        index = cls(matrix, positions)
+        logging.info(f"Built talent index with {len(index)} rows of dimension {index.dimension}")
+        return index
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    def scores(self, query_embedding: Sequence[float]) -> np.ndarray:
+        """Cosine similarity of the query against every indexed row (one matvec)"""
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))[0]
+        return self.matrix @ query
+
+    def mask_tombstones(self, scores: np.ndarray, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Push removed rows to the bottom of a score vector (over all rows, or over positions)"""
+        if self.tombstones is None:
+            return scores
+        dead = self.tombstones if positions is None else self.tombstones[positions]
+        return np.where(dead, -np.inf, scores).astype(np.float32, copy=False)
+
+    def search(self, query_embedding: Sequence[float], top_k: int,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row_ids, scores) of the top_k most similar profiles, best first.
+
+        ``rows`` restricts scoring to those matrix positions (e.g. the output
+        of a structured filter), so cost scales with the surviving rows.
+        """
+        if self.live_count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if rows is None:
+            scores = self.mask_tombstones(self.scores(query_embedding))
+            top = top_k_indices(scores, min(top_k, self.live_count))
+            return self.row_ids[top], scores[top]
+
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))[0]
+        scores = self.mask_tombstones(self.matrix[rows] @ query, rows)
+        top = top_k_indices(scores, top_k)
+        top = top[np.isfinite(scores[top])]
+        return self.row_ids[rows[top]], scores[top]
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None,
+                     max_block: int = 1 << 26):
+        """Top-k for many queries at once: one (Q x D) @ (D x N) product per block of queries.
+
+        Queries are processed in blocks so the Q x N score matrix stays under
+        ``max_block`` entries. Returns a list of (row_ids, scores), one per query.
+        """
+        queries = normalize_rows(query_embeddings)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        n = matrix.shape[0]
+        dead = None
+        if self.tombstones is not None:
+            dead = self.tombstones if rows is None else self.tombstones[rows]
+        k = min(top_k, n if dead is None else int(n - dead.sum()))
+        if k <= 0:
+            return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in range(len(queries))]
+
+        results = []
+        block = max(1, max_block // max(1, n))
+        for start in range(0, len(queries), block):
+            scores = queries[start:start + block] @ matrix.T
+            if dead is not None:
+                scores[:, dead] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (len(scores), 1))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            positions = top if rows is None else rows[top]
+            results.extend(zip(self.row_ids[positions], top_scores))
+        return results
+
+
+class FieldIndex:
+    """Per-field embeddings stacked as an (F, N, D) matrix, for client-weighted scoring.
+
+    The score of profile ``n`` is ``sum_f w_f * cos(query, field_f[n])``; all
+    fields are scored with one (F*N, D) @ (D,) product and then combined with
+    one (F,) @ (F, N) product, whatever weights the client sends.
+    """
+
+    def __init__(self, fields: Sequence[str], stacked: np.ndarray, tombstones: Optional[np.ndarray] = None):
+        if stacked.ndim != 3 or stacked.shape[0] != len(fields):
+            raise ValueError("stacked field embeddings must have shape (fields, rows, dimension)")
+        self.fields = list(fields)
+        self.stacked = stacked
+        self.tombstones = tombstones
+
+    def weight_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """Field weights as a vector in self.fields order, normalized to sum to 1"""
+        unknown = set(weights) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown weight fields: {', '.join(sorted(unknown))}; "
+                             f"expected any of {', '.join(self.fields)}")
+        try:
+            vector = np.array([float(weights.get(field, 0.0)) for field in self.fields], dtype=np.float32)
+        except (TypeError, ValueError):
+            raise ValueError("weights must be numbers")
+        if (vector < 0).any() or vector.sum() == 0:
+            raise ValueError("weights must be non-negative with at least one positive weight")
+        return vector / vector.sum()
+
+    def search(self, query_embedding: Sequence[float], weights: Dict[str, float], top_k: int,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row_ids, weighted scores) of the top_k profiles, best first"""
+        weight_vector = self.weight_vector(weights)
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))[0]
+        stacked = self.stacked if rows is None else self.stacked[:, rows, :]
+        n = stacked.shape[1]
+        field_scores = (stacked.reshape(-1, stacked.shape[2]) @ query).reshape(len(self.fields), n)
+        scores = weight_vector @ field_scores
+
+        if self.tombstones is not None:
+            dead = self.tombstones if rows is None else self.tombstones[rows]
+            scores = np.where(dead, -np.inf, scores).astype(np.float32, copy=False)
+        top = top_k_indices(scores, top_k)
+        top = top[np.isfinite(scores[top])]
+        return (top if rows is None else rows[top]), scores[top]
@@ -0,0 +1,172 @@
+"""API behaviour through the Flask test client, against an index built with the local stub.
+
+    python -m pytest test_app.py
+"""
+import threading
+import time
+
+import pytest
+
+import app_services
+from app import create_app, services
+from build_index import build_index
+from embeddings import HttpEmbeddingBackend
+from stub_gemini import start_stub_server
+
+SAMPLE_CSV = 'Talent Profiles - talent_samples.csv'
+CURSOR_DEPTH = 40
+
+
+@pytest.fixture(scope='module')
+def stub_url():
+    server, url = start_stub_server(dimension=32)
+    yield url
+    server.shutdown()
+
+
+@pytest.fixture(scope='module')
+def index_root(stub_url, tmp_path_factory):
+    root = str(tmp_path_factory.mktemp('index') / 'talent_index')
+    build_index(SAMPLE_CSV, root, HttpEmbeddingBackend(stub_url), batch_size=100, requests_per_second=1000,
+                fields=False)
+    return root
+
+
+@pytest.fixture(scope='module')
+def app(stub_url, index_root):
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv('EMBEDDING_API_URL', stub_url)
+        env.setenv('TALENT_INDEX_DIR', index_root)
+        env.setenv('GEMINI_API_KEY', 'test')
+        env.setenv('INDEX_RELOAD_INTERVAL', '0')
+        env.setenv('CURSOR_DEPTH', str(CURSOR_DEPTH))
+        yield create_app(preload=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def wait_until_loaded(client, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get('/health/ready')
+        if response.get_json()['index_state'] in ('ready', 'failed'):
+            return response
+        time.sleep(0.02)
+    raise AssertionError("index did not finish loading")
+
+
+def test_hybrid_pages_are_slices_of_one_deep_ranking(app, client):
+    query = 'video editor for a gaming channel'
+    response = client.post('/recommend', json={'job_description': query, 'top_k': 7, 'paginate': True,
+                                               'retrieval': 'hybrid'}).get_json()
+    pages = [response['results']]
+    while response['next_cursor']:
+        response = client.post('/recommend', json={'cursor': response['next_cursor'], 'top_k': 7}).get_json()
+        pages.append(response['results'])
+
+    with app.app_context():
+        talent_services = services()
+        snapshot = talent_services.index_holder.snapshot
+        row_ids, _, mode = snapshot.retrieve(query, talent_services.get_embedding(query), CURSOR_DEPTH, mode='hybrid')
+    assert mode == 'hybrid'
+    assert len(set(row_ids.tolist())) == CURSOR_DEPTH
+    assert len(pages[0]) == 7
+    paged = [result['name'] for page in pages for result in page]
+    assert paged == snapshot.talent_df['name'].iloc[row_ids].tolist()
+
+
+def test_searches_without_paginate_get_no_cursor(client):
+    response = client.post('/recommend', json={'job_description': 'podcast editor', 'top_k': 5}).get_json()
+
+    assert response['next_cursor'] is None
+    assert len(response['results']) == 5
+
+
+def test_readiness_goes_from_loading_to_ready_while_liveness_stays_up(stub_url, index_root, monkeypatch):
+    loading, release = threading.Event(), threading.Event()
+    load_snapshot = app_services.load_snapshot
+
+    def slow_load_snapshot(*args):
+        loading.set()
+        release.wait(10)
+        return load_snapshot(*args)
+
+    monkeypatch.setattr(app_services, 'load_snapshot', slow_load_snapshot)
+    monkeypatch.setenv('EMBEDDING_API_URL', stub_url)
+    monkeypatch.setenv('TALENT_INDEX_DIR', index_root)
+    monkeypatch.setenv('GEMINI_API_KEY', 'test')
+    monkeypatch.setenv('INDEX_RELOAD_INTERVAL', '0')
+    client = create_app(preload=False).test_client()
+    assert loading.wait(10)
+
+    unready = client.get('/health/ready')
+    assert unready.status_code == 503
+    assert unready.get_json() == {'ready': False, 'index_state': 'loading'}
+    health = client.get('/health')
+    assert health.status_code == 200
+    assert health.get_json()['index_state'] == 'loading'
+
+    release.set()
+    ready = wait_until_loaded(client)
+    assert ready.status_code == 200
+    assert ready.get_json() == {'ready': True, 'index_state': 'ready'}
+    assert client.get('/health').get_json()['talent_profiles_loaded'] > 0
+
+
+def test_failed_load_stays_unready_but_live(stub_url, tmp_path, monkeypatch):
+    # No published index and no CSV to build one from
+    monkeypatch.setattr(app_services, 'TALENT_CSV', str(tmp_path / 'missing.csv'))
+    monkeypatch.setenv('EMBEDDING_API_URL', stub_url)
+    monkeypatch.setenv('TALENT_INDEX_DIR', str(tmp_path / 'talent_index'))
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    monkeypatch.setenv('INDEX_RELOAD_INTERVAL', '0')
+    client = create_app(preload=False).test_client()
+
+    failed = wait_until_loaded(client)
+    assert failed.status_code == 503
+    assert failed.get_json() == {'ready': False, 'index_state': 'failed'}
+    health = client.get('/health')
+    assert health.status_code == 200
+    assert health.get_json()['ready'] is False
+    assert health.get_json()['ai_chat_available'] is False
+
+
+def test_metrics_endpoint_exposes_request_histograms(client):
+    client.post('/recommend', json={'job_description': 'podcast editor', 'top_k': 5, 'retrieval': 'lexical'})
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    assert '# TYPE talent_http_request_seconds histogram' in lines
+    assert '# HELP talent_index_profiles Searchable profiles in the live index generation' in lines
+    assert '# TYPE talent_index_profiles gauge' in lines
+    labels = 'endpoint="/recommend",method="POST",status="200"'
+    buckets = [line for line in lines if line.startswith(f'talent_http_request_seconds_bucket{{{labels},')]
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert buckets[-1].startswith(f'talent_http_request_seconds_bucket{{{labels},le="+Inf"}}')
+    assert counts == sorted(counts) and counts[-1] >= 1
+    assert f'talent_http_request_seconds_count{{{labels}}} {counts[-1]}' in lines
+    assert any(line.startswith(f'talent_http_request_seconds_sum{{{labels}}} ') for line in lines)
+
+
+def test_server_timing_header_reports_each_search_stage(app, client):
+    query = {'job_description': 'video editor for a gaming channel', 'top_k': 5, 'retrieval': 'hybrid'}
+    assert 'Server-Timing' not in client.post('/recommend', json=query).headers
+
+    app.config['SERVER_TIMING'] = True
+    try:
+        header = client.post('/recommend', json=query).headers['Server-Timing']
+    finally:
+        app.config['SERVER_TIMING'] = False
+
+    durations = {}
+    for entry in header.split(', '):
+        stage, duration = entry.split(';dur=')
+        durations[stage] = float(duration)
+    assert {'semantic_search', 'lexical_search', 'rank_fusion', 'serialize', 'total'} <= set(durations)
+    assert list(durations)[-1] == 'total'
+    assert all(durations['total'] >= duration for duration in durations.values())
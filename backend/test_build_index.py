@@ -0,0 +1,94 @@
+"""Index builds against the local embedding stub: full, no-op and incremental.
+
+    python -m pytest test_build_index.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from build_index import build_index, load_talent_csv
+from embeddings import HttpEmbeddingBackend
+from index_store import current_generation_dir, load_index
+from stub_gemini import start_stub_server, stub_embedding
+
+SAMPLE_CSV = 'Talent Profiles - talent_samples.csv'
+SAMPLE_ROWS = 20
+# One text per request, so the stub's request count is the number of texts embedded
+BUILD_OPTIONS = {'batch_size': 1, 'workers': 4, 'requests_per_second': 1000, 'fields': False}
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server(dimension=32)
+    yield server, HttpEmbeddingBackend(url)
+    server.shutdown()
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    csv_path = tmp_path / 'profiles.csv'
+    source = pd.read_csv(SAMPLE_CSV)
+    source.head(SAMPLE_ROWS).to_csv(csv_path, index=False)
+    return csv_path, source
+
+
+def embed_calls(server, build):
+    before = server.requests
+    manifest = build()
+    return manifest, server.requests - before
+
+
+def test_full_build_embeds_every_profile(stub, profiles, tmp_path):
+    server, backend = stub
+    csv_path, _ = profiles
+    index_root = str(tmp_path / 'talent_index')
+
+    manifest, calls = embed_calls(server, lambda: build_index(str(csv_path), index_root, backend, **BUILD_OPTIONS))
+
+    assert calls == SAMPLE_ROWS
+    assert manifest['rows'] == SAMPLE_ROWS
+    talent_df, index, _ = load_index(index_root)
+    expected = np.array([stub_embedding(text, 32) for text in load_talent_csv(str(csv_path))['combined_features']])
+    np.testing.assert_allclose(index.matrix, expected, atol=1e-6)
+    assert index.tombstones is None or not index.tombstones.any()
+    assert talent_df['name'].tolist() == load_talent_csv(str(csv_path))['name'].tolist()
+
+
+def test_unchanged_rebuild_makes_no_embed_calls(stub, profiles, tmp_path):
+    server, backend = stub
+    csv_path, _ = profiles
+    index_root = str(tmp_path / 'talent_index')
+    build_index(str(csv_path), index_root, backend, **BUILD_OPTIONS)
+    generation = current_generation_dir(index_root)
+
+    _, calls = embed_calls(server, lambda: build_index(str(csv_path), index_root, backend, **BUILD_OPTIONS))
+
+    assert calls == 0
+    assert current_generation_dir(index_root) == generation
+
+
+def test_incremental_build_embeds_changes_and_tombstones_old_rows(stub, profiles, tmp_path):
+    server, backend = stub
+    csv_path, source = profiles
+    index_root = str(tmp_path / 'talent_index')
+    build_index(str(csv_path), index_root, backend, **BUILD_OPTIONS)
+
+    edited = source.head(SAMPLE_ROWS).copy()
+    edited.loc[0, 'Profile Description'] = 'Now editing long-form documentaries full time.'
+    edited = edited.drop(index=1)
+    edited = pd.concat([edited, source.iloc[[SAMPLE_ROWS]]], ignore_index=True)
+    edited.to_csv(csv_path, index=False)
+
+    manifest, calls = embed_calls(server, lambda: build_index(str(csv_path), index_root, backend, **BUILD_OPTIONS))
+
+    # The edited and the added profile are embedded; everything else is reused
+    assert calls == 2
+    assert manifest['rows'] == SAMPLE_ROWS + 2
+    talent_df, index, _ = load_index(index_root)
+    assert index.tombstones is not None
+    assert index.tombstones.tolist() == [True, True] + [False] * (SAMPLE_ROWS)
+    live = talent_df[~index.tombstones]
+    assert sorted(live['name']) == sorted(load_talent_csv(str(csv_path))['name'])
+    edited_row = int(np.flatnonzero(talent_df['Profile Description'] == edited.loc[0, 'Profile Description'])[0])
+    np.testing.assert_allclose(index.matrix[edited_row],
+                               stub_embedding(talent_df['combined_features'][edited_row], 32), atol=1e-6)
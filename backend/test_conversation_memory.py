@@ -0,0 +1,58 @@
+"""Per-session chat memory: budget trimming and concurrent updates.
+
+    python -m pytest test_conversation_memory.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conversation_memory import ConversationMemory, InMemorySessionBackend, SQLiteSessionBackend
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return InMemorySessionBackend()
+    return SQLiteSessionBackend(str(tmp_path / 'sessions.sqlite'))
+
+
+def test_trims_whole_exchanges_into_the_summary(backend):
+    memory = ConversationMemory(backend, max_tokens=120)
+    for i in range(6):
+        memory.append('s1', f"request {i} " + 'x' * 40, f"reply {i} " + 'y' * 120)
+
+    state = memory.load('s1')
+    roles = [turn['role'] for turn in state['turns']]
+    assert roles and roles[0] == 'user'
+    assert roles == ['user', 'assistant'] * (len(roles) // 2)
+    assert 'request 4' in state['summary']
+    assert memory.format_history('s1').splitlines()[1].startswith('User: ')
+
+
+@pytest.mark.parametrize('max_tokens', [24, 50, 120, 1000])
+def test_latest_exchange_is_always_kept(backend, max_tokens):
+    memory = ConversationMemory(backend, max_tokens=max_tokens)
+    for i in range(3):
+        memory.append('s1', f"request {i} " + 'x' * 5000, f"reply {i} " + 'y' * 5000)
+
+    turns = memory.load('s1')['turns']
+    assert [turn['role'] for turn in turns[-2:]] == ['user', 'assistant']
+    assert turns[-2]['content'].startswith('request 2')
+    assert turns[-1]['content'].startswith('reply 2')
+
+
+def test_concurrent_appends_to_one_session_keep_every_turn(backend):
+    memory = ConversationMemory(backend, max_tokens=100000)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: memory.append('s1', f"request {i}", f"reply {i}"), range(50)))
+
+    requests = {turn['content'] for turn in memory.load('s1')['turns'] if turn['role'] == 'user'}
+    assert requests == {f"request {i}" for i in range(50)}
+
+
+def test_sessions_without_id_are_not_stored(backend):
+    memory = ConversationMemory(backend)
+    memory.append(None, 'hello', 'hi')
+
+    assert memory.format_history(None) == ''
+    assert memory.stats()['sessions'] == 0
@@ -0,0 +1,80 @@
+"""Embedding cache keying, LRU bound, SQLite tier and coalesced misses.
+
+    python -m pytest test_embedding_cache.py
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+MODEL = 'models/text-embedding-004'
+
+
+def test_keys_on_model_task_type_and_normalized_text():
+    cache = EmbeddingCache()
+    cache.put(MODEL, 'RETRIEVAL_QUERY', 'video  editor\n', [1.0, 0.0])
+
+    assert cache.get(MODEL, 'RETRIEVAL_QUERY', ' video editor ').tolist() == [1.0, 0.0]
+    assert cache.get(MODEL, 'RETRIEVAL_DOCUMENT', 'video editor') is None
+    assert cache.get('models/other', 'RETRIEVAL_QUERY', 'video editor') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_evicts_least_recently_used_beyond_max_entries():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put(MODEL, 'q', 'a', [1.0])
+    cache.put(MODEL, 'q', 'b', [2.0])
+    cache.get(MODEL, 'q', 'a')
+    cache.put(MODEL, 'q', 'c', [3.0])
+
+    assert cache.get(MODEL, 'q', 'b') is None
+    assert cache.get(MODEL, 'q', 'a') is not None
+    assert cache.stats()['entries'] == 2
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    db_path = str(tmp_path / 'embeddings.sqlite')
+    EmbeddingCache(db_path=db_path).put(MODEL, 'q', 'editor', [0.5, 0.25])
+
+    other = EmbeddingCache(db_path=db_path)
+    vector = other.get(MODEL, 'q', 'editor')
+
+    assert vector.dtype == np.float32
+    assert vector.tolist() == [0.5, 0.25]
+    assert other.stats()['disk_hits'] == 1
+    # Promoted into memory, so the next lookup is a memory hit
+    other.get(MODEL, 'q', 'editor')
+    assert other.stats()['hits'] == 1
+
+
+def test_concurrent_misses_share_one_compute():
+    cache = EmbeddingCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return [1.0, 2.0]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(cache.get_or_compute, MODEL, 'q', 'burst', compute)]
+        started.wait(5)
+        futures += [executor.submit(cache.get_or_compute, MODEL, 'q', 'burst', compute) for _ in range(7)]
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert len(calls) == 1
+    assert all(result.tolist() == [1.0, 2.0] for result in results)
+    assert cache.get(MODEL, 'q', 'burst') is not None
+
+
+def test_failed_compute_is_not_cached():
+    cache = EmbeddingCache()
+
+    assert cache.get_or_compute(MODEL, 'q', 'down', lambda: None) is None
+    assert cache.get_or_compute(MODEL, 'q', 'down', lambda: [1.0]).tolist() == [1.0]
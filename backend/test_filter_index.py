@@ -0,0 +1,36 @@
+"""Filter expression evaluation and validation.
+
+    python -m pytest test_filter_index.py
+"""
+import pandas as pd
+import pytest
+
+from filter_index import FilterError, FilterIndex
+
+
+@pytest.fixture
+def filter_index():
+    return FilterIndex(pd.DataFrame({
+        'Country': ['United States', 'Canada', 'United States'],
+        'Software': ['Final Cut Pro, Premiere Pro', 'Premiere Pro', 'DaVinci Resolve'],
+        'Monthly Rate': [3000, 1500, None],
+    }))
+
+
+def test_combines_categorical_and_numeric_conditions(filter_index):
+    rows = filter_index.evaluate({'country': 'united states', 'software': {'any': ['Premiere Pro']},
+                                  'monthly_rate': {'gte': 2000}})
+
+    assert rows.tolist() == [0]
+    assert filter_index.evaluate({'software': {'none': ['Premiere Pro']}}).tolist() == [2]
+
+
+@pytest.mark.parametrize('condition', [
+    {'any': 5},
+    {'all': {'Premiere Pro': True}},
+    {'none': ['Premiere Pro', 3]},
+    ['Premiere Pro', None],
+])
+def test_rejects_set_operands_that_are_not_lists_of_strings(filter_index, condition):
+    with pytest.raises(FilterError):
+        filter_index.evaluate({'software': condition})
@@ -0,0 +1,100 @@
+"""Versioned on-disk index: save/load round trip, checksums, mmap and generation publishing.
+
+    python -m pytest test_index_store.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from index_store import (CURRENT_FILE, EMBEDDINGS_FILE, METADATA_FILE, TOMBSTONES_FILE, IndexStoreError,
+                         current_generation_dir, load_index, new_generation_dir, publish_generation, save_index)
+
+MODEL = 'models/text-embedding-004'
+
+
+@pytest.fixture
+def profiles():
+    talent_df = pd.DataFrame({'name': ['Ana', 'Ben', 'Cal'], 'Country': ['Canada', 'Mexico', None],
+                              'Monthly Rate': [1500.0, None, 3000.0]})
+    embeddings = np.random.default_rng(3).normal(size=(3, 8)).astype(np.float32)
+    return talent_df, embeddings
+
+
+def publish(index_root, talent_df, embeddings, **kwargs):
+    generation_dir = new_generation_dir(index_root)
+    save_index(generation_dir, talent_df, embeddings, MODEL, **kwargs)
+    publish_generation(index_root, generation_dir)
+    return generation_dir
+
+
+def flip_byte(path, offset=-1):
+    with open(path, 'r+b') as f:
+        f.seek(offset, os.SEEK_END)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_round_trip_memory_maps_the_normalized_matrix(profiles, tmp_path):
+    talent_df, embeddings = profiles
+    index_root = str(tmp_path / 'talent_index')
+    generation_dir = publish(index_root, talent_df, embeddings)
+
+    loaded_df, index, manifest = load_index(index_root, verify=True)
+
+    assert isinstance(index.matrix, np.memmap)
+    assert not index.matrix.flags.writeable
+    expected = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.testing.assert_allclose(index.matrix, expected, atol=1e-6)
+    pd.testing.assert_frame_equal(loaded_df, talent_df)
+    assert manifest['index_dir'] == generation_dir
+    assert (manifest['rows'], manifest['dimension'], manifest['model']) == (3, 8, MODEL)
+
+
+@pytest.mark.parametrize('file_name', [EMBEDDINGS_FILE, METADATA_FILE])
+def test_verify_rejects_files_that_do_not_match_their_checksum(profiles, tmp_path, file_name):
+    index_root = str(tmp_path / 'talent_index')
+    generation_dir = publish(index_root, *profiles)
+    flip_byte(os.path.join(generation_dir, file_name), offset=-2)
+
+    with pytest.raises(IndexStoreError, match='Checksum mismatch'):
+        load_index(index_root, verify=True)
+
+
+def test_tombstones_are_written_atomically_with_a_checksum(profiles, tmp_path):
+    index_root = str(tmp_path / 'talent_index')
+    mask = np.array([False, True, False])
+    generation_dir = publish(index_root, *profiles, tombstones=mask)
+
+    _, index, manifest = load_index(index_root, verify=True)
+
+    np.testing.assert_array_equal(index.tombstones, mask)
+    assert manifest['tombstones'] == 1 and 'tombstones_sha256' in manifest
+    assert not [name for name in os.listdir(generation_dir) if name.endswith('.tmp')]
+
+    flip_byte(os.path.join(generation_dir, TOMBSTONES_FILE))
+    with pytest.raises(IndexStoreError, match='Checksum mismatch'):
+        load_index(index_root, verify=True)
+
+
+def test_incomplete_or_mismatched_indexes_are_rejected(profiles, tmp_path):
+    talent_df, embeddings = profiles
+    with pytest.raises(IndexStoreError):
+        load_index(str(tmp_path / 'missing'))
+    with pytest.raises(IndexStoreError):
+        save_index(str(tmp_path / 'bad'), talent_df, embeddings[:2], MODEL)
+
+
+def test_publishing_switches_current_and_prunes_old_generations(profiles, tmp_path):
+    talent_df, embeddings = profiles
+    index_root = str(tmp_path / 'talent_index')
+    generations = [publish(index_root, talent_df, embeddings * (i + 1)) for i in range(3)]
+
+    with open(os.path.join(index_root, CURRENT_FILE), encoding='utf-8') as f:
+        assert f.read() == os.path.basename(generations[-1])
+    assert current_generation_dir(index_root) == generations[-1]
+    assert not os.path.exists(generations[0])
+    assert os.path.exists(generations[1])
+    assert load_index(index_root)[2]['index_dir'] == generations[-1]
@@ -0,0 +1,58 @@
+"""Local job analysis: vocabulary matching, aliases and confidence.
+
+    python -m pytest test_job_analyzer.py
+"""
+import pytest
+
+from build_index import load_talent_csv
+from job_analyzer import JobRequirementAnalyzer
+
+SAMPLE_CSV = 'Talent Profiles - talent_samples.csv'
+# CHAT_LOCAL_ANALYSIS_THRESHOLD's default: below it the LLM analysis is used
+LOCAL_ANALYSIS_THRESHOLD = 0.6
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return JobRequirementAnalyzer(load_talent_csv(SAMPLE_CSV))
+
+
+def test_matches_tools_without_their_vendor_and_by_trailing_sub_phrase(analyzer):
+    skills, names_job_type = analyzer.match_vocabulary("someone who knows Premiere Pro and After Effects")
+
+    assert skills == ['Adobe Premiere Pro', 'Adobe After Effects']
+    assert not names_job_type
+    assert analyzer.match_vocabulary("cuts in Final Cut Pro or Photoshop")[0] == ['Final Cut Pro', 'Adobe Photoshop']
+
+
+def test_matches_plural_job_types(analyzer):
+    assert analyzer.match_vocabulary("we need two video editors") == (['Video Editor'], True)
+
+
+def test_exact_values_win_over_aliases(analyzer):
+    assert analyzer.match_vocabulary("Adobe Premiere Pro and Social Media Manager")[0] == [
+        'Adobe Premiere Pro', 'Social Media Manager']
+    assert analyzer.match_vocabulary("motion graphics")[0] == ['Motion Graphics']
+
+
+def test_ambiguous_aliases_are_left_out(analyzer):
+    # "deal negotiations" ends both "Brand deal negotiations" and "Equity deal negotiations"
+    assert ('deal', 'negotiations') not in analyzer.aliases
+    assert analyzer.match_vocabulary("handles deal negotiations")[0] == []
+
+
+@pytest.mark.parametrize('query', [
+    "someone who knows Premiere Pro and After Effects",
+    "looking for video editors fluent in Photoshop",
+    "need a thumbnail designer",
+    "an animator who can use Illustrator",
+    "someone for color grading in Davinci Resolve",
+    "hire a podcast editor, remote, asap",
+])
+def test_common_phrasings_clear_the_local_analysis_threshold(analyzer, query):
+    assert analyzer.analyze(query)['confidence'] >= LOCAL_ANALYSIS_THRESHOLD
+
+
+@pytest.mark.parametrize('query', ["what about cheaper ones?", "show me more like the second one"])
+def test_vague_follow_ups_fall_below_the_threshold(analyzer, query):
+    assert analyzer.analyze(query)['confidence'] < LOCAL_ANALYSIS_THRESHOLD
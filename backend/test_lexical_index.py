@@ -0,0 +1,73 @@
+"""BM25 ranking, row restriction, rank fusion and the lexical fallback of retrieval.
+
+    python -m pytest test_lexical_index.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from index_holder import IndexSnapshot
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, words
+from talent_index import TalentIndex
+
+
+@pytest.fixture
+def talent_df():
+    return pd.DataFrame({
+        'name': ['Ana', 'Ben', 'Cal', 'Dee'],
+        'Job Types': ['Video Editor', 'Video Editor', 'Podcast Editor', 'Thumbnail Designer'],
+        'Skills': ['Color Grading, Motion Graphics', 'Color Grading', 'Music Editing', 'Graphic Design'],
+        'Software': ['Adobe Premiere Pro, Adobe After Effects', 'Final Cut Pro', 'Adobe Audition', 'Adobe Photoshop'],
+        'Platforms': ['YouTube', 'TikTok', 'Spotify', 'YouTube'],
+    })
+
+
+def test_tokenizer_keeps_tool_names_whole():
+    assert words("C++ and C#, After-Effects. Frame.io's") == ['c++', 'and', 'c#', 'after-effects', "frame.io's"]
+
+
+def test_exact_phrases_outrank_shared_words(talent_df):
+    index = LexicalIndex(talent_df)
+    row_ids, scores = index.search('premiere pro and after effects', 4)
+
+    assert row_ids[0] == 0
+    # "pro" alone also matches Final Cut Pro, but scores lower than both phrases
+    assert row_ids.tolist() == [0, 1]
+    assert scores[0] > scores[1] > 0
+
+
+def test_only_matching_profiles_are_returned(talent_df):
+    row_ids, _ = LexicalIndex(talent_df).search('video editor', 10)
+
+    assert sorted(row_ids.tolist()) == [0, 1, 2]
+    assert LexicalIndex(talent_df).search('blockchain', 10)[0].size == 0
+
+
+def test_tombstones_and_rows_restrict_the_result(talent_df):
+    index = LexicalIndex(talent_df)
+    tombstones = np.array([True, False, False, False])
+
+    assert 0 not in index.search('video editor', 10, tombstones=tombstones)[0].tolist()
+    assert index.search('video editor', 10, rows=np.array([1, 3]))[0].tolist() == [1]
+
+
+def test_rank_fusion_favours_rows_ranked_high_by_both():
+    row_ids, scores = reciprocal_rank_fusion([np.array([3, 1, 2]), np.array([1, 4, 3])], top_k=3, k=60)
+
+    assert row_ids.tolist() == [1, 3, 4]
+    assert scores[0] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores[1] == pytest.approx(1 / 61 + 1 / 63)
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_retrieval_falls_back_to_lexical_without_an_embedding(talent_df):
+    matrix = np.eye(4, dtype=np.float32)
+    snapshot = IndexSnapshot(talent_df, TalentIndex(matrix))
+
+    for mode in ('semantic', 'hybrid'):
+        row_ids, _, used = snapshot.retrieve('podcast editor audition', None, 2, mode=mode)
+        assert used == 'lexical'
+        assert row_ids[0] == 2
+    row_ids, _, used = snapshot.retrieve('podcast editor', matrix[3], 2, mode='semantic')
+    assert used == 'semantic'
+    assert row_ids[0] == 3
@@ -0,0 +1,43 @@
+"""Prometheus text exposition of counters and histograms, and the Server-Timing header value.
+
+    python -m pytest test_metrics.py
+"""
+from metrics import Counter, Histogram, MetricsRegistry, server_timing_header
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram('latency_seconds', "Request latency", ['endpoint'],
+                                            buckets=(0.1, 0.5, 1.0)))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.observe(value, endpoint='/recommend')
+
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Request latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{endpoint="/recommend",le="0.1"} 2',
+        'latency_seconds_bucket{endpoint="/recommend",le="0.5"} 3',
+        'latency_seconds_bucket{endpoint="/recommend",le="1"} 3',
+        'latency_seconds_bucket{endpoint="/recommend",le="+Inf"} 4',
+        'latency_seconds_sum{endpoint="/recommend"} 2.45',
+        'latency_seconds_count{endpoint="/recommend"} 4',
+    ]
+
+
+def test_counter_labels_are_escaped_and_sorted():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter('errors_total', "Errors", ['upstream']))
+    counter.inc(upstream='embedding')
+    counter.inc(2, upstream='chat "v2"')
+
+    assert counter.value(upstream='embedding') == 1
+    assert registry.render().splitlines()[2:] == [
+        'errors_total{upstream="chat \\"v2\\""} 2',
+        'errors_total{upstream="embedding"} 1',
+    ]
+
+
+def test_server_timing_sums_repeated_stages_and_ends_with_the_total():
+    header = server_timing_header([('lexical_search', 0.002), ('serialize', 0.001), ('lexical_search', 0.003)], 0.01)
+
+    assert header == 'lexical_search;dur=5.0, serialize;dur=1.0, total;dur=10.0'
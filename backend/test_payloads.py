@@ -0,0 +1,50 @@
+"""Pre-serialized profile payloads and field projections.
+
+    python -m pytest test_payloads.py
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from payloads import FieldProjectionError, ProfilePayloads, render_json
+
+
+@pytest.fixture
+def payloads():
+    return ProfilePayloads(pd.DataFrame({
+        'name': ['Ada Lovelace', 'Émile "E" Zola'],
+        'City': ['London', float('nan')],
+        'Monthly Rate': [4000, 2500],
+        'embedding': [[0.1, 0.2], [0.3, 0.4]],
+    }))
+
+
+def decode(payloads, row_ids, columns):
+    records = payloads.records(np.array(row_ids), np.array([0.5] * len(row_ids)), columns)
+    return json.loads(render_json(records))
+
+
+def test_full_records_match_the_dataframe(payloads):
+    records = decode(payloads, [1, 0], payloads.resolve_fields(None))
+
+    assert records == [
+        {'name': 'Émile "E" Zola', 'City': None, 'Monthly Rate': 2500, 'similarity': 0.5, 'final_score': 0.5},
+        {'name': 'Ada Lovelace', 'City': 'London', 'Monthly Rate': 4000, 'similarity': 0.5, 'final_score': 0.5},
+    ]
+
+
+def test_projection_keeps_requested_fields_in_request_order(payloads):
+    records = decode(payloads, [1], payloads.resolve_fields(['Monthly Rate', 'name', 'similarity']))
+
+    assert list(records[0]) == ['Monthly Rate', 'name', 'similarity', 'final_score']
+    assert records[0]['name'] == 'Émile "E" Zola'
+    assert decode(payloads, [0], payloads.resolve_fields([])) == [{'similarity': 0.5, 'final_score': 0.5}]
+
+
+def test_rejects_unknown_and_internal_fields(payloads):
+    with pytest.raises(FieldProjectionError):
+        payloads.resolve_fields(['embedding'])
+    with pytest.raises(FieldProjectionError):
+        payloads.resolve_fields('name')
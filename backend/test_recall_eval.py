@@ -0,0 +1,39 @@
+"""Recall/latency sweeps shared by the IVF and quantized index reports.
+
+    python -m pytest test_recall_eval.py
+"""
+import numpy as np
+
+from ann_index import IVFIndex, recall_report
+from quantized_index import QuantizedIndex, quantization_report
+from recall_eval import recall_sweep, sample_queries
+from talent_index import TalentIndex, normalize_rows
+
+
+def make_index(rows=400, dimension=32):
+    return TalentIndex(normalize_rows(np.random.default_rng(1).standard_normal((rows, dimension))))
+
+
+def test_exact_search_has_full_recall():
+    base = make_index()
+    report = recall_sweep(base, sample_queries(base, 20), 5, 'depth', [5], lambda q, depth: base.search(q, depth))
+
+    assert [(run['depth'], run['recall_at_k']) for run in report['runs']] == [(5, 1.0)]
+    assert report['queries'] == 20
+    assert report['exact']['p50_ms'] <= report['exact']['p99_ms']
+
+
+def test_reports_keep_their_engine_specific_keys():
+    base = make_index()
+    queries = sample_queries(base, 20)
+
+    ivf = recall_report(base, IVFIndex.build(base, 8), queries, 10, [1, 8])
+    assert ivf['nlist'] == 8
+    assert [run['nprobe'] for run in ivf['ivf']] == [1, 8]
+    assert ivf['ivf'][-1]['recall_at_k'] == 1.0
+
+    quantized = quantization_report(base, QuantizedIndex.build(base, 'int8'), queries, 10, [0, 100])
+    assert quantized['dtype'] == 'int8'
+    assert quantized['memory']['float32_bytes'] == base.matrix.nbytes
+    assert quantized['memory']['quantized_bytes'] < base.matrix.nbytes / 3
+    assert quantized['quantized'][-1]['recall_at_k'] >= 0.95
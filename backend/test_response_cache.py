@@ -0,0 +1,106 @@
+"""Semantic chat response cache: similarity threshold, expiry, eviction and keying.
+
+    python -m pytest test_response_cache.py
+"""
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from conversation_memory import ConversationMemory
+from response_cache import SemanticResponseCache
+
+REPLY = {'analysis': {}, 'candidates': [], 'message': 'Here are two editors.'}
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def rotated(similarity: float) -> np.ndarray:
+    """A unit vector at exactly ``similarity`` cosine to (1, 0)"""
+    return np.array([similarity, np.sqrt(1 - similarity ** 2)], dtype=np.float32)
+
+
+def test_hits_at_or_above_the_similarity_threshold():
+    cache = SemanticResponseCache(threshold=0.95)
+    cache.put(unit(1, 0), None, 'v1', REPLY)
+
+    assert cache.get(unit(2, 0), None, 'v1') == REPLY
+    assert cache.get(rotated(0.96), None, 'v1') == REPLY
+    assert cache.get(rotated(0.94), None, 'v1') is None
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = SemanticResponseCache(ttl=0.05)
+    cache.put(unit(1, 0), None, 'v1', REPLY)
+    time.sleep(0.1)
+
+    assert cache.get(unit(1, 0), None, 'v1') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_evicts_least_recently_used_beyond_max_entries():
+    cache = SemanticResponseCache(max_entries=2)
+    cache.put(unit(1, 0, 0), None, 'v1', {'message': 'a'})
+    cache.put(unit(0, 1, 0), None, 'v1', {'message': 'b'})
+    cache.get(unit(1, 0, 0), None, 'v1')
+    cache.put(unit(0, 0, 1), None, 'v1', {'message': 'c'})
+
+    assert cache.get(unit(0, 1, 0), None, 'v1') is None
+    assert cache.get(unit(1, 0, 0), None, 'v1') == {'message': 'a'}
+    assert cache.get(unit(0, 0, 1), None, 'v1') == {'message': 'c'}
+
+
+def test_index_version_change_drops_every_entry():
+    cache = SemanticResponseCache()
+    cache.put(unit(1, 0), None, 'v1', REPLY)
+
+    assert cache.get(unit(1, 0), None, 'v2') is None
+    assert cache.get(unit(1, 0), None, 'v1') is None
+
+
+def test_filters_keep_entries_apart():
+    cache = SemanticResponseCache()
+    cache.put(unit(1, 0), {'country': 'Canada', 'software': ['Figma']}, 'v1', {'message': 'canada'})
+    cache.put(unit(1, 0), None, 'v1', {'message': 'anywhere'})
+
+    assert cache.get(unit(1, 0), {'software': ['Figma'], 'country': 'Canada'}, 'v1') == {'message': 'canada'}
+    assert cache.get(unit(1, 0), {}, 'v1') == {'message': 'anywhere'}
+    assert cache.get(unit(1, 0), {'country': 'Mexico'}, 'v1') is None
+
+
+def test_disabled_cache_and_missing_embeddings_store_nothing():
+    disabled = SemanticResponseCache(max_entries=0)
+    disabled.put(unit(1, 0), None, 'v1', REPLY)
+    cache = SemanticResponseCache()
+    cache.put(None, None, 'v1', REPLY)
+
+    assert disabled.get(unit(1, 0), None, 'v1') is None
+    assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.parametrize('completed', [True, False])
+def test_only_completed_llm_replies_are_cached_and_remembered(monkeypatch, completed):
+    # The chat service needs the LLM SDKs only to be constructed; its message flow does not
+    ai_chat_service = pytest.importorskip('ai_chat_service')
+    service = object.__new__(ai_chat_service.AIChatService)
+    service.response_cache = SemanticResponseCache()
+    service.conversation_memory = ConversationMemory()
+    analysis = Future()
+    analysis.set_result({'job_type': 'video_editor'})
+    monkeypatch.setattr(service, 'retrieve_and_analyze', lambda message, filters, session_id: {
+        'candidates': [], 'analysis': analysis, 'history': '', 'query_embedding': unit(1, 0),
+        'version': 'v1', 'cached': False})
+    monkeypatch.setattr(service, 'generate_chat_reply',
+                        lambda *args: ('LLM reply', True) if completed else ('Fallback reply', False))
+
+    result = service.process_chat_message('need an editor', session_id='s1')
+
+    assert result['success'] is completed
+    assert (service.response_cache.get(unit(1, 0), None, 'v1') is not None) is completed
+    assert bool(service.conversation_memory.load('s1')['turns']) is completed
@@ -0,0 +1,60 @@
+"""Cursor paging over stored rankings.
+
+    python -m pytest test_result_cursors.py
+"""
+import time
+
+import numpy as np
+import pytest
+
+from result_cursors import CursorError, RankedResultStore
+
+
+def ranking(size: int = 25):
+    return np.arange(size), np.linspace(1.0, 0.0, size, dtype=np.float32)
+
+
+def test_pages_slice_the_stored_ranking():
+    store = RankedResultStore()
+    cursor = store.put('v1', 10, {'strategy': 'basic'}, *ranking(25))
+
+    row_ids, scores, context, cursor = store.page(cursor, 'v1', 10)
+    assert row_ids.tolist() == list(range(10, 20))
+    assert context == {'strategy': 'basic'}
+    row_ids, _, _, cursor = store.page(cursor, 'v1', 10)
+    assert row_ids.tolist() == list(range(20, 25))
+    assert cursor is None
+    assert store.stats()['pages'] == 2
+
+
+def test_index_version_change_invalidates_cursors():
+    store = RankedResultStore()
+    cursor = store.put('v1', 10, {}, *ranking())
+
+    with pytest.raises(CursorError):
+        store.page(cursor, 'v2', 10)
+    assert store.stats()['misses'] == 1
+
+
+def test_idle_entries_expire_and_lru_evicts_beyond_max_entries():
+    store = RankedResultStore(max_entries=2, ttl=0.05)
+    first = store.put('v1', 10, {}, *ranking())
+    second = store.put('v1', 10, {}, *ranking())
+    store.put('v1', 10, {}, *ranking())
+
+    with pytest.raises(CursorError):
+        store.page(first, 'v1', 10)
+    store.page(second, 'v1', 10)
+    time.sleep(0.1)
+    with pytest.raises(CursorError):
+        store.page(second, 'v1', 10)
+
+
+@pytest.mark.parametrize('cursor', ['', 'no-offset', 'token.-1', 'token.abc', None, 17])
+def test_rejects_malformed_cursors(cursor):
+    with pytest.raises(CursorError):
+        RankedResultStore().page(cursor, 'v1', 10)
+
+
+def test_disabled_store_hands_out_no_cursors():
+    assert RankedResultStore(max_entries=0).put('v1', 10, {}, *ranking()) is None
@@ -0,0 +1,89 @@
+"""Sharded search against in-process shard servers split from a stub-built index.
+
+    python -m pytest test_shard_index.py
+"""
+import threading
+
+import numpy as np
+import pytest
+
+from build_index import build_index
+from embeddings import HttpEmbeddingBackend
+from index_holder import load_snapshot
+from shard_index import ShardCoordinator, ShardError, make_shard_server, split_index
+from stub_gemini import start_stub_server, stub_embedding
+
+SAMPLE_CSV = 'Talent Profiles - talent_samples.csv'
+SHARDS = 2
+QUERIES = ['video editor for gaming channel', 'podcast producer', 'thumbnail designer', 'finance advisor']
+
+
+@pytest.fixture(scope='module')
+def index_root(tmp_path_factory):
+    server, url = start_stub_server(dimension=32)
+    root = str(tmp_path_factory.mktemp('index') / 'talent_index')
+    build_index(SAMPLE_CSV, root, HttpEmbeddingBackend(url), batch_size=50, requests_per_second=1000, fields=False)
+    server.shutdown()
+    return root
+
+
+@pytest.fixture(scope='module')
+def cluster(index_root, tmp_path_factory):
+    shard_roots = split_index(index_root, str(tmp_path_factory.mktemp('shards')), SHARDS)
+    servers = [make_shard_server(shard_root, reload_interval=3600) for shard_root in shard_roots]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield servers, ShardCoordinator([f"http://127.0.0.1:{s.server_address[1]}" for s in servers], deadline=5)
+    for server in servers:
+        server.shutdown()
+
+
+def queries():
+    return np.array([stub_embedding(query, 32) for query in QUERIES], dtype=np.float32)
+
+
+def test_sharded_search_matches_local_search(index_root, cluster):
+    _, coordinator = cluster
+    snapshot = load_snapshot(index_root)
+
+    row_ids, scores = coordinator.search(queries()[0], 10, snapshot.version)
+    local_ids, local_scores = snapshot.search(queries()[0], 10)
+
+    assert row_ids.tolist() == local_ids.tolist()
+    np.testing.assert_allclose(scores, local_scores, atol=1e-5)
+
+
+def test_sharded_batch_matches_local_batch(index_root, cluster):
+    _, coordinator = cluster
+    snapshot = load_snapshot(index_root)
+    filters = {'monthly_rate': {'gte': 1000}}
+    rows = snapshot.filter_index.evaluate(filters)
+
+    sharded = coordinator.search_batch(queries(), 5, snapshot.version, filters)
+    local = snapshot.talent_index.search_batch(queries(), 5, rows)
+
+    assert len(sharded) == len(QUERIES)
+    for (row_ids, scores), (local_ids, local_scores) in zip(sharded, local):
+        assert row_ids.tolist() == local_ids.tolist()
+        np.testing.assert_allclose(scores, local_scores, atol=1e-5)
+
+
+def test_shards_from_another_generation_are_reported_stale(index_root, cluster):
+    _, coordinator = cluster
+    version = load_snapshot(index_root).version
+
+    assert coordinator.check(version) == {'fresh': SHARDS, 'stale': [], 'unreachable': []}
+    assert coordinator.states(version) == {'fresh': SHARDS, 'stale': 0, 'unknown': 0}
+
+    # As after a re-index that the shards were not split from
+    with pytest.raises(ShardError, match='another index generation'):
+        coordinator.search(queries()[0], 10, 'next-generation')
+    assert coordinator.states('next-generation') == {'fresh': 0, 'stale': SHARDS, 'unknown': 0}
+    assert coordinator.check('next-generation')['stale'] == coordinator.urls
+
+
+def test_unreachable_shards_are_reported():
+    coordinator = ShardCoordinator(['http://127.0.0.1:9'], deadline=0.5)
+
+    assert coordinator.check('any') == {'fresh': 0, 'stale': [], 'unreachable': ['http://127.0.0.1:9']}
+    assert coordinator.states('any') == {'fresh': 0, 'stale': 0, 'unknown': 1}
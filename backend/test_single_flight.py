@@ -0,0 +1,70 @@
+"""Single-flight coalescing of concurrent identical calls.
+
+    python -m pytest test_single_flight.py
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import COALESCED_CALLS, SingleFlight
+
+WAITERS = 7
+
+
+def run_burst(flights, fn, key='job'):
+    """Start one leader call, then WAITERS more for the same key while it is still running"""
+    started, release = threading.Event(), threading.Event()
+    joined = COALESCED_CALLS.value(operation=flights.operation)
+
+    def leader_fn():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=WAITERS + 1) as executor:
+        leader = executor.submit(flights.do, key, leader_fn)
+        started.wait(5)
+        waiters = [executor.submit(flights.do, key, fn) for _ in range(WAITERS)]
+        # Hold the leader until every waiter has joined its call
+        deadline = time.monotonic() + 5
+        while COALESCED_CALLS.value(operation=flights.operation) < joined + WAITERS and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        return [leader] + waiters
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight('test')
+    calls = []
+
+    futures = run_burst(flights, lambda: calls.append(1) or 'result')
+
+    assert [f.result(5) for f in futures] == ['result'] * (WAITERS + 1)
+    assert len(calls) == 1
+    assert flights.in_flight() == 0
+
+
+def test_every_waiter_sees_the_leaders_exception():
+    flights = SingleFlight('test')
+
+    def fail():
+        raise IOError('upstream down')
+
+    futures = run_burst(flights, fail)
+
+    for future in futures:
+        with pytest.raises(IOError, match='upstream down'):
+            future.result(5)
+    assert flights.in_flight() == 0
+
+
+def test_finished_calls_are_not_cached_and_keys_are_independent():
+    flights = SingleFlight('test')
+    calls = []
+
+    assert flights.do('a', lambda: calls.append('a') or 1) == 1
+    assert flights.do('a', lambda: calls.append('a') or 2) == 2
+    assert flights.do('b', lambda: calls.append('b') or 3) == 3
+    assert calls == ['a', 'a', 'b']
@@ -0,0 +1,80 @@
+"""Exact top-k search, batched search and per-field weighted scoring.
+
+    python -m pytest test_talent_index.py
+"""
+import numpy as np
+import pytest
+
+from talent_index import FieldIndex, TalentIndex, normalize_rows
+
+FIELDS = ['bio', 'skills', 'software']
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+
+@pytest.fixture
+def field_index(rng):
+    stacked = np.stack([normalize_rows(rng.normal(size=(50, 16)).astype(np.float32)) for _ in FIELDS])
+    return FieldIndex(FIELDS, stacked)
+
+
+def test_weighted_scores_are_the_weighted_sum_of_field_cosines(field_index, rng):
+    query = rng.normal(size=16).astype(np.float32)
+    weights = {'bio': 3.0, 'software': 1.0}
+
+    row_ids, scores = field_index.search(query, weights, 50)
+
+    unit = query / np.linalg.norm(query)
+    expected = 0.75 * (field_index.stacked[0] @ unit) + 0.25 * (field_index.stacked[2] @ unit)
+    np.testing.assert_allclose(scores, expected[row_ids], atol=1e-5)
+    assert row_ids.tolist() == np.argsort(-expected, kind='stable').tolist()
+
+
+@pytest.mark.parametrize('weights', [
+    {'portfolio': 1.0},
+    {'bio': -1.0, 'skills': 2.0},
+    {'bio': 0.0},
+    {},
+    {'bio': 'high'},
+])
+def test_invalid_weights_raise_value_error(field_index, weights):
+    with pytest.raises(ValueError):
+        field_index.weight_vector(weights)
+
+
+def test_rows_restrict_weighted_search(field_index, rng):
+    rows = np.array([4, 9, 17, 33])
+
+    row_ids, _ = field_index.search(rng.normal(size=16), {'skills': 1.0}, 10, rows=rows)
+
+    assert sorted(row_ids.tolist()) == rows.tolist()
+
+
+def test_argpartition_top_k_matches_a_full_sort(rng):
+    index = TalentIndex(rng.normal(size=(500, 32)).astype(np.float32))
+    query = rng.normal(size=32).astype(np.float32)
+
+    row_ids, scores = index.search(query, 25)
+
+    full = index.matrix @ (query / np.linalg.norm(query))
+    assert row_ids.tolist() == np.argsort(-full, kind='stable')[:25].tolist()
+    np.testing.assert_allclose(scores, np.sort(full)[::-1][:25], atol=1e-5)
+
+
+def test_batch_search_matches_single_searches(rng):
+    tombstones = np.zeros(300, dtype=bool)
+    tombstones[::7] = True
+    index = TalentIndex(rng.normal(size=(300, 16)).astype(np.float32), tombstones=tombstones)
+    queries = rng.normal(size=(12, 16)).astype(np.float32)
+    rows = np.arange(0, 300, 2)
+
+    for restrict in (None, rows):
+        batch = index.search_batch(queries, 10, rows=restrict, max_block=600)
+        for query, (row_ids, scores) in zip(queries, batch):
+            single_ids, single_scores = index.search(query, 10, rows=restrict)
+            assert row_ids.tolist() == single_ids.tolist()
+            np.testing.assert_allclose(scores, single_scores, atol=1e-5)
+            assert not tombstones[row_ids].any()
@@ -0,0 +1,181 @@
+"""Circuit breaker, retry budget, deadlines, hedging and streams against the local stub.
+
+    python -m pytest test_upstream.py
+"""
+import json
+import time
+import urllib.request
+
+import pytest
+
+from embeddings import HttpEmbeddingBackend
+from metrics import UPSTREAM_RETRIES
+from stub_gemini import start_stub_server
+from upstream import (UPSTREAM_HEDGES, CircuitBreaker, CircuitOpenError, DeadlineExceeded, RetryBudget,
+                      UpstreamClient)
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server(dimension=8)
+    yield server, url
+    server.shutdown()
+
+
+def embed_call(url):
+    backend = HttpEmbeddingBackend(url, timeout=5)
+    return lambda: backend.embed(['editor'])
+
+
+def chat_stream(url):
+    """The streamed stub reply, one text chunk per item"""
+    body = json.dumps({'messages': [{'role': 'user', 'content': 'hi'}], 'stream': True}).encode('utf-8')
+    request = urllib.request.Request(f"{url}/chat", data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        for line in response:
+            yield json.loads(line)['text']
+
+
+def test_circuit_opens_fails_fast_and_closes_after_a_successful_trial(stub):
+    server, url = stub
+    client = UpstreamClient('test-breaker', timeout=5, max_retries=0,
+                            breaker=CircuitBreaker(failure_threshold=2, reset_seconds=0.2))
+    server.config['fail_rate'] = 1.0
+    for _ in range(2):
+        with pytest.raises(IOError):
+            client.call(embed_call(url))
+    assert client.breaker.state == 'open'
+
+    requests = server.requests
+    with pytest.raises(CircuitOpenError):
+        client.call(embed_call(url))
+    assert server.requests == requests
+
+    server.config['fail_rate'] = 0.0
+    time.sleep(0.25)
+    assert client.breaker.state == 'half_open'
+    assert len(client.call(embed_call(url))) == 1
+    assert client.breaker.state == 'closed'
+    assert client.breaker.failures == 0
+
+
+def test_failed_trial_reopens_the_circuit(stub):
+    server, url = stub
+    client = UpstreamClient('test-trial', timeout=5, max_retries=0,
+                            breaker=CircuitBreaker(failure_threshold=1, reset_seconds=0.2))
+    server.config['fail_rate'] = 1.0
+    with pytest.raises(IOError):
+        client.call(embed_call(url))
+    time.sleep(0.25)
+
+    with pytest.raises(IOError):
+        client.call(embed_call(url))
+    assert client.breaker.state == 'open'
+
+
+def test_retries_stop_when_the_budget_is_spent(stub):
+    server, url = stub
+    server.config['fail_rate'] = 1.0
+    client = UpstreamClient('test-budget', timeout=5, max_retries=5, backoff=0.001,
+                            budget=RetryBudget(ratio=0.0, minimum=2), breaker=CircuitBreaker(failure_threshold=100))
+
+    with pytest.raises(IOError):
+        client.call(embed_call(url))
+    assert server.requests == 3
+    with pytest.raises(IOError):
+        client.call(embed_call(url))
+    assert server.requests == 4
+    assert UPSTREAM_RETRIES.value(upstream='test-budget') == 2
+
+
+def test_calls_give_up_at_the_deadline_without_retrying(stub):
+    server, url = stub
+    server.config['latency_ms'] = 500
+    client = UpstreamClient('test-deadline', timeout=0.1, max_retries=2)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        client.call(embed_call(url))
+    assert time.perf_counter() - start < 0.4
+    assert server.requests == 1
+    assert client.breaker.failures == 1
+
+
+def test_hedged_request_answers_when_the_first_is_slow(stub):
+    server, url = stub
+    server.config['slow_ms'] = 1000
+    backend = HttpEmbeddingBackend(url, timeout=5)
+    client = UpstreamClient('test-hedge', timeout=5, hedge_after=0.05)
+    attempts = []
+
+    def embed():
+        # The first attempt lands in the stub's slow tail, the hedged one does not
+        server.config['slow_rate'] = 0.0 if attempts else 1.0
+        attempts.append(1)
+        return backend.embed(['editor'])
+
+    start = time.perf_counter()
+    assert len(client.call(embed, hedge=True)) == 1
+    assert time.perf_counter() - start < 0.5
+    assert server.requests == 2
+    assert UPSTREAM_HEDGES.value(upstream='test-hedge') == 1
+
+
+def test_stream_opening_is_retried_then_fails_into_the_circuit(stub):
+    server, url = stub
+    server.config['fail_rate'] = 1.0
+    client = UpstreamClient('test-stream-open', timeout=5, max_retries=1, backoff=0.001)
+
+    with pytest.raises(IOError):
+        list(client.stream(chat_stream, url))
+    assert server.requests == 2
+    assert client.breaker.failures == 1
+
+    server.config['fail_rate'] = 0.0
+    assert ''.join(client.stream(chat_stream, url))
+    assert client.breaker.failures == 0
+
+
+def test_stream_opening_has_the_deadline(stub):
+    server, url = stub
+    server.config['chat_latency_ms'] = 500
+    client = UpstreamClient('test-stream-deadline', timeout=0.1)
+
+    with pytest.raises(DeadlineExceeded):
+        next(client.stream(chat_stream, url))
+
+
+def test_mid_stream_failures_count_but_disconnects_do_not(stub):
+    _, url = stub
+    client = UpstreamClient('test-stream-end', timeout=5, breaker=CircuitBreaker(failure_threshold=1))
+
+    def breaks_after_first_chunk(url):
+        stream = chat_stream(url)
+        yield next(stream)
+        raise IOError("connection reset mid-stream")
+
+    # A consumer that stops early, like a client that disconnected
+    chunks = client.stream(breaks_after_first_chunk, url)
+    next(chunks)
+    chunks.close()
+    assert client.breaker.state == 'closed'
+    assert client.breaker.failures == 0
+
+    with pytest.raises(IOError):
+        list(client.stream(breaks_after_first_chunk, url))
+    assert client.breaker.state == 'open'
+
+
+def test_a_stream_that_stalls_mid_reply_hits_the_deadline(stub):
+    server, url = stub
+    # The first chunk comes at once, the next only after a stall longer than the deadline
+    server.config['token_delay_ms'] = 2000
+    client = UpstreamClient('test-stream-stall', timeout=0.3, breaker=CircuitBreaker(failure_threshold=1))
+    chunks = client.stream(chat_stream, url)
+    assert next(chunks)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        list(chunks)
+    assert time.perf_counter() - start < 1.0
+    assert client.breaker.state == 'open'
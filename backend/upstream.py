@@ -0,0 +1,325 @@
+import http.client
+import logging
+import os
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from metrics import REGISTRY, UPSTREAM_RETRIES, CallbackMetric, Counter
+
+UPSTREAM_HEDGES = REGISTRY.register(Counter(
+    'talent_upstream_hedged_total', "Hedged second requests sent after the first was slow", ['upstream']))
+UPSTREAM_REJECTED = REGISTRY.register(Counter(
+    'talent_upstream_rejected_total', "Calls failed fast because the upstream's circuit was open", ['upstream']))
+
+# Per-upstream settings, overridable as e.g. EMBEDDING_TIMEOUT or CHAT_CIRCUIT_FAILURES
+DEFAULTS = {
+    'embedding': {'timeout': 5.0, 'hedge_after': 0.0},
+    'chat': {'timeout': 30.0, 'hedge_after': 0.0},
+}
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF = 0.1
+DEFAULT_RETRY_RATIO = 0.2
+DEFAULT_CIRCUIT_FAILURES = 5
+DEFAULT_CIRCUIT_RESET_SECONDS = 30.0
+DEFAULT_WORKERS = 32
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream call cannot be completed"""
+
+
+class DeadlineExceeded(UpstreamError):
+    """Raised when an upstream call is still running at its deadline"""
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised instead of calling an upstream whose recent calls kept failing"""
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and fails calls fast.
+
+    After ``reset_seconds`` one trial call is let through (half open): its
+    success closes the circuit again, its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_CIRCUIT_FAILURES,
+                 reset_seconds: float = DEFAULT_CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half_open' if time.monotonic() - self.opened_at >= self.reset_seconds else 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.warning(f"Opening circuit after {self.failures} consecutive upstream failures")
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class RetryBudget:
+    """Caps sustained retries at ``ratio`` of calls, with bursts of up to ``minimum``.
+
+    Every call deposits ``ratio`` tokens (up to ``minimum``) and every retry
+    spends one, so an outage cannot multiply upstream traffic by the retry count.
+    """
+
+    def __init__(self, ratio: float = DEFAULT_RETRY_RATIO, minimum: float = 10.0):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.balance = minimum
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.balance = min(self.balance + self.ratio, self.minimum)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+_END = object()
+
+
+def _open_stream(fn: Callable[..., Iterable], args, kwargs) -> Tuple[Iterator, Any]:
+    """Start fn's stream: its iterator and first item (_END if it is empty)"""
+    iterator = iter(fn(*args, **kwargs))
+    return iterator, next(iterator, _END)
+
+
+class UpstreamClient:
+    """Runs calls to one upstream API with a deadline, retries, optional hedging and a circuit breaker.
+
+    Each attempt runs on this client's thread pool and the caller waits at
+    most until the deadline, so a hung upstream call cannot hold a request
+    thread (the abandoned attempt finishes in the background). Failed
+    attempts are retried with jittered exponential backoff while time and
+    the retry budget allow. With ``hedge=True`` and ``hedge_after`` set, a
+    second identical request is sent if the first has not answered by then,
+    and whichever succeeds first is used. ``stream`` does the same for the
+    opening of a streamed response.
+    """
+
+    def __init__(self, name: str, timeout: float, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, hedge_after: float = 0.0,
+                 budget: Optional[RetryBudget] = None, breaker: Optional[CircuitBreaker] = None,
+                 workers: int = DEFAULT_WORKERS):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"upstream-{name}")
+
+    def call(self, fn: Callable[..., Any], *args, hedge: bool = False, **kwargs) -> Any:
+        """Return fn(*args, **kwargs), raising CircuitOpenError, DeadlineExceeded or fn's last error"""
+        if not self.breaker.allow():
+            UPSTREAM_REJECTED.inc(upstream=self.name)
+            raise CircuitOpenError(f"{self.name} upstream circuit is open")
+        self.budget.deposit()
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(fn, args, kwargs, deadline, hedge)
+            except Exception as e:
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                retry = (not isinstance(e, DeadlineExceeded) and attempt < self.max_retries
+                         and time.monotonic() + delay < deadline and self.budget.withdraw())
+                if not retry:
+                    self.breaker.record_failure()
+                    raise
+                UPSTREAM_RETRIES.inc(upstream=self.name)
+                logging.warning(f"{self.name} upstream call failed ({e}); retrying in {delay:.2f}s")
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stream(self, fn: Callable[..., Iterable], *args, **kwargs) -> Iterator:
+        """Yield the items of the iterable fn(*args, **kwargs) returns, opening it through ``call``.
+
+        Everything up to the first item (the time to first chunk of a streamed
+        reply) gets the deadline, retries, retry budget and circuit breaker of
+        ``call``. Each later item is read on the thread pool too and must
+        arrive within ``timeout`` of the one before, so an upstream that stalls
+        mid-stream raises DeadlineExceeded instead of holding the request
+        thread. A failure after the first item counts against the circuit and
+        is re-raised; a consumer that stops early, such as a disconnected
+        client, counts as neither a success nor a failure.
+        """
+        iterator, first = self.call(_open_stream, fn, args, kwargs)
+        if first is _END:
+            return
+        yield first
+        try:
+            while True:
+                future = self.executor.submit(next, iterator, _END)
+                done, _ = wait({future}, timeout=self.timeout)
+                if not done:
+                    # The stalled read finishes (or fails) in the background, like an abandoned attempt
+                    self.breaker.record_failure()
+                    raise DeadlineExceeded(f"{self.name} upstream stream stalled for over {self.timeout}s")
+                if future.exception() is not None:
+                    self.breaker.record_failure()
+                    raise future.exception()
+                item = future.result()
+                if item is _END:
+                    return
+                yield item
+        except GeneratorExit:
+            # Only reached at a yield, so no read of the iterator is in progress
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+            raise
+
+    def _attempt(self, fn, args, kwargs, deadline: float, hedge: bool) -> Any:
+        futures = {self.executor.submit(fn, *args, **kwargs)}
+        if hedge and 0 < self.hedge_after < deadline - time.monotonic():
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                UPSTREAM_HEDGES.inc(upstream=self.name)
+                futures.add(self.executor.submit(fn, *args, **kwargs))
+
+        error = None
+        while futures:
+            done, futures = wait(futures, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"{self.name} upstream call exceeded {self.timeout}s")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        return {'state': self.breaker.state, 'consecutive_failures': self.breaker.failures,
+                'retry_budget': round(self.budget.balance, 2)}
+
+
+_clients: Dict[str, UpstreamClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_upstream_client(name: str) -> UpstreamClient:
+    """The process-wide client for an upstream ('embedding' or 'chat'), configured from the environment"""
+    with _clients_lock:
+        if name not in _clients:
+            prefix = name.upper()
+            defaults = DEFAULTS.get(name, DEFAULTS['chat'])
+            _clients[name] = UpstreamClient(
+                name,
+                timeout=float(os.getenv(f'{prefix}_TIMEOUT', defaults['timeout'])),
+                max_retries=int(os.getenv(f'{prefix}_MAX_RETRIES', DEFAULT_MAX_RETRIES)),
+                hedge_after=float(os.getenv(f'{prefix}_HEDGE_AFTER', defaults['hedge_after'])),
+                budget=RetryBudget(float(os.getenv(f'{prefix}_RETRY_RATIO', DEFAULT_RETRY_RATIO))),
+                breaker=CircuitBreaker(int(os.getenv(f'{prefix}_CIRCUIT_FAILURES', DEFAULT_CIRCUIT_FAILURES)),
+                                       float(os.getenv(f'{prefix}_CIRCUIT_RESET', DEFAULT_CIRCUIT_RESET_SECONDS))),
+            )
+        return _clients[name]
+
+
+def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    """Circuit and retry-budget state of every upstream client created so far"""
+    return {name: client.stats() for name, client in list(_clients.items())}
+
+
+REGISTRY.register(CallbackMetric(
+    'talent_upstream_circuit_open', "1 while an upstream's circuit breaker is failing calls fast",
+    'gauge', ['upstream'], lambda: {(name,): int(client.breaker.state != 'closed')
+                                    for name, client in list(_clients.items())}))
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one host, one per calling thread.
+
+    Reusing a connection skips the TCP (and TLS) handshake that a fresh
+    urllib request pays on every call. A request on a connection the
+    server has since closed is retried once on a new one.
+    """
+
+    def __init__(self, base_url: str, timeout: float):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self, fresh: bool = False) -> http.client.HTTPConnection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or fresh:
+            if connection is not None:
+                connection.close()
+            connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            connection = connection_class(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def post(self, path: str, body: bytes, headers: Dict[str, str]) -> Tuple[int, bytes]:
+        """POST body to path and return (status, response body)"""
+        for fresh in (False, True):
+            connection = self._connection(fresh)
+            try:
+                connection.request('POST', self.prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                if fresh:
+                    raise
+            except Exception:
+                connection.close()
+                self._local.connection = None
+                raise
+
+
+_pools: Dict[Tuple[str, float], ConnectionPool] = {}
+
+
+def get_connection_pool(base_url: str, timeout: float) -> ConnectionPool:
+    with _clients_lock:
+        key = (base_url, timeout)
+        if key not in _pools:
+            _pools[key] = ConnectionPool(base_url, timeout)
+        return _pools[key]
@@ -12,6 +12,8 @@ const ChatInterface = ({ onClose }) => {
   ]);
   const [inputValue, setInputValue] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  // Assigned by the server on the first reply so follow-ups keep their context
+  const [sessionId, setSessionId] = useState(null);
   const messagesEndRef = useRef(null);
 
   const scrollToBottom = () => {
@@ -37,14 +39,25 @@ const ChatInterface = ({ onClose }) => {
     setInputValue('');
     setIsLoading(true);
 
+    const botMessageId = Date.now() + 1;
+    const updateBotMessage = (update) => {
+      setMessages(prev => {
+        if (!prev.some(m => m.id === botMessageId)) {
+          return [...prev, { id: botMessageId, type: 'bot', content: '', candidates: [], timestamp: new Date(), ...update(null) }];
+        }
+        return prev.map(m => (m.id === botMessageId ? { ...m, ...update(m) } : m));
+      });
+    };
+
     try {
-      const response = await fetch('http://localhost:5000/chat', {
+      const response = await fetch('http://localhost:5000/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          message: currentInput
+          message: currentInput,
+          session_id: sessionId
         })
       });
 
@@ -53,17 +66,33 @@ const ChatInterface = ({ onClose }) => {
         throw new Error(errorData.error || 'Failed to get AI response');
       }
 
-      const data = await response.json();
-      
-      const botMessage = {
-        id: Date.now() + 1,
-        type: 'bot',
-        content: data.message,
-        candidates: data.candidates || [],
-        timestamp: new Date()
-      };
-
-      setMessages(prev => [...prev, botMessage]);
+      // Server-Sent Events: candidates first, then response tokens, then done
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const dataLine = rawEvent.match(/^data: (.*)$/m)?.[1];
+          if (!eventName || !dataLine) continue;
+          const data = JSON.parse(dataLine);
+          if (eventName === 'candidates') {
+            setIsLoading(false);
+            if (data.session_id) setSessionId(data.session_id);
+            updateBotMessage(() => ({ candidates: data.candidates || [] }));
+          } else if (eventName === 'token') {
+            setIsLoading(false);
+            updateBotMessage(m => ({ content: (m ? m.content : '') + data.text }));
+          } else if (eventName === 'done' || eventName === 'error') {
+            updateBotMessage(() => ({ content: data.message }));
+          }
+        }
+      }
     } catch (error) {
       console.error('Chat error:', error);
       const errorMessage = {